@@ -0,0 +1,43 @@
+"""Add products_fts search index
+
+Revision ID: 11c92e0dbe28
+Revises: 4e72163045c0
+Create Date: 2025-06-15 10:38:02.466206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '11c92e0dbe28'
+down_revision: Union[str, None] = '4e72163045c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts "
+        "USING fts5(name, description, tokenize='unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        "INSERT INTO products_fts (rowid, name, description) "
+        "SELECT id, name, coalesce(description, '') FROM products WHERE is_active = 1"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+
+    op.execute("DROP TABLE IF EXISTS products_fts")
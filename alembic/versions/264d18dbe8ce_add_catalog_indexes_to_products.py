@@ -0,0 +1,48 @@
+"""Add catalog indexes to products
+
+Revision ID: 264d18dbe8ce
+Revises: 11c92e0dbe28
+Create Date: 2025-06-16 11:45:15.570935
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '264d18dbe8ce'
+down_revision: Union[str, None] = '11c92e0dbe28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_products_category_id", "products", ["category_id"])
+    op.create_index("ix_products_is_active", "products", ["is_active"])
+    op.create_index("ix_products_is_active_price", "products", ["is_active", "price"])
+    op.create_index(
+        "ix_products_is_active_created_at", "products", ["is_active", "created_at"]
+    )
+    op.create_index("ix_products_is_active_name", "products", ["is_active", "name"])
+    op.create_index("ix_products_is_active_stock", "products", ["is_active", "stock"])
+    op.create_index(
+        "ix_product_images_product_id_position",
+        "product_images",
+        ["product_id", "position"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_product_images_product_id_position", table_name="product_images"
+    )
+    op.drop_index("ix_products_is_active_stock", table_name="products")
+    op.drop_index("ix_products_is_active_name", table_name="products")
+    op.drop_index("ix_products_is_active_created_at", table_name="products")
+    op.drop_index("ix_products_is_active_price", table_name="products")
+    op.drop_index("ix_products_is_active", table_name="products")
+    op.drop_index("ix_products_category_id", table_name="products")
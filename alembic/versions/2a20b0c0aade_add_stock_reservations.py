@@ -0,0 +1,65 @@
+"""Add stock reservations
+
+Revision ID: 2a20b0c0aade
+Revises: c8c80853f1d9
+Create Date: 2025-06-19 14:06:54.885122
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2a20b0c0aade'
+down_revision: Union[str, None] = 'c8c80853f1d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "products",
+        sa.Column("reserved", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.create_table(
+        "stock_reservations",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["product_id"], ["products.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_stock_reservations_expires_at", "stock_reservations", ["expires_at"]
+    )
+    op.create_index(
+        "ix_stock_reservations_product_id_expires_at",
+        "stock_reservations",
+        ["product_id", "expires_at"],
+    )
+    op.create_index(
+        "ix_stock_reservations_user_id_product_id",
+        "stock_reservations",
+        ["user_id", "product_id"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_stock_reservations_user_id_product_id", table_name="stock_reservations"
+    )
+    op.drop_index(
+        "ix_stock_reservations_product_id_expires_at", table_name="stock_reservations"
+    )
+    op.drop_index("ix_stock_reservations_expires_at", table_name="stock_reservations")
+    op.drop_table("stock_reservations")
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.drop_column("reserved")
@@ -0,0 +1,57 @@
+"""Add stock thresholds and alerts
+
+Revision ID: 36ab8895e31b
+Revises: db801341f354
+Create Date: 2025-06-21 16:20:20.094580
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '36ab8895e31b'
+down_revision: Union[str, None] = 'db801341f354'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "products",
+        sa.Column("min_stock", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "products",
+        sa.Column("critical_stock", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.create_table(
+        "stock_alerts",
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=False),
+        sa.Column("level", sa.String(length=10), nullable=False),
+        sa.Column("since", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["product_id"], ["products.id"]),
+        sa.PrimaryKeyConstraint("product_id"),
+    )
+    op.create_index(
+        "ix_stock_alerts_category_id_product_id",
+        "stock_alerts",
+        ["category_id", "product_id"],
+    )
+    op.create_index(
+        "ix_stock_alerts_level_product_id", "stock_alerts", ["level", "product_id"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_stock_alerts_level_product_id", table_name="stock_alerts")
+    op.drop_index("ix_stock_alerts_category_id_product_id", table_name="stock_alerts")
+    op.drop_table("stock_alerts")
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.drop_column("critical_stock")
+        batch_op.drop_column("min_stock")
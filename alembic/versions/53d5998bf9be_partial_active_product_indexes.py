@@ -0,0 +1,47 @@
+"""Partial catalog indexes on active products
+
+Revision ID: 53d5998bf9be
+Revises: 9d1e3c0abb85
+Create Date: 2025-07-02 13:37:43.246599
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '53d5998bf9be'
+down_revision: Union[str, None] = '9d1e3c0abb85'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column in ("is_active_stock", "is_active_name", "is_active_created_at", "is_active_price"):
+        op.drop_index(f"ix_products_{column}", table_name="products")
+    op.drop_index("ix_products_is_active", table_name="products")
+    # La condición debe coincidir con la de las consultas (Product.is_active.is_(True))
+    for column in ("id", "price", "created_at", "name", "stock"):
+        op.create_index(
+            f"ix_products_active_{column}",
+            "products",
+            [column],
+            sqlite_where=sa.text("is_active IS 1"),
+            postgresql_where=sa.text("is_active IS true"),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in ("stock", "name", "created_at", "price", "id"):
+        op.drop_index(f"ix_products_active_{column}", table_name="products")
+    op.create_index("ix_products_is_active", "products", ["is_active"])
+    op.create_index("ix_products_is_active_price", "products", ["is_active", "price"])
+    op.create_index(
+        "ix_products_is_active_created_at", "products", ["is_active", "created_at"]
+    )
+    op.create_index("ix_products_is_active_name", "products", ["is_active", "name"])
+    op.create_index("ix_products_is_active_stock", "products", ["is_active", "stock"])
@@ -0,0 +1,34 @@
+"""Add product_id created_at index to stock_history
+
+Revision ID: 5457e96f4bee
+Revises: 264d18dbe8ce
+Create Date: 2025-06-17 12:52:28.675664
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5457e96f4bee'
+down_revision: Union[str, None] = '264d18dbe8ce'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_stock_history_product_id_created_at",
+        "stock_history",
+        ["product_id", "created_at"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_stock_history_product_id_created_at", table_name="stock_history"
+    )
@@ -0,0 +1,44 @@
+"""Make stock ledger checkpoint updated_at not null
+
+Revision ID: 65a96add5ffd
+Revises: 47dce2c24006
+Create Date: 2025-06-28 16:09:51.827683
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '65a96add5ffd'
+down_revision: Union[str, None] = '47dce2c24006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        "UPDATE stock_ledger_checkpoint SET updated_at = CURRENT_TIMESTAMP "
+        "WHERE updated_at IS NULL"
+    )
+    with op.batch_alter_table("stock_ledger_checkpoint") as batch_op:
+        batch_op.alter_column(
+            "updated_at",
+            existing_type=sa.DateTime(),
+            nullable=False,
+            server_default=sa.func.now(),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("stock_ledger_checkpoint") as batch_op:
+        batch_op.alter_column(
+            "updated_at",
+            existing_type=sa.DateTime(),
+            nullable=True,
+            server_default=None,
+        )
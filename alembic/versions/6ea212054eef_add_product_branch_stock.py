@@ -0,0 +1,58 @@
+"""Add product branch stock
+
+Revision ID: 6ea212054eef
+Revises: eb569257518d
+Create Date: 2025-06-26 14:55:25.618225
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6ea212054eef'
+down_revision: Union[str, None] = 'eb569257518d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "product_branch_stock",
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("branch_id", sa.Integer(), nullable=False),
+        sa.Column("stock", sa.Integer(), nullable=False),
+        sa.Column("reserved", sa.Integer(), nullable=False),
+        sa.Column("available", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["product_id"], ["products.id"]),
+        sa.PrimaryKeyConstraint("product_id", "branch_id"),
+    )
+    op.create_index(
+        "ix_product_branch_stock_branch_id_available",
+        "product_branch_stock",
+        ["branch_id", "available", "product_id"],
+    )
+    op.create_table(
+        "product_branch_stock_totals",
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("stock", sa.Integer(), nullable=False),
+        sa.Column("reserved", sa.Integer(), nullable=False),
+        sa.Column("available", sa.Integer(), nullable=False),
+        sa.Column("branches", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["product_id"], ["products.id"]),
+        sa.PrimaryKeyConstraint("product_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("product_branch_stock_totals")
+    op.drop_index(
+        "ix_product_branch_stock_branch_id_available", table_name="product_branch_stock"
+    )
+    op.drop_table("product_branch_stock")
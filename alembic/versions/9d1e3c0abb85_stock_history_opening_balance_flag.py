@@ -0,0 +1,36 @@
+"""Mark stock history opening balances
+
+Revision ID: 9d1e3c0abb85
+Revises: fff000e79d5b
+Create Date: 2025-07-01 12:30:30.141870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d1e3c0abb85'
+down_revision: Union[str, None] = 'fff000e79d5b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "stock_history",
+        sa.Column("is_opening_balance", sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+    # Hasta ahora los saldos iniciales de la compactación se reconocían por el motivo
+    op.execute(
+        "UPDATE stock_history SET is_opening_balance = TRUE WHERE reason = 'Saldo inicial'"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("stock_history") as batch_op:
+        batch_op.drop_column("is_opening_balance")
@@ -0,0 +1,40 @@
+"""Add stock_snapshots table
+
+Revision ID: c8c80853f1d9
+Revises: 5457e96f4bee
+Create Date: 2025-06-18 13:59:41.780393
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8c80853f1d9'
+down_revision: Union[str, None] = '5457e96f4bee'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "stock_snapshots",
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("closed_at", sa.DateTime(), nullable=False),
+        sa.Column("closing_stock", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["product_id"], ["products.id"]),
+        sa.PrimaryKeyConstraint("product_id", "day"),
+    )
+    op.create_index(
+        "ix_stock_history_created_at", "stock_history", ["created_at"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_stock_history_created_at", table_name="stock_history")
+    op.drop_table("stock_snapshots")
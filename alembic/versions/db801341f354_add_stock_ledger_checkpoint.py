@@ -0,0 +1,34 @@
+"""Add stock ledger checkpoint
+
+Revision ID: db801341f354
+Revises: 2a20b0c0aade
+Create Date: 2025-06-20 15:13:07.989851
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'db801341f354'
+down_revision: Union[str, None] = '2a20b0c0aade'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "stock_ledger_checkpoint",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("last_seq", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("stock_ledger_checkpoint")
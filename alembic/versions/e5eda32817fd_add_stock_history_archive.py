@@ -0,0 +1,46 @@
+"""Add stock history archive
+
+Revision ID: e5eda32817fd
+Revises: 36ab8895e31b
+Create Date: 2025-06-22 10:27:33.199309
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5eda32817fd'
+down_revision: Union[str, None] = '36ab8895e31b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "stock_history_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("reason", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_stock_history_archive_product_id_created_at",
+        "stock_history_archive",
+        ["product_id", "created_at"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_stock_history_archive_product_id_created_at",
+        table_name="stock_history_archive",
+    )
+    op.drop_table("stock_history_archive")
@@ -0,0 +1,45 @@
+"""Add Cianbox ids and sync state
+
+Revision ID: eb569257518d
+Revises: 191704c59697
+Create Date: 2025-06-25 13:48:12.513496
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'eb569257518d'
+down_revision: Union[str, None] = '191704c59697'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("products", sa.Column("cianbox_id", sa.Integer(), nullable=True))
+    op.create_index("ix_products_cianbox_id", "products", ["cianbox_id"], unique=True)
+    op.add_column("categories", sa.Column("cianbox_id", sa.Integer(), nullable=True))
+    op.create_index("ix_categories_cianbox_id", "categories", ["cianbox_id"], unique=True)
+    op.create_table(
+        "cianbox_sync_state",
+        sa.Column("module", sa.String(length=50), nullable=False),
+        sa.Column("high_water_mark", sa.DateTime(), nullable=True),
+        sa.Column("last_run_at", sa.DateTime(), nullable=True),
+        sa.Column("last_run_items", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("module"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("cianbox_sync_state")
+    op.drop_index("ix_categories_cianbox_id", table_name="categories")
+    with op.batch_alter_table("categories") as batch_op:
+        batch_op.drop_column("cianbox_id")
+    op.drop_index("ix_products_cianbox_id", table_name="products")
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.drop_column("cianbox_id")
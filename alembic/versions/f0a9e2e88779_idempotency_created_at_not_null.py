@@ -0,0 +1,44 @@
+"""Make idempotency key created_at not null
+
+Revision ID: f0a9e2e88779
+Revises: 65a96add5ffd
+Create Date: 2025-06-29 10:16:04.932412
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f0a9e2e88779'
+down_revision: Union[str, None] = '65a96add5ffd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        "UPDATE idempotency_keys SET created_at = CURRENT_TIMESTAMP "
+        "WHERE created_at IS NULL"
+    )
+    with op.batch_alter_table("idempotency_keys") as batch_op:
+        batch_op.alter_column(
+            "created_at",
+            existing_type=sa.DateTime(),
+            nullable=False,
+            server_default=sa.func.now(),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("idempotency_keys") as batch_op:
+        batch_op.alter_column(
+            "created_at",
+            existing_type=sa.DateTime(),
+            nullable=True,
+            server_default=None,
+        )
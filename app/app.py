@@ -6,6 +6,7 @@ from app.core.exceptions import (
     BadRequestException,
     ConflictException,
     NotFoundException,
+    UnprocessableEntityException,
 )
 from app.core.database import Base
 from app.core import db_connection
@@ -16,6 +17,7 @@ from app.users.router import router as users_router
 from app.roles.router import router as roles_router
 from app.auth.router import router as auth_router
 from app.orders.router import router as orders_router
+from app.stock.ledger import start_ledger, stop_ledger
 
 
 # Crear tablas
@@ -25,7 +27,9 @@ from app.orders.router import router as orders_router
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     db_connection.connect()
+    start_ledger()
     yield
+    stop_ledger()
     db_connection.disconnect()
 
 
@@ -55,3 +59,10 @@ async def conflict_exception_handler(request: Request, exc: ConflictException):
 @app.exception_handler(BadRequestException)
 async def bad_request_exception_handler(request: Request, exc: BadRequestException):
     return JSONResponse(status_code=exc.status_code, content={"error": exc.detail})
+
+
+@app.exception_handler(UnprocessableEntityException)
+async def unprocessable_entity_exception_handler(
+    request: Request, exc: UnprocessableEntityException
+):
+    return JSONResponse(status_code=exc.status_code, content={"error": exc.detail})
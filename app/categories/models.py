@@ -1,4 +1,4 @@
-from sqlalchemy import String
+from sqlalchemy import Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.database import Base
 from datetime import datetime
@@ -8,9 +8,13 @@ from sqlalchemy.sql import func
 
 class Category(Base):
     __tablename__ = "categories"
+    # Alta y actualización de categorías de Cianbox por su ID
+    __table_args__ = (Index("ix_categories_cianbox_id", "cianbox_id", unique=True),)
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
+    # ID de la categoría en Cianbox (id_categoria); NULL para las locales
+    cianbox_id: Mapped[int | None] = mapped_column(nullable=True)
     products: Mapped[list["Product"]] = relationship(back_populates="category")
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
@@ -14,8 +14,9 @@ def create_category(category: schemas.CategoryCreate):
 def get_categories(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    count: str = Query("exact", pattern="^(exact|estimate|none)$"),
 ):
-    return service.get_categories(skip=skip, limit=limit)
+    return service.get_categories(skip=skip, limit=limit, count=count)
 
 
 @router.get("/{category_id}", response_model=schemas.CategoryResponse)
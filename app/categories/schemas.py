@@ -24,4 +24,5 @@ class CategoryResponse(CategoryBase):
 
 class PaginatedCategoryResponse(BaseModel):
     data: List[CategoryResponse]
-    total: int
+    total: int | None = None
+    has_next: bool = False
@@ -2,6 +2,8 @@ from sqlalchemy.orm import Session
 from app.categories import models, schemas
 from app.core.exceptions import ConflictException, NotFoundException
 from app.core import db_connection
+from app.core.cache import versions
+from app.core.pagination import cached_count
 
 
 db: Session = db_connection.session
@@ -17,6 +19,7 @@ def create_category(
 
     category = models.Category(name=name)
     db.add(category)
+    versions.bump(db, models.Category.__tablename__)
     db.commit()
     db.refresh(category)
     return schemas.CategoryResponse.model_validate(category)
@@ -30,14 +33,23 @@ def get_all_categories(db: Session) -> list[schemas.CategoryResponse]:
 
 
 def get_categories(
-    skip: int = 0, limit: int = 10
+    skip: int = 0, limit: int = 10, count: str = "exact"
 ) -> schemas.PaginatedCategoryResponse:
     query = db.query(models.Category)
-    total = query.count()
-    categories = query.offset(skip).limit(limit).all()
-    categories = [schemas.CategoryResponse.model_validate(c) for c in categories]
-    
-    return schemas.PaginatedCategoryResponse(data=categories, total=total)
+    total = cached_count(db, models.Category.__tablename__, None, query.count, count)
+
+    # Se pide un registro extra para saber si existe una página siguiente
+    categories = (
+        query.order_by(models.Category.id).offset(skip).limit(limit + 1).all()
+    )
+    has_next = len(categories) > limit
+    categories = [
+        schemas.CategoryResponse.model_validate(c) for c in categories[:limit]
+    ]
+
+    return schemas.PaginatedCategoryResponse(
+        data=categories, total=total, has_next=has_next
+    )
 
 
 def get_category_by_id(category_id: int) -> schemas.CategoryResponse:
@@ -0,0 +1,117 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+from typing import Any, Hashable
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.models import CacheVersion
+from app.core.sql import execute_upsert, upsert
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache with per-entry TTL and an approximate memory
+    limit. The size of each entry is given by the caller when it is stored.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, max_entries: int = 10_000):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.current_bytes = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, int, float]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, _, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._pop(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, size: int = 1, ttl_seconds: float | None = None) -> None:
+        if size > self.max_bytes:
+            return
+
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+
+            self._entries[key] = (value, size, time.monotonic() + ttl)
+            self.current_bytes += size
+
+            # Se descartan las entradas menos usadas hasta volver a los límites
+            while self._entries and (
+                self.current_bytes > self.max_bytes
+                or len(self._entries) > self.max_entries
+            ):
+                self._pop(next(iter(self._entries)))
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _pop(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+
+class VersionCounter:
+    """
+    Per-name monotonic counters used to version cached data. Bumping a name
+    makes every cache key built with the previous version unreachable.
+    The counters live in the `cache_versions` table, so a bump made by any
+    worker or process (API workers, stock ledger, outbox, Cianbox ingest)
+    invalidates the caches of all of them. Reading one is a primary key
+    lookup.
+    """
+
+    def get(self, session: Session, name: str) -> int:
+        version = session.scalar(
+            select(CacheVersion.version).where(CacheVersion.name == name)
+        )
+        return version or 0
+
+    def bump(self, session: Session, name: str) -> None:
+        """
+        Increments a counter in the caller's transaction, so it becomes
+        visible together with the change it invalidates. Call it right before
+        committing: the counter row stays locked until the commit.
+        :param session: Session of the transaction that changed the data
+        :param name: Name of the counter
+        """
+        table = CacheVersion.__table__
+        execute_upsert(
+            session,
+            upsert(
+                session.get_bind().dialect.name,
+                table,
+                ["name"],
+                ["updated_at"],
+                update_values=lambda excluded: {"version": table.c.version + 1},
+            ),
+            {"name": name, "version": 1, "updated_at": datetime.now()},
+        )
+
+
+versions = VersionCounter()
@@ -11,6 +11,59 @@ class Settings(BaseSettings):
     jwt_secret: str
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+
+    # Product list cache settings
+    product_cache_ttl_seconds: int = 30
+    product_cache_max_bytes: int = 32 * 1024 * 1024
+
+    # Stock snapshots: write today's closing stock on every movement
+    stock_snapshots_incremental: bool = True
+
+    # Stock reservations made during checkout
+    stock_reservation_ttl_seconds: int = 15 * 60
+    stock_reservation_sweep_batch: int = 500
+
+    # Write-behind stock ledger (single process only)
+    stock_ledger_enabled: bool = False
+    stock_ledger_dir: str = "./data/stock-ledger"
+    stock_ledger_flush_interval_ms: int = 50
+
+    # Stock history compaction (python -m app.stock.archive)
+    stock_history_retention_days: int = 365
+    stock_history_compaction_batch: int = 5000
+
+    # Idempotency-Key header on write endpoints
+    idempotency_key_ttl_seconds: int = 24 * 60 * 60
+    idempotency_lock_seconds: int = 60
+    idempotency_sweep_batch: int = 500
+    idempotency_cache_max_bytes: int = 8 * 1024 * 1024
+
+    # Order outbox worker (python -m app.orders.outbox)
+    order_outbox_batch_size: int = 50
+    order_outbox_concurrency: int = 10
+    order_outbox_poll_seconds: float = 1.0
+    order_outbox_lease_seconds: int = 60
+    # Tope de cada lote de envíos; debe ser menor que el lease
+    order_outbox_sync_timeout_seconds: float = 45.0
+    order_outbox_max_attempts: int = 8
+    order_outbox_backoff_seconds: float = 2.0
+    order_outbox_backoff_max_seconds: float = 600.0
+
+    # Cianbox API client (quota values depend on the account plan)
+    cianbox_base_url: str = "https://cianbox.org/micuenta/api/v2"
+    cianbox_access_token: str = ""
+    cianbox_max_connections: int = 20
+    cianbox_max_concurrency: int = 10
+    cianbox_rate_limit_per_second: float = 5.0
+    cianbox_rate_limit_burst: int = 10
+    cianbox_timeout_seconds: float = 15.0
+    cianbox_retries: int = 3
+    cianbox_backoff_seconds: float = 0.5
+
+    # Cianbox catalog ingestion (python -m app.integrations.cianbox.ingest)
+    cianbox_ingest_batch_size: int = 1000
+    cianbox_ingest_concurrency: int = 8
+    cianbox_ingest_overlap_seconds: int = 300
     
     # Cloudinary settings
     cloudinary_cloud_name: str
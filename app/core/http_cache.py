@@ -0,0 +1,60 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request
+
+
+def build_etag(*parts) -> str:
+    """
+    Builds a strong ETag from the values that identify a representation
+    (e.g. resource kind, id and last update).
+    :param parts: Values that change whenever the representation changes
+    :return: Quoted ETag value
+    """
+    raw = ":".join(
+        part.isoformat() if isinstance(part, datetime) else str(part)
+        for part in parts
+    )
+    return '"' + hashlib.sha1(raw.encode()).hexdigest()[:20] + '"'
+
+
+def http_date(value: datetime) -> str:
+    # Las fechas sin zona horaria se guardan en hora local
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def cache_headers(etag: str, last_modified: datetime) -> dict[str, str]:
+    return {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": "no-cache",
+    }
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """
+    Evaluates the conditional headers of a GET request.
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110).
+    :param request: Incoming request
+    :param etag: Current ETag of the resource
+    :param last_modified: Current last modification date of the resource
+    :return: True when the client copy is still valid and a 304 can be sent
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in candidates or etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+        return modified <= since
+
+    return False
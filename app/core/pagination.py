@@ -0,0 +1,110 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Hashable
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.cache import LRUCache, versions
+from app.core.exceptions import BadRequestException
+
+COUNT_MODES = ("exact", "estimate", "none")
+
+count_cache = LRUCache(max_bytes=1_000_000, ttl_seconds=300, max_entries=10_000)
+
+
+def encode_cursor(value: Any, last_id: int) -> str:
+    """
+    Encodes the sort value and id of the last row of a page into an opaque cursor.
+    :param value: Value of the ordering column for the last row
+    :param last_id: ID of the last row (tie breaker)
+    :return: URL-safe cursor string
+    """
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    raw = json.dumps([value, last_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[Any, int]:
+    """
+    Decodes a cursor created by `encode_cursor`.
+    :param cursor: Cursor string received from the client
+    :return: Tuple containing the sort value and the id of the last row
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if isinstance(value, dict) and "dt" in value:
+            value = datetime.fromisoformat(value["dt"])
+        # Un cursor adulterado puede traer listas u objetos que no se pueden comparar
+        if isinstance(value, bool) or not isinstance(value, (str, int, float, datetime)):
+            raise ValueError("Invalid cursor value")
+        if isinstance(last_id, bool) or not isinstance(last_id, int):
+            raise ValueError("Invalid cursor id")
+        return value, last_id
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise BadRequestException("Invalid cursor")
+
+
+def keyset_filter(
+    column: ColumnElement, id_column: ColumnElement, cursor: str, descending: bool
+) -> ColumnElement:
+    """
+    Builds the WHERE clause that continues a keyset page after `cursor`.
+    Rows are ordered by (column, id) in the same direction, so the page starts
+    right after the last (value, id) pair of the previous page. The pair is
+    compared as a row value so the database can seek a (column, id) index.
+    :param column: Column the results are ordered by
+    :param id_column: Primary key column used as tie breaker
+    :param cursor: Cursor returned with the previous page
+    :param descending: Whether the ordering is descending
+    :return: SQL expression to be used as a filter
+    """
+    value, last_id = decode_cursor(cursor)
+
+    if column is id_column:
+        return id_column < last_id if descending else id_column > last_id
+
+    if descending:
+        return tuple_(column, id_column) < tuple_(value, last_id)
+    return tuple_(column, id_column) > tuple_(value, last_id)
+
+
+def cached_count(
+    session: Session,
+    table: str,
+    predicate: Hashable,
+    count: Callable[[], int],
+    mode: str = "exact",
+) -> int | None:
+    """
+    Returns the number of rows matching a filter predicate, caching the result.
+    Exact counts are keyed by the table version, so any write to the table
+    (see `app.core.cache.versions`) invalidates them. Estimates accept the
+    last count seen for the same predicate even if the table changed since.
+    :param session: Session used to read the table version
+    :param table: Name of the table whose version invalidates the count
+    :param predicate: Hashable description of the filters applied
+    :param count: Function that runs the actual count query
+    :param mode: 'exact', 'estimate' or 'none'
+    :return: Number of rows, or None when mode is 'none'
+    """
+    if mode == "none":
+        return None
+
+    exact_key = ("exact", table, versions.get(session, table), predicate)
+    estimate_key = ("estimate", table, predicate)
+
+    total = count_cache.get(exact_key)
+    if total is None and mode == "estimate":
+        total = count_cache.get(estimate_key)
+
+    if total is None:
+        total = count()
+        count_cache.set(exact_key, total)
+        count_cache.set(estimate_key, total)
+
+    return total
@@ -0,0 +1,168 @@
+from typing import Any, Callable
+
+from sqlalchemy import Connection, Select, Table, and_, bindparam, insert, select as sql_select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql.dml import Insert
+
+DIALECT_INSERTS: dict[str, Callable[[Table], Insert]] = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def upsert(
+    dialect_name: str,
+    table: Table,
+    index_elements: list[str],
+    update_columns: list[str],
+    select: Select | None = None,
+    update_values: Callable[[Table], dict[str, ColumnElement]] | None = None,
+) -> "Insert | UpdateThenInsert":
+    """
+    Builds an INSERT ... ON CONFLICT DO UPDATE statement for the dialect.
+    Rows come from the values passed on execution or, if given, from a
+    SELECT whose labels match the table column names. With SQLite the SELECT
+    must have a WHERE clause, otherwise ON CONFLICT is parsed as a join.
+    Other dialects get an `UpdateThenInsert` with the same behaviour; run
+    the result with `execute_upsert` so both work.
+    :param dialect_name: SQLAlchemy dialect name (e.g. 'sqlite')
+    :param table: Table to insert into
+    :param index_elements: Columns of the unique constraint that may conflict
+    :param update_columns: Columns overwritten with the new values on conflict
+    :param select: Optional SELECT providing the rows
+    :param update_values: Optional function receiving the `excluded` row and
+        returning extra SET expressions (they override `update_columns`)
+    :return: Statement ready to pass to `execute_upsert`
+    """
+    if dialect_name not in DIALECT_INSERTS:
+        return UpdateThenInsert(table, index_elements, update_columns, select, update_values)
+
+    statement = DIALECT_INSERTS[dialect_name](table)
+    if select is not None:
+        statement = statement.from_select(
+            [column.key for column in select.selected_columns], select
+        )
+    set_ = {name: statement.excluded[name] for name in update_columns}
+    if update_values is not None:
+        set_.update(update_values(statement.excluded))
+    return statement.on_conflict_do_update(index_elements=index_elements, set_=set_)
+
+
+def execute_upsert(
+    bind: Session | Connection,
+    statement: "Insert | UpdateThenInsert",
+    parameters: dict | list[dict] | None = None,
+):
+    """
+    Executes a statement built by `upsert`, natively or with the fallback.
+    :param bind: Session or connection whose transaction the upsert joins
+    :param statement: Result of `upsert` (optionally with `.returning(...)`)
+    :param parameters: Row or rows to upsert, unless the statement has a SELECT
+    :return: Result with `rowcount` and, with RETURNING, the rows from `all()`
+    """
+    if isinstance(statement, UpdateThenInsert):
+        connection = bind.connection() if isinstance(bind, Session) else bind
+        return statement.execute(connection, parameters)
+    return bind.execute(statement, parameters)
+
+
+class UpsertResult:
+    def __init__(self, rowcount: int, rows: list):
+        self.rowcount = rowcount
+        self._rows = rows
+
+    def all(self) -> list:
+        return self._rows
+
+
+class _Excluded:
+    # La fila nueva llega como parámetros: excluded.col es :new_col en el UPDATE
+    def __init__(self, table: Table):
+        self._table = table
+
+    def __getitem__(self, name: str):
+        return bindparam(f"new_{name}", type_=self._table.c[name].type)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+
+class UpdateThenInsert:
+    """
+    Portable upsert for dialects without ON CONFLICT: every row is first
+    updated by its unique key and inserted if nothing matched. An insert that
+    loses the race against a concurrent one runs in a savepoint and falls
+    back to the update, so the result matches the native statement.
+    """
+
+    def __init__(
+        self,
+        table: Table,
+        index_elements: list[str],
+        update_columns: list[str],
+        select: Select | None = None,
+        update_values: Callable[[Any], dict[str, ColumnElement]] | None = None,
+        returning: tuple = (),
+    ):
+        self.table = table
+        self.index_elements = index_elements
+        self.update_columns = update_columns
+        self.select = select
+        self.update_values = update_values
+        self._returning = returning
+
+    def returning(self, *columns) -> "UpdateThenInsert":
+        return UpdateThenInsert(
+            self.table,
+            self.index_elements,
+            self.update_columns,
+            self.select,
+            self.update_values,
+            returning=columns,
+        )
+
+    def execute(
+        self, connection: Connection, parameters: dict | list[dict] | None = None
+    ) -> UpsertResult:
+        if self.select is not None:
+            rows = [dict(row._mapping) for row in connection.execute(self.select)]
+        elif isinstance(parameters, dict):
+            rows = [parameters]
+        else:
+            rows = list(parameters or [])
+
+        key = and_(
+            *(
+                self.table.c[name] == bindparam(f"key_{name}", type_=self.table.c[name].type)
+                for name in self.index_elements
+            )
+        )
+        returned = []
+        for row in rows:
+            params = {f"new_{name}": value for name, value in row.items()}
+            params.update({f"key_{name}": row[name] for name in self.index_elements})
+            if not self._update(connection, key, row, params):
+                try:
+                    with connection.begin_nested():
+                        connection.execute(insert(self.table), row)
+                except IntegrityError:
+                    # Otra transacción insertó la misma clave entre el UPDATE y el INSERT
+                    self._update(connection, key, row, params)
+            if self._returning:
+                returned.append(
+                    connection.execute(sql_select(*self._returning).where(key), params).one()
+                )
+        return UpsertResult(len(rows), returned)
+
+    def _update(self, connection: Connection, key, row: dict, params: dict) -> bool:
+        excluded = _Excluded(self.table)
+        values = {name: excluded[name] for name in self.update_columns if name in row}
+        if self.update_values is not None:
+            values.update(self.update_values(excluded))
+        statement = self.table.update().where(key).values(values)
+        return connection.execute(statement, params).rowcount > 0
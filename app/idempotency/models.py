@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Index, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Response stored for an Idempotency-Key. Rows without status_code belong
+    to a request still running; they expire after a short lease.
+    """
+
+    __tablename__ = "idempotency_keys"
+    # Barrido de claves vencidas por lotes
+    __table_args__ = (Index("ix_idempotency_keys_expires_at", "expires_at"),)
+
+    # sha256 del alcance (endpoint y usuario) y la clave enviada por el cliente
+    key_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[int] = mapped_column(nullable=True)
+    response_body: Mapped[str] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=datetime.now, server_default=func.now()
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
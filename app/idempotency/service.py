@@ -0,0 +1,243 @@
+import hashlib
+import json
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Callable, NamedTuple, Type
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core import db_connection
+from app.core.cache import LRUCache
+from app.core.config import get_settings
+from app.core.exceptions import ConflictException, UnprocessableEntityException
+from app.core.logger import setup_logger
+from app.idempotency.models import IdempotencyKey
+
+db: Session = db_connection.session
+logger = setup_logger(__name__)
+settings = get_settings()
+
+REPLAY_HEADER = "Idempotent-Replayed"
+
+# Respuestas ya guardadas: las repeticiones recientes no consultan la base
+response_cache = LRUCache(
+    max_bytes=settings.idempotency_cache_max_bytes,
+    ttl_seconds=settings.idempotency_key_ttl_seconds,
+)
+
+
+class StoredResponse(NamedTuple):
+    request_hash: str
+    status_code: int
+    body: str
+
+
+def idempotent(
+    key: str | None,
+    scope: str,
+    payload: Any,
+    operation: Callable[[], Any],
+    response_model: Type[BaseModel],
+    status_code: int = 200,
+) -> Any:
+    """
+    Runs a write operation at most once per Idempotency-Key.
+    The first request claims the key, runs the operation and stores its
+    response in the operation's own transaction, so the write and the stored
+    response are committed together or not at all; a repeated request with
+    the same key and payload gets the stored response back without running
+    the operation again. If the operation fails the key is released so the
+    client can retry.
+    :param key: Value of the Idempotency-Key header, or None to run normally
+    :param scope: Endpoint (and user) the key belongs to
+    :param payload: JSON-serializable request data, to detect reused keys
+    :param operation: Function performing the write in `db` without committing
+        it and returning the response
+    :param response_model: Schema used to serialize the response
+    :param status_code: Status code of a successful response
+    :return: The operation result, or a JSONResponse replaying the stored one
+    """
+    if key is None:
+        try:
+            result = operation()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return result
+
+    key_hash = _hash(f"{scope}\n{key}")
+    request_hash = _hash(json.dumps(payload, sort_keys=True, default=str))
+
+    stored = _lookup(key_hash)
+    if stored is not None:
+        return _replay(stored, request_hash)
+
+    if not _claim(key_hash, request_hash):
+        stored = _lookup(key_hash)
+        if stored is None:
+            logger.error(f"Idempotency key for {scope} is already in use by a running request")
+            raise ConflictException("A request with this Idempotency-Key is still in progress")
+        return _replay(stored, request_hash)
+
+    try:
+        result = operation()
+        body = response_model.model_validate(result).model_dump_json()
+        stored = StoredResponse(request_hash, status_code, body)
+        _complete(key_hash, stored)
+        db.commit()
+    except Exception:
+        db.rollback()
+        _release(key_hash)
+        raise
+
+    response_cache.set(key_hash, stored, size=len(stored.body))
+    return result
+
+
+def sweep_expired_keys(session: Session, limit: int = 1000) -> int:
+    """
+    Deletes up to `limit` expired keys, oldest first. The index on expires_at
+    keeps each sweep proportional to the rows it deletes.
+    :return: Number of keys deleted
+    """
+    expired = (
+        select(IdempotencyKey.key_hash)
+        .where(IdempotencyKey.expires_at <= datetime.now())
+        .order_by(IdempotencyKey.expires_at)
+        .limit(limit)
+    )
+    return session.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.key_hash.in_(expired))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def _hash(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def _lookup(key_hash: str) -> StoredResponse | None:
+    stored = response_cache.get(key_hash)
+    if stored is not None:
+        return stored
+
+    now = datetime.now()
+    row = db.execute(
+        select(
+            IdempotencyKey.request_hash,
+            IdempotencyKey.status_code,
+            IdempotencyKey.response_body,
+            IdempotencyKey.expires_at,
+        ).where(
+            IdempotencyKey.key_hash == key_hash,
+            IdempotencyKey.status_code.is_not(None),
+            IdempotencyKey.expires_at > now,
+        )
+    ).one_or_none()
+    db.rollback()
+    if row is None:
+        return None
+
+    stored = StoredResponse(row.request_hash, row.status_code, row.response_body)
+    # La copia en memoria vence junto con la clave
+    response_cache.set(
+        key_hash,
+        stored,
+        size=len(stored.body),
+        ttl_seconds=(row.expires_at - now).total_seconds(),
+    )
+    return stored
+
+
+def _claim(key_hash: str, request_hash: str) -> bool:
+    now = datetime.now()
+    try:
+        # Una clave vencida (o un pedido que nunca terminó) se puede volver a usar
+        db.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.key_hash == key_hash, IdempotencyKey.expires_at <= now)
+            .execution_options(synchronize_session=False)
+        )
+        db.add(
+            IdempotencyKey(
+                key_hash=key_hash,
+                request_hash=request_hash,
+                created_at=now,
+                expires_at=now + timedelta(seconds=settings.idempotency_lock_seconds),
+            )
+        )
+        db.flush()
+        sweep_expired_keys(db, limit=settings.idempotency_sweep_batch)
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
+        return False
+
+
+def _complete(key_hash: str, stored: StoredResponse) -> None:
+    # Se escribe en la transacción de la operación; la confirma quien llama
+    db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key_hash == key_hash)
+        .values(
+            status_code=stored.status_code,
+            response_body=stored.body,
+            expires_at=datetime.now() + timedelta(seconds=settings.idempotency_key_ttl_seconds),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _release(key_hash: str) -> None:
+    try:
+        db.execute(
+            delete(IdempotencyKey)
+            .where(
+                IdempotencyKey.key_hash == key_hash,
+                IdempotencyKey.status_code.is_(None),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error releasing idempotency key: {str(e)}")
+
+
+def _replay(stored: StoredResponse, request_hash: str) -> JSONResponse:
+    if stored.request_hash != request_hash:
+        logger.error("Idempotency key reused with a different request body")
+        raise UnprocessableEntityException(
+            "This Idempotency-Key was already used with a different request"
+        )
+    return JSONResponse(
+        content=json.loads(stored.body),
+        status_code=stored.status_code,
+        headers={REPLAY_HEADER: "true"},
+    )
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.idempotency.service sweep
+    import app.models  # noqa: F401
+
+    if sys.argv[1:] != ["sweep"]:
+        print("Usage: python -m app.idempotency.service sweep")
+        sys.exit(1)
+
+    session = db_connection.session
+    total = 0
+    while True:
+        deleted = sweep_expired_keys(session, limit=settings.idempotency_sweep_batch)
+        session.commit()
+        total += deleted
+        if deleted < settings.idempotency_sweep_batch:
+            break
+    print(f"Expired idempotency keys deleted: {total}")
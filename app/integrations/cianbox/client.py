@@ -0,0 +1,246 @@
+import asyncio
+import random
+import time
+from typing import Any
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+PRODUCTS_ENDPOINT = "pv_productos"
+ORDERS_ENDPOINT = "pv_pedidos"
+
+# El listado de productos devuelve páginas grandes; los pedidos deben fallar rápido
+ENDPOINT_TIMEOUTS: dict[str, httpx.Timeout] = {
+    PRODUCTS_ENDPOINT: httpx.Timeout(30.0, connect=5.0),
+    ORDERS_ENDPOINT: httpx.Timeout(10.0, connect=5.0),
+}
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Errores en los que el pedido no llegó a enviarse
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class CianboxError(Exception):
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TokenBucket:
+    """
+    Async token bucket: allows `rate` requests per second on average with
+    bursts of up to `capacity` requests.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class CianboxClient:
+    """
+    Async client for the Cianbox API.
+
+    A single `httpx.AsyncClient` keeps a pool of keep-alive connections.
+    Requests are bounded by a semaphore (`max_concurrency`) and a token
+    bucket that keeps them within the account quota. Transport errors,
+    timeouts, 429 and 5xx responses are retried with exponential backoff
+    and full jitter, honouring Retry-After when the server sends it; orders
+    are only retried when they never reached Cianbox (see `create_order`).
+
+    Use it as an async context manager, or call `aclose()` when done.
+    """
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        access_token: str | None = None,
+        max_connections: int | None = None,
+        max_concurrency: int | None = None,
+        rate_per_second: float | None = None,
+        burst: int | None = None,
+        retries: int | None = None,
+        backoff_seconds: float | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        max_connections = max_connections or settings.cianbox_max_connections
+        self.access_token = access_token if access_token is not None else settings.cianbox_access_token
+        self.retries = settings.cianbox_retries if retries is None else retries
+        self.backoff_seconds = (
+            settings.cianbox_backoff_seconds if backoff_seconds is None else backoff_seconds
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency or settings.cianbox_max_concurrency)
+        self._bucket = TokenBucket(
+            rate_per_second or settings.cianbox_rate_limit_per_second,
+            burst or settings.cianbox_rate_limit_burst,
+        )
+        self._http = httpx.AsyncClient(
+            base_url=(base_url or settings.cianbox_base_url).rstrip("/") + "/",
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=30.0,
+            ),
+            timeout=httpx.Timeout(settings.cianbox_timeout_seconds),
+            transport=transport,
+        )
+
+    async def __aenter__(self) -> "CianboxClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+    async def list_products(
+        self, page: int = 1, updated_since: str | None = None, limit: int | None = None
+    ) -> dict:
+        """
+        Fetches a page of `pv_productos`.
+        :param page: Page number, starting at 1
+        :param updated_since: Only products updated at or after this 'YYYY-MM-DD HH:MM:SS'
+        :param limit: Page size, if the account allows choosing it
+        :return: Decoded response with `page`, `total_pages` and `body`
+        """
+        params: dict[str, Any] = {"page": page}
+        if updated_since is not None:
+            params["updated"] = updated_since
+        if limit is not None:
+            params["limit"] = limit
+        return await self.request("GET", PRODUCTS_ENDPOINT, params=params)
+
+    async def find_order(self, reference: str) -> dict | None:
+        """
+        Looks an order up in `pv_pedidos` by its `referencia`.
+        :param reference: Reference the order was sent with
+        :return: The order as stored by Cianbox, or None if it has none
+        """
+        data = await self.request("GET", ORDERS_ENDPOINT, params={"referencia": reference})
+        return next(iter(data.get("body") or []), None)
+
+    async def create_order(self, payload: dict, reference: str | None = None) -> dict:
+        """
+        Sends an order to `pv_pedidos`. A POST is not idempotent, so it is
+        only retried when it never reached Cianbox; after a timeout or a 5xx
+        the order may exist already and the error is raised instead. With a
+        `reference` the order is looked up first and only sent if Cianbox
+        does not have it, so resending after such an error creates no duplicate.
+        :param payload: Order in the Cianbox format
+        :param reference: Value of `referencia` in the payload
+        :return: The order as stored by Cianbox
+        """
+        if reference is not None:
+            existing = await self.find_order(reference)
+            if existing is not None:
+                logger.info(f"Order {reference} already exists in Cianbox, not resent")
+                return existing
+        headers = {"Idempotency-Key": reference} if reference else None
+        data = await self.request(
+            "POST", ORDERS_ENDPOINT, json=payload, headers=headers, idempotent=False
+        )
+        return data.get("body") or {}
+
+    async def request(
+        self,
+        method: str,
+        endpoint: str,
+        params: dict | None = None,
+        json: Any = None,
+        headers: dict | None = None,
+        idempotent: bool = True,
+    ) -> dict:
+        """
+        Sends a request to a Cianbox module with rate limiting, bounded
+        concurrency and retries.
+        :param idempotent: False for requests that must not run twice: they are
+            only retried when Cianbox did not receive them (connection errors, 429)
+        :raises CianboxError: When the request still fails after the retries
+        """
+        params = dict(params or {})
+        if self.access_token:
+            params["access_token"] = self.access_token
+        timeout = ENDPOINT_TIMEOUTS.get(endpoint, httpx.USE_CLIENT_DEFAULT)
+
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            async with self._semaphore:
+                await self._bucket.acquire()
+                try:
+                    response = await self._http.request(
+                        method,
+                        endpoint,
+                        params=params,
+                        json=json,
+                        headers=headers,
+                        timeout=timeout,
+                    )
+                except httpx.TransportError as e:
+                    error = CianboxError(f"{method} {endpoint}: {type(e).__name__} {e}")
+                    unsent = isinstance(e, UNSENT_ERRORS)
+                else:
+                    if response.status_code < 400:
+                        return self._decode(response, method, endpoint)
+                    error = CianboxError(
+                        f"{method} {endpoint}: HTTP {response.status_code}",
+                        status_code=response.status_code,
+                    )
+                    if response.status_code not in RETRYABLE_STATUS:
+                        raise error
+                    unsent = response.status_code == 429
+                    retry_after = _retry_after(response)
+
+            if not idempotent and not unsent:
+                # Pudo haberse procesado: reintentarlo podría duplicarlo
+                logger.error(f"Cianbox request may have been processed, not retried: {error}")
+                raise error
+
+            if attempt == self.retries:
+                logger.error(f"Cianbox request failed after {attempt + 1} attempts: {error}")
+                raise error
+            # Backoff exponencial con jitter completo, fuera del semáforo
+            delay = random.uniform(0, self.backoff_seconds * 2**attempt)
+            await asyncio.sleep(max(delay, retry_after or 0))
+
+        raise CianboxError(f"{method} {endpoint}: no attempts made")
+
+    @staticmethod
+    def _decode(response: httpx.Response, method: str, endpoint: str) -> dict:
+        try:
+            data = response.json()
+        except ValueError:
+            raise CianboxError(f"{method} {endpoint}: invalid JSON response")
+        if isinstance(data, dict) and data.get("status") not in (None, "ok"):
+            raise CianboxError(
+                f"{method} {endpoint}: {data.get('message') or data.get('status')}",
+                status_code=response.status_code,
+            )
+        return data
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
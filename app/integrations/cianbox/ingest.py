@@ -0,0 +1,421 @@
+import argparse
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, NamedTuple
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, case, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.categories.models import Category
+from app.core.cache import versions
+from app.core.config import get_settings
+from app.core.logger import setup_logger
+from app.core.sql import execute_upsert, upsert
+from app.integrations.cianbox.client import PRODUCTS_ENDPOINT, CianboxClient
+from app.integrations.cianbox.models import CianboxSyncState
+from app.integrations.cianbox.schemas import CianboxProduct
+from app.products.cache import bump_catalog_version
+from app.products.models import Product
+from app.products.search import get_search_backend
+from app.stock.alerts import refresh_alerts
+from app.stock.branches import BranchStock, sync_branch_stock
+from app.stock.models import StockHistory
+from app.stock.reservations import release_expired
+from app.stock.snapshots import record_snapshots
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+UPDATED_FORMAT = "%Y-%m-%d %H:%M:%S"
+SYNC_REASON = "Sincronización Cianbox"
+# El stock de Cianbox quedaba por debajo de lo reservado localmente
+SYNC_CLAMPED_REASON = "Sincronización Cianbox (ajustado a reservas)"
+UNCATEGORIZED = "Sin categoría"
+
+_products = Product.__table__
+_categories = Category.__table__
+
+# Columnas que Cianbox pisa en cada corrida; reserved y created_at son locales
+PRODUCT_UPDATE_COLUMNS = [
+    "name",
+    "description",
+    "price",
+    "stock",
+    "min_stock",
+    "critical_stock",
+    "category_id",
+    "is_active",
+    "updated_at",
+]
+
+# Una categoría local con el mismo nombre se vincula en lugar de duplicarse
+LINK_CATEGORY = (
+    _categories.update()
+    .where(
+        _categories.c.name == bindparam("category_name"),
+        _categories.c.cianbox_id.is_(None),
+    )
+    .values(cianbox_id=bindparam("category_cianbox_id"))
+)
+
+
+class IngestionResult(NamedTuple):
+    pages: int
+    upserted: int
+    failed: int
+    high_water_mark: datetime | None
+
+
+async def ingest_products(
+    client: CianboxClient,
+    session_factory: Callable[[], Session],
+    full: bool = False,
+    batch_size: int | None = None,
+    concurrency: int | None = None,
+) -> IngestionResult:
+    """
+    Pulls `pv_productos` into the local catalog.
+
+    Only products updated since the stored high-water mark (minus
+    `cianbox_ingest_overlap_seconds`) are requested, unless `full` is set.
+    Up to `concurrency` pages are fetched ahead while earlier ones are
+    written, and products are upserted by their Cianbox id in batches of
+    `batch_size`, one transaction each, so memory stays bounded by the pages
+    in flight whatever the size of the account. Stock changes are recorded
+    in the stock history like any other movement, and the branch stock
+    (`stock_sucursal`) through app.stock.branches. A stock below the active
+    local reservations is kept at the reserved quantity, and the conflict is
+    logged and recorded in the history with its own reason. The mark only advances
+    once every page has been written; an interrupted run is simply repeated.
+    :param client: Cianbox client
+    :param session_factory: Returns a new database session
+    :param full: Ignore the high-water mark and pull the whole catalog
+    :param batch_size: Products per transaction
+    :param concurrency: Pages fetched ahead of the writer
+    :return: Pages read, products upserted, invalid rows and the new mark
+    """
+    batch_size = batch_size or settings.cianbox_ingest_batch_size
+    concurrency = concurrency or settings.cianbox_ingest_concurrency
+    session = session_factory()
+    try:
+        state = session.get(CianboxSyncState, PRODUCTS_ENDPOINT)
+        mark = state.high_water_mark if state is not None else None
+        since = None
+        if mark is not None and not full:
+            overlap = timedelta(seconds=settings.cianbox_ingest_overlap_seconds)
+            since = (mark - overlap).strftime(UPDATED_FORMAT)
+        session.rollback()
+
+        writer = CatalogWriter(session)
+        first = await client.list_products(1, updated_since=since)
+        total_pages = first.get("total_pages") or 1
+        next_pages = iter(range(2, total_pages + 1))
+        in_flight: deque[asyncio.Task] = deque()
+
+        def fetch_next() -> None:
+            page = next(next_pages, None)
+            if page is not None:
+                in_flight.append(
+                    asyncio.create_task(client.list_products(page, updated_since=since))
+                )
+
+        upserted = failed = 0
+        batch: list[CianboxProduct] = []
+        try:
+            for _ in range(concurrency):
+                fetch_next()
+            body = first.get("body") or []
+            while True:
+                for row in body:
+                    try:
+                        product = CianboxProduct.model_validate(row)
+                    except ValidationError as e:
+                        failed += 1
+                        logger.error(f"Invalid Cianbox product {row.get('id')}: {str(e)}")
+                        continue
+                    mark = product.updated if mark is None else max(mark, product.updated)
+                    batch.append(product)
+                    if len(batch) >= batch_size:
+                        upserted += await asyncio.to_thread(writer.write, batch)
+                        batch = []
+                if not in_flight:
+                    break
+                # Las páginas se consumen en orden; las siguientes ya se están pidiendo
+                body = (await in_flight.popleft()).get("body") or []
+                fetch_next()
+            if batch:
+                upserted += await asyncio.to_thread(writer.write, batch)
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+        await asyncio.to_thread(_save_mark, session, mark, upserted)
+        logger.info(
+            f"Cianbox catalog ingested: {total_pages} pages, {upserted} products, "
+            f"{failed} invalid"
+        )
+        return IngestionResult(total_pages, upserted, failed, mark)
+    finally:
+        session.close()
+
+
+class CatalogWriter:
+    """Upserts batches of Cianbox products, caching the category mapping."""
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.dialect = session.get_bind().dialect.name
+        self.search_backend = get_search_backend(self.dialect)
+        # id_categoria de Cianbox -> id local; hay pocas, se guardan todas
+        self.categories: dict[int, int] = {}
+        self.product_upsert = upsert(
+            self.dialect,
+            _products,
+            ["cianbox_id"],
+            PRODUCT_UPDATE_COLUMNS,
+            # El stock nunca queda por debajo de las reservas activas
+            update_values=lambda excluded: {
+                "stock": case(
+                    (excluded.stock < _products.c.reserved, _products.c.reserved),
+                    else_=excluded.stock,
+                )
+            },
+        ).returning(_products.c.id, _products.c.cianbox_id, _products.c.stock)
+        self.category_upsert = upsert(
+            self.dialect,
+            _categories,
+            ["cianbox_id"],
+            ["name"],
+            update_values=lambda excluded: {"updated_at": func.now()},
+        )
+
+    def write(self, batch: list[CianboxProduct]) -> int:
+        """
+        Upserts a batch of products in one transaction.
+        :return: Number of products written
+        """
+        # Un producto que cambió durante la corrida puede llegar dos veces
+        latest: dict[int, CianboxProduct] = {}
+        for product in batch:
+            if product.id not in latest or product.updated >= latest[product.id].updated:
+                latest[product.id] = product
+
+        session = self.session
+        try:
+            self._resolve_categories(latest.values())
+            existing = session.execute(
+                select(Product.cianbox_id, Product.id, Product.stock)
+                .where(Product.cianbox_id.in_(latest.keys()))
+                .with_for_update()
+            ).all()
+            previous = {row.cianbox_id: row.stock for row in existing}
+            # Las reservas vencidas no deben frenar una baja de stock
+            release_expired(session, [row.id for row in existing])
+            now = datetime.now()
+            rows = execute_upsert(
+                session.connection(),
+                self.product_upsert,
+                [
+                    {
+                        "cianbox_id": product.id,
+                        "name": product.producto,
+                        "description": product.descripcion,
+                        "price": round(product.precio_neto * product.alicuota_iva, 2),
+                        "stock": product.stock_total,
+                        "min_stock": product.cantidad_minima,
+                        "critical_stock": product.cantidad_critica,
+                        "category_id": self.categories[product.id_categoria or 0],
+                        "is_active": product.vigente,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for product in latest.values()
+                ],
+            ).all()
+            ids = {cianbox_id: product_id for product_id, cianbox_id, _ in rows}
+            stored = {cianbox_id: stock for _, cianbox_id, stock in rows}
+
+            clamped = [
+                cianbox_id
+                for cianbox_id, product in latest.items()
+                if stored[cianbox_id] != product.stock_total
+            ]
+            for cianbox_id in clamped:
+                logger.error(
+                    f"Cianbox stock {latest[cianbox_id].stock_total} of product {cianbox_id} "
+                    f"is below its local reservations; stock kept at {stored[cianbox_id]}"
+                )
+            movements = [
+                {
+                    "product_id": ids[cianbox_id],
+                    "quantity": stored[cianbox_id] - previous.get(cianbox_id, 0),
+                    "reason": SYNC_CLAMPED_REASON if cianbox_id in clamped else SYNC_REASON,
+                    "created_at": now,
+                }
+                for cianbox_id in latest
+                if stored[cianbox_id] != previous.get(cianbox_id, 0)
+            ]
+            if movements:
+                session.execute(insert(StockHistory.__table__), movements)
+                if settings.stock_snapshots_incremental:
+                    record_snapshots(session, [row["product_id"] for row in movements])
+
+            # stock_sucursal trae todas las sucursales del producto
+            sync_branch_stock(
+                session,
+                [
+                    BranchStock(
+                        product_id=ids[cianbox_id],
+                        branch_id=branch.id_sucursal,
+                        stock=branch.stock,
+                        reserved=branch.reservado,
+                        available=(
+                            branch.disponible
+                            if branch.disponible is not None
+                            else max(branch.stock - branch.reservado, 0)
+                        ),
+                    )
+                    for cianbox_id, product in latest.items()
+                    for branch in product.stock_sucursal
+                ],
+                replace=ids.values(),
+            )
+
+            product_ids = list(ids.values())
+            self.search_backend.reindex_products(session, product_ids)
+            refresh_alerts(session, product_ids)
+            bump_catalog_version(session)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            # Las categorías creadas en la transacción fallida no existen
+            self.categories.clear()
+            logger.error(f"Error writing Cianbox products batch: {str(e)}")
+            raise
+
+        return len(latest)
+
+    def _resolve_categories(self, products) -> None:
+        names: dict[int, str] = {}
+        for product in products:
+            cianbox_id = product.id_categoria or 0
+            if cianbox_id not in self.categories:
+                name = (product.categoria or "").strip()[:100]
+                if not name:
+                    name = UNCATEGORIZED if cianbox_id == 0 else f"Cianbox {cianbox_id}"
+                names[cianbox_id] = name
+        if not names:
+            return
+
+        connection = self.session.connection()
+        connection.execute(
+            LINK_CATEGORY,
+            [
+                {"category_cianbox_id": cianbox_id, "category_name": name}
+                for cianbox_id, name in names.items()
+            ],
+        )
+        current = dict(
+            self.session.execute(
+                select(Category.cianbox_id, Category.name).where(
+                    Category.cianbox_id.in_(names.keys())
+                )
+            ).all()
+        )
+        names = self._unique_names(names)
+        # Solo se escriben las categorías nuevas o renombradas
+        changed = [
+            {"cianbox_id": cianbox_id, "name": name}
+            for cianbox_id, name in names.items()
+            if current.get(cianbox_id) != name
+        ]
+        if changed:
+            execute_upsert(connection, self.category_upsert, changed)
+            # El conteo cacheado de categorías ya no vale
+            versions.bump(self.session, Category.__tablename__)
+        self.categories.update(
+            self.session.execute(
+                select(Category.cianbox_id, Category.id).where(
+                    Category.cianbox_id.in_(names.keys())
+                )
+            ).all()
+        )
+
+    def _unique_names(self, names: dict[int, str]) -> dict[int, str]:
+        """
+        Keeps each category's Cianbox name unless another category already
+        uses it (categories.name is unique); those get the Cianbox id as a
+        suffix, e.g. "Bebidas (5)".
+        :param names: Cianbox category id -> name sent by Cianbox
+        :return: Cianbox category id -> name to store
+        """
+        candidates = {
+            cianbox_id: (name, _suffixed(name, cianbox_id)) for cianbox_id, name in names.items()
+        }
+        owners = dict(
+            self.session.execute(
+                select(Category.name, Category.cianbox_id).where(
+                    Category.name.in_({name for pair in candidates.values() for name in pair})
+                )
+            ).all()
+        )
+        unique: dict[int, str] = {}
+        used: set[str] = set()
+        for cianbox_id, (name, suffixed) in candidates.items():
+            if owners.get(name, cianbox_id) != cianbox_id or name in used:
+                name = suffixed
+            used.add(name)
+            unique[cianbox_id] = name
+        return unique
+
+
+def _suffixed(name: str, cianbox_id: int) -> str:
+    suffix = f" ({cianbox_id})"
+    return name[: 100 - len(suffix)] + suffix
+
+
+def _save_mark(session: Session, mark: datetime | None, items: int) -> None:
+    try:
+        state = session.get(CianboxSyncState, PRODUCTS_ENDPOINT)
+        if state is None:
+            state = CianboxSyncState(module=PRODUCTS_ENDPOINT)
+            session.add(state)
+        state.high_water_mark = mark
+        state.last_run_at = datetime.now()
+        state.last_run_items = items
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error saving Cianbox sync state: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.integrations.cianbox.ingest [--full] [--base-url URL]
+    import app.models  # noqa: F401
+    from app.core import db_connection
+
+    parser = argparse.ArgumentParser(prog="python -m app.integrations.cianbox.ingest")
+    parser.add_argument("--full", action="store_true")
+    parser.add_argument("--base-url", default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=None)
+    args = parser.parse_args()
+
+    async def main() -> IngestionResult:
+        async with CianboxClient(base_url=args.base_url) as client:
+            return await ingest_products(
+                client,
+                lambda: db_connection.session,
+                full=args.full,
+                batch_size=args.batch_size,
+                concurrency=args.concurrency,
+            )
+
+    result = asyncio.run(main())
+    print(
+        f"Pages: {result.pages}, products: {result.upserted}, invalid: {result.failed}, "
+        f"high-water mark: {result.high_water_mark}"
+    )
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class CianboxSyncState(Base):
+    """
+    Progress of an incremental Cianbox ingestion, one row per module
+    (e.g. 'pv_productos'). The next run only asks for rows updated since
+    `high_water_mark`.
+    """
+
+    __tablename__ = "cianbox_sync_state"
+
+    module: Mapped[str] = mapped_column(String(50), primary_key=True)
+    # Mayor `updated` ingerido en la última corrida completa
+    high_water_mark: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    last_run_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    last_run_items: Mapped[int] = mapped_column(default=0)
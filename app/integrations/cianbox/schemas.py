@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import BaseModel
 
 
@@ -12,3 +14,28 @@ class SyncStatusResponse(BaseModel):
     status: str
     synced_at: str | None = None
     error_message: str | None = None
+
+
+class CianboxBranchStock(BaseModel):
+    id_sucursal: int
+    stock: int = 0
+    reservado: int = 0
+    disponible: int | None = None
+
+
+class CianboxProduct(BaseModel):
+    """Fields of a `pv_productos` row used by the catalog ingestion."""
+
+    id: int
+    updated: datetime
+    producto: str
+    descripcion: str | None = None
+    id_categoria: int | None = None
+    categoria: str | None = None
+    precio_neto: float = 0.0
+    alicuota_iva: float = 1.0
+    stock_total: int = 0
+    cantidad_minima: int = 0
+    cantidad_critica: int = 0
+    vigente: bool = True
+    stock_sucursal: list[CianboxBranchStock] = []
@@ -0,0 +1,213 @@
+"""
+Local stand-in for the Cianbox API, for load tests and offline development.
+
+Serves `pv_productos` pages with the same shape as mock.json and accepts
+`pv_pedidos`, adding configurable latency and a configurable rate of
+503/429 errors. Orders resent with the same Idempotency-Key header are
+acknowledged with the id of the first one and not stored again, and orders
+can be looked up by `referencia` with a GET.
+
+Products are generated on demand from the mock.json template, so the
+catalogue can be as large as needed without holding it in memory. Product
+i (from 0) has id `first_id + i` and is updated one second after product
+i - 1, which keeps the `updated` filter a simple offset.
+
+Uso: python -m app.integrations.cianbox.stub_server [--port 8100]
+     [--products 10000] [--page-size 100] [--latency-ms 50]
+     [--jitter-ms 20] [--error-rate 0.01] [--seed 1]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+MOCK_PATH = Path(__file__).resolve().parents[3] / "mock.json"
+UPDATED_FORMAT = "%Y-%m-%d %H:%M:%S"
+UPDATED_BASE = datetime(2024, 1, 1)
+GENERATED_FIELDS = {
+    "id",
+    "updated",
+    "producto",
+    "id_categoria",
+    "categoria",
+    "codigo_interno",
+    "stock_sucursal",
+    "stock_total",
+    "reservado",
+    "precio_neto",
+}
+
+
+def load_template(path: Path = MOCK_PATH) -> tuple[dict, dict]:
+    """Returns the response envelope and the first product of mock.json."""
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+    product = data.pop("body")[0]
+    return data, product
+
+
+def create_stub_app(
+    products: int = 10_000,
+    page_size: int = 100,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    seed: int | None = None,
+    categories: int = 20,
+    branches: int = 2,
+    first_id: int = 1,
+) -> FastAPI:
+    """
+    Builds the stub application.
+    :param products: Size of the generated catalogue
+    :param page_size: Products per page of `pv_productos`
+    :param latency: Seconds added to every response
+    :param jitter: Maximum random seconds added on top of `latency`
+    :param error_rate: Fraction of requests answered with 503 or 429
+    :param seed: Seed for the latency and error randomness
+    :param categories: Number of distinct categories
+    :param branches: Number of branches in `stock_sucursal`
+    :param first_id: Cianbox id of the first product
+    """
+    envelope, template = load_template()
+    rng = random.Random(seed)
+    order_ids = itertools.count(1)
+    app = FastAPI(title="Cianbox stub")
+    app.state.requests = 0
+    app.state.orders = []
+    order_keys: dict[str, int] = {}
+    order_references: dict[str, int] = {}
+
+    # Los campos que no cambian se serializan una sola vez
+    fixed = {
+        key: value
+        for key, value in template.items()
+        if key not in GENERATED_FIELDS
+    }
+
+    def product(index: int) -> dict:
+        item = dict(fixed)
+        category_id = 1 + index % categories
+        stock = [
+            {
+                "id_sucursal": branch,
+                "stock": (index * 7 + branch * 13) % 100,
+                "reservado": (index + branch) % 3,
+            }
+            for branch in range(1, branches + 1)
+        ]
+        for row in stock:
+            row["disponible"] = max(row["stock"] - row["reservado"], 0)
+        item.update(
+            id=first_id + index,
+            updated=(UPDATED_BASE + timedelta(seconds=index)).strftime(UPDATED_FORMAT),
+            producto=f"PRODUCTO {first_id + index}",
+            id_categoria=category_id,
+            categoria=f"CATEGORIA {category_id}",
+            codigo_interno=f"SKU-{first_id + index:08d}",
+            stock_sucursal=stock,
+            stock_total=sum(row["stock"] for row in stock),
+            reservado=sum(row["reservado"] for row in stock),
+            precio_neto=round(10 + index % 1000 * 0.5, 4),
+        )
+        return item
+
+    async def delay_or_fail() -> JSONResponse | None:
+        app.state.requests += 1
+        if latency or jitter:
+            await asyncio.sleep(latency + rng.uniform(0, jitter))
+        if error_rate and rng.random() < error_rate:
+            if rng.random() < 0.5:
+                return JSONResponse({"status": "error", "message": "Too many requests"}, 429)
+            return JSONResponse({"status": "error", "message": "Service unavailable"}, 503)
+        return None
+
+    @app.get("/pv_productos")
+    async def list_products(page: int = 1, updated: str | None = None, limit: int | None = None):
+        error = await delay_or_fail()
+        if error is not None:
+            return error
+
+        size = min(limit or page_size, page_size)
+        start = 0
+        if updated is not None:
+            since = datetime.strptime(updated, UPDATED_FORMAT)
+            start = min(max(int((since - UPDATED_BASE).total_seconds()), 0), products)
+        remaining = products - start
+        total_pages = max((remaining + size - 1) // size, 1)
+        first = start + (max(page, 1) - 1) * size
+        last = min(first + size, products)
+        # Respuesta serializada a mano: el codificador de FastAPI es el cuello de botella
+        content = {
+            **envelope,
+            "page": page,
+            "total_pages": total_pages,
+            "body": [product(index) for index in range(first, last)],
+        }
+        return Response(json.dumps(content), media_type="application/json")
+
+    @app.get("/pv_pedidos")
+    async def find_orders(referencia: str | None = None):
+        error = await delay_or_fail()
+        if error is not None:
+            return error
+        found = order_references.get(referencia) if referencia is not None else None
+        body = [{"id": found, "referencia": referencia}] if found is not None else []
+        return {"status": "ok", "module": "pv_pedidos", "method": "GET", "body": body}
+
+    @app.post("/pv_pedidos")
+    async def create_order(request: Request):
+        error = await delay_or_fail()
+        if error is not None:
+            return error
+        payload = await request.json()
+        key = request.headers.get("idempotency-key")
+        if key is not None and key in order_keys:
+            order_id = order_keys[key]
+        else:
+            order_id = next(order_ids)
+            app.state.orders.append(payload)
+            if key is not None:
+                order_keys[key] = order_id
+            if payload.get("referencia") is not None:
+                order_references[str(payload["referencia"])] = order_id
+        body = {"id": order_id, "referencia": payload.get("referencia")}
+        return {"status": "ok", "module": "pv_pedidos", "method": "POST", "body": body}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(prog="python -m app.integrations.cianbox.stub_server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_stub_app(
+            products=args.products,
+            page_size=args.page_size,
+            latency=args.latency_ms / 1000,
+            jitter=args.jitter_ms / 1000,
+            error_rate=args.error_rate,
+            seed=args.seed,
+        ),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
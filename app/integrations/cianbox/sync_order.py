@@ -1,40 +1,52 @@
-from app.integrations.cianbox.schemas import SyncResponse, SyncStatusResponse
+import asyncio
+
+from app.integrations.cianbox.client import CianboxClient
+from app.integrations.cianbox.schemas import SyncStatusResponse
+from app.integrations.cianbox.transformers import (
+    order_reference,
+    order_to_cianbox_payload,
+)
 from app.orders.models import Order
 from datetime import datetime
 
 
-def sync_order(order: Order) -> SyncStatusResponse:
+async def send_order(client: CianboxClient, order: Order) -> SyncStatusResponse:
+    """
+    Sends an order to Cianbox through a shared client.
+    :param client: Pooled Cianbox client
+    :param order: Order to send, with its items loaded
+    :return: Result of the sync; errors are reported in the status
+    """
     try:
-        # 1. Preparar los datos a enviar (esto lo veremos más adelante)
-        # data = transform_order_to_cianbox_format(order)
-
-        # 2. Enviar los datos a la API externa
-        # response = send_to_cianbox_api(data)
-        response = SyncResponse.model_validate(
-            {
-                "status_code": 200,  # Simulando una respuesta exitosa
-                "text": "Order synced successfully",
-            }
-        )
-
-        status_code = getattr(response, "status_code", None)
-        if status_code == 200:
-            status = "synced"
-            error_message = None
-        else:
-            status = "error"
-            error_message = f"Error {status_code}: {getattr(response, 'text', '')}"
+        # 1. Preparar los datos a enviar
+        data = order_to_cianbox_payload(order)
+
+        # 2. Enviar los datos a la API externa (reintentos y cuota los maneja el cliente);
+        # si un intento anterior ya lo creó, no se vuelve a enviar
+        await client.create_order(data, reference=order_reference(order))
+        status = "synced"
+        error_message = None
 
     except Exception as e:
         status = "error"
-        error_message = str(e)
+        error_message = str(e) or type(e).__name__
 
     return SyncStatusResponse.model_validate(
         {
             "order_id": order.id,
             "platform": "cianbox",
             "status": status,
-            "synced_at": datetime.now() if status == "synced" else None,
+            "synced_at": datetime.now().isoformat() if status == "synced" else None,
             "error_message": error_message,
         }
     )
+
+
+def sync_order(order: Order) -> SyncStatusResponse:
+    """Blocking version of `send_order`, with a client of its own."""
+
+    async def send() -> SyncStatusResponse:
+        async with CianboxClient() as client:
+            return await send_order(client, order)
+
+    return asyncio.run(send())
@@ -1,5 +1,6 @@
 from app.users.models import User
 from app.customers.models import Customer
+from app.orders.models import Order
 
 
 def user_to_cianbox_payload(user: Customer, ) -> dict:
@@ -17,3 +18,27 @@ def user_to_cianbox_payload(user: Customer, ) -> dict:
         "codigo_postal": int(user.postal_code) if user.postal_code else None,
         "observaciones": user.notes,
     }
+
+
+def order_to_cianbox_payload(order: Order) -> dict:
+    return {
+        "referencia": order_reference(order),
+        "id_cliente": order.user_id,
+        "fecha": order.created_at.strftime("%Y-%m-%d %H:%M:%S") if order.created_at else None,
+        "observaciones": order.observations,
+        "total": order.total_amount,
+        "productos": [
+            {
+                "id_producto": item.product_id,
+                "cantidad": item.quantity,
+                "precio_unitario": item.unit_price,
+                "total": item.total_price,
+            }
+            for item in order.items
+        ],
+    }
+
+
+def order_reference(order: Order) -> str:
+    # Estable entre reintentos y workers: antes de reenviar se busca el pedido por ella
+    return f"pedido-{order.id}"
@@ -1,7 +1,20 @@
 from app.products.models import Product, ProductImage
 from app.categories.models import Category
-from app.stock.models import StockHistory
+from app.stock.models import (
+    ProductBranchStock,
+    ProductBranchStockTotal,
+    StockAlert,
+    StockHistory,
+    StockHistoryArchive,
+    StockLedgerCheckpoint,
+    StockLedgerRejection,
+    StockReservation,
+    StockSnapshot,
+)
 from app.users.models import User
 from app.auth.models import RefreshToken
+from app.core.models import CacheVersion
 from app.customers.models import Customer
+from app.idempotency.models import IdempotencyKey
+from app.integrations.cianbox.models import CianboxSyncState
 from app.orders.models import *
\ No newline at end of file
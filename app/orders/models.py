@@ -1,6 +1,6 @@
 from typing import List
 from app.core.database import Base
-from sqlalchemy import ForeignKey, String
+from sqlalchemy import ForeignKey, Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 
@@ -52,3 +52,27 @@ class SyncStatus(Base):
     error_message: Mapped[str | None] = mapped_column(String, nullable=True)
 
     order: Mapped["Order"] = relationship("Order", back_populates="sync_statuses")
+
+
+class OrderOutbox(Base):
+    """
+    Side effect of an order (e.g. the Cianbox sync) written in the order
+    transaction and carried out later by the outbox worker (app.orders.outbox).
+    """
+
+    __tablename__ = "order_outbox"
+    # Mensajes pendientes cuyo próximo intento ya venció, en orden
+    __table_args__ = (
+        Index("ix_order_outbox_status_available_at", "status", "available_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id"), nullable=False)
+    topic: Mapped[str] = mapped_column(String(50), nullable=False)
+    status: Mapped[str] = mapped_column(String(20), default="pending")  # 'pending', 'done', 'failed'
+    attempts: Mapped[int] = mapped_column(default=0)
+    # Próximo intento; al reclamar un lote se corre hacia adelante (lease)
+    available_at: Mapped[datetime] = mapped_column(default=datetime.now)
+    last_error: Mapped[str | None] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.now)
+    processed_at: Mapped[datetime | None] = mapped_column(nullable=True)
@@ -0,0 +1,266 @@
+import argparse
+import asyncio
+import functools
+import inspect
+import random
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, NamedTuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.config import get_settings
+from app.core.logger import setup_logger
+from app.integrations.cianbox.schemas import SyncStatusResponse
+from app.integrations.cianbox.client import CianboxClient
+from app.integrations.cianbox.sync_order import send_order, sync_order
+from app.orders.models import Order, OrderOutbox, SyncStatus
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+CIANBOX_SYNC = "cianbox.sync"
+
+SyncFunction = Callable[[Order], SyncStatusResponse | Awaitable[SyncStatusResponse]]
+
+
+class ClaimedMessage(NamedTuple):
+    id: int
+    order_id: int
+    attempts: int
+
+
+def enqueue_order_sync(session: Session, order_id: int) -> OrderOutbox:
+    """
+    Adds the Cianbox sync of an order to the outbox, in the caller's
+    transaction, so the message exists if and only if the order does.
+    :param session: Session whose transaction the message joins
+    :param order_id: ID of the order to sync
+    :return: The outbox message
+    """
+    message = OrderOutbox(order_id=order_id, topic=CIANBOX_SYNC, status="pending")
+    session.add(message)
+    return message
+
+
+def claim_batch(session: Session, limit: int, now: datetime | None = None) -> list[ClaimedMessage]:
+    """
+    Claims up to `limit` pending messages whose next attempt is due, oldest
+    first, by moving their `available_at` one lease ahead. A worker that dies
+    mid-batch leaves its messages to be claimed again once the lease expires.
+    The attempt number taken here identifies the claim: results are only
+    recorded while it is still current (see `_record_result`).
+    Commits the claim before returning.
+    :return: Claimed messages, with the number of the attempt about to run
+    """
+    now = now or datetime.now()
+    due = (OrderOutbox.status == "pending") & (OrderOutbox.available_at <= now)
+    # En PostgreSQL los workers concurrentes saltan las filas que otro está reclamando
+    candidates = (
+        select(OrderOutbox.id)
+        .where(due)
+        .order_by(OrderOutbox.available_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    rows = session.execute(
+        update(OrderOutbox)
+        .where(OrderOutbox.id.in_(candidates), due)
+        .values(
+            available_at=now + timedelta(seconds=settings.order_outbox_lease_seconds),
+            attempts=OrderOutbox.attempts + 1,
+        )
+        .returning(OrderOutbox.id, OrderOutbox.order_id, OrderOutbox.attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    session.commit()
+    return [ClaimedMessage(*row) for row in rows]
+
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with jitter for the retry after `attempts` failures."""
+    delay = min(
+        settings.order_outbox_backoff_max_seconds,
+        settings.order_outbox_backoff_seconds * 2 ** (attempts - 1),
+    )
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+async def process_batch(
+    session_factory: Callable[[], Session],
+    sync: SyncFunction = sync_order,
+    limit: int | None = None,
+) -> int:
+    """
+    Claims a batch of outbox messages, syncs their orders concurrently
+    (bounded by `order_outbox_concurrency`) and records the results.
+    Syncs still running after `order_outbox_sync_timeout_seconds` (shorter
+    than the lease) count as failed, so the results are recorded before
+    another worker can claim the messages again.
+    Failed syncs are retried with backoff until `order_outbox_max_attempts`.
+    :param session_factory: Returns a new database session
+    :param sync: Function sending an order to Cianbox; coroutine functions
+        are awaited on the loop, blocking ones run in a thread
+    :param limit: Maximum number of messages to claim
+    :return: Number of messages processed
+    """
+    session = session_factory()
+    try:
+        claimed = claim_batch(session, limit or settings.order_outbox_batch_size)
+        if not claimed:
+            return 0
+
+        orders = {
+            order.id: order
+            for order in session.scalars(
+                select(Order)
+                .options(selectinload(Order.items))
+                .where(Order.id.in_({message.order_id for message in claimed}))
+            )
+        }
+        semaphore = asyncio.Semaphore(settings.order_outbox_concurrency)
+        is_async = inspect.iscoroutinefunction(sync)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.order_outbox_sync_timeout_seconds
+
+        async def run(message: ClaimedMessage) -> SyncStatusResponse | Exception:
+            async with semaphore:
+                order = orders[message.order_id]
+                try:
+                    if is_async:
+                        call = sync(order)
+                    else:
+                        # sync_order es bloqueante: corre en un hilo para no frenar el loop
+                        call = asyncio.to_thread(sync, order)
+                    return await asyncio.wait_for(call, max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    return TimeoutError("Sync did not finish before the lease expired")
+                except Exception as e:
+                    return e
+
+        results = await asyncio.gather(*(run(message) for message in claimed))
+        for message, result in zip(claimed, results):
+            _record_result(session, message, result)
+        session.commit()
+        return len(claimed)
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error processing order outbox batch: {str(e)}")
+        raise
+    finally:
+        session.close()
+
+
+async def run_worker(
+    session_factory: Callable[[], Session],
+    stop: asyncio.Event,
+    sync: SyncFunction = sync_order,
+) -> None:
+    """
+    Processes outbox batches until `stop` is set, waiting
+    `order_outbox_poll_seconds` whenever there is nothing due.
+    """
+    while not stop.is_set():
+        try:
+            processed = await process_batch(session_factory, sync)
+        except Exception:
+            processed = 0
+        if not processed:
+            try:
+                await asyncio.wait_for(stop.wait(), settings.order_outbox_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+
+def _record_result(
+    session: Session, message: ClaimedMessage, result: SyncStatusResponse | Exception
+) -> None:
+    now = datetime.now()
+    if isinstance(result, Exception):
+        error = str(result) or type(result).__name__
+    elif result.status != "synced":
+        error = result.error_message or f"Sync status {result.status}"
+    else:
+        error = None
+
+    if error is None:
+        values = {"status": "done", "processed_at": now, "last_error": None}
+        sync_status = ("synced", now, None)
+    elif message.attempts >= settings.order_outbox_max_attempts:
+        values = {"status": "failed", "processed_at": now, "last_error": error}
+        sync_status = ("error", None, error)
+    else:
+        values = {
+            "available_at": now + timedelta(seconds=backoff_delay(message.attempts)),
+            "last_error": error,
+        }
+        sync_status = ("pending", None, error)
+
+    # Solo el dueño del reclamo vigente registra el resultado
+    owned = session.execute(
+        update(OrderOutbox)
+        .where(
+            OrderOutbox.id == message.id,
+            OrderOutbox.status == "pending",
+            OrderOutbox.attempts == message.attempts,
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not owned:
+        logger.warning(
+            f"Outbox message {message.id} was claimed again; discarding the result "
+            f"of attempt {message.attempts}"
+        )
+        return
+
+    if error is not None and message.attempts >= settings.order_outbox_max_attempts:
+        logger.error(
+            f"Order {message.order_id} could not be synced after {message.attempts} attempts: {error}"
+        )
+    _update_sync_status(session, message.order_id, *sync_status)
+
+
+def _update_sync_status(
+    session: Session,
+    order_id: int,
+    status: str,
+    synced_at: datetime | None,
+    error_message: str | None,
+) -> None:
+    session.execute(
+        update(SyncStatus)
+        .where(SyncStatus.order_id == order_id, SyncStatus.platform == "cianbox")
+        .values(status=status, synced_at=synced_at, error_message=error_message)
+        .execution_options(synchronize_session=False)
+    )
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.orders.outbox [--workers N]
+    import app.models  # noqa: F401
+    from app.core import db_connection
+
+    parser = argparse.ArgumentParser(prog="python -m app.orders.outbox")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    async def main() -> None:
+        stop = asyncio.Event()
+        logger.info(f"Order outbox worker started with {args.workers} workers")
+        # Un solo cliente para todos los workers: comparten conexiones y cuota
+        async with CianboxClient() as client:
+            sync = functools.partial(send_order, client)
+            workers = [
+                run_worker(lambda: db_connection.session, stop, sync)
+                for _ in range(args.workers)
+            ]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                stop.set()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Order outbox worker stopped")
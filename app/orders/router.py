@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Header, status
 from app.core.exceptions import NotFoundException, UnauthorizedException
+from app.idempotency.service import idempotent
 from app.integrations.cianbox.schemas import SyncStatusResponse
 from app.orders.models import Order
 from app.orders.schemas import OrderCreate, OrderResponse
@@ -16,11 +17,21 @@ router = APIRouter(prefix="/orders", tags=["Orders"])
 def create_order_endpoint(
     order_data: OrderCreate,
     current_user: User = Depends(get_current_user),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
 ):
-    try:
-        return service.create_order(order_data, current_user.id)
-    except ValueError as e:
-        raise NotFoundException(str(e))
+    def create():
+        try:
+            return service.create_order(order_data, current_user.id, commit=False)
+        except ValueError as e:
+            raise NotFoundException(str(e))
+
+    return idempotent(
+        idempotency_key,
+        scope=f"POST /orders/ user:{current_user.id}",
+        payload=order_data.model_dump(mode="json"),
+        operation=create,
+        response_model=OrderResponse,
+    )
 
 
 @router.get(
@@ -1,68 +1,81 @@
 from datetime import datetime
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session, joinedload
 from app.core.exceptions import BadRequestException, NotFoundException, UnauthorizedException
-from app.integrations.cianbox.schemas import SyncResponse, SyncStatusResponse
-from app.integrations.cianbox.sync_order import sync_order
-from app.orders.models import Order, OrderItem, SyncStatus
+from app.orders.models import Order, OrderItem, OrderOutbox, SyncStatus
+from app.orders.outbox import CIANBOX_SYNC, enqueue_order_sync
 from app.orders.schemas import OrderCreate
+from app.products.cache import bump_catalog_version
 from app.products.models import Product
+from app.stock.reservations import consume_order_lines
 from app.users.models import User
 from app.users.roles import RoleEnum
 from app.core import db_connection
 
 db: Session = db_connection.session
 
-def create_order(order_data: OrderCreate, user_id: int) -> Order:
+def create_order(order_data: OrderCreate, user_id: int, commit: bool = True) -> Order:
+    """
+    Creates an order and takes its stock in a single transaction.
+    The products are resolved with one IN query and the stock, history and
+    items are written with executemany, so the number of statements does not
+    grow with the number of lines. The Cianbox sync is queued in the outbox
+    in the same transaction and runs after the response.
+    :param order_data: Lines and observations of the order
+    :param user_id: ID of the user placing the order
+    :param commit: False leaves the transaction open for the caller
+    :return: The created order
+    """
+    # Una sola consulta para validar todos los productos del pedido
+    product_ids = {item.product_id for item in order_data.items}
+    found = set(db.scalars(select(Product.id).where(Product.id.in_(product_ids))))
+    missing = next(
+        (item.product_id for item in order_data.items if item.product_id not in found), None
+    )
+    if missing is not None:
+        raise ValueError(f"Product with ID {missing} not found")
+
     new_order = Order(
         user_id=user_id,
-        total_amount=0.0,  # Inicialmente 0, se actualizará después
+        total_amount=sum(item.quantity * item.unit_price for item in order_data.items),
         observations=order_data.observations,
     )
-
-    db.add(new_order)
-    db.flush()  # Para obtener el ID del pedido antes de agregar los ítems
-
-    total = 0
-    for item in order_data.items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
-        if not product:
-            raise ValueError(f"Product with ID {item.product_id} not found")
-
-        subtotal = item.quantity * item.unit_price
-        total += subtotal
-
-        order_item = OrderItem(
-            order_id=new_order.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            unit_price=item.unit_price,
-            total_price=subtotal,
+    try:
+        db.add(new_order)
+        db.flush()  # Para obtener el ID del pedido antes de agregar los ítems
+
+        # Consume las reservas del usuario y descuenta el stock del pedido
+        consume_order_lines(
+            db,
+            user_id,
+            [(item.product_id, item.quantity) for item in order_data.items],
+            f"Pedido #{new_order.id}",
         )
-        db.add(order_item)
-
-    sync = SyncStatus(order_id=new_order.id, platform="cianbox", status="pending")
-    db.add(sync)
-
-    new_order.total_amount = total
-    db.commit()
+        if order_data.items:
+            db.execute(
+                insert(OrderItem.__table__),
+                [
+                    {
+                        "order_id": new_order.id,
+                        "product_id": item.product_id,
+                        "quantity": item.quantity,
+                        "unit_price": item.unit_price,
+                        "total_price": item.quantity * item.unit_price,
+                    }
+                    for item in order_data.items
+                ],
+            )
+        # La sincronización con Cianbox la hace el worker del outbox (app.orders.outbox)
+        db.add(SyncStatus(order_id=new_order.id, platform="cianbox", status="pending"))
+        enqueue_order_sync(db, new_order.id)
+        bump_catalog_version(db)
+        if commit:
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
     db.refresh(new_order)
 
-    # Llamada a la función de sincronización
-    order_sinc_response: SyncStatusResponse = sync_order(new_order)
-
-    db.add(
-        SyncStatus(
-            order_id=new_order.id,
-            platform="cianbox",
-            status=order_sinc_response.status,
-            synced_at=(
-                datetime.now() if order_sinc_response.status == "synced" else None
-            ),
-            error_message=order_sinc_response.error_message,
-        )
-    )
-    db.commit()
-
     return new_order
 
 
@@ -106,24 +119,27 @@ def sync_order_with_cianbox(order_id: int):
             f"No synchronization status found for order ID {order_id} on Cianbox"
         )
 
-    if sync_status.status == "success":
+    if sync_status.status in ("success", "synced"):
         raise BadRequestException(
             f"Order ID {order_id} has already been synchronized with Cianbox"
         )
 
-    try:
-        # Lógica para transformar y enviar a Cianbox (aquí llamás a tu adaptador)
-        # payload = transform_order_to_cianbox(order)
-        payload = order
-        sync_order(payload)  # Este sería tu cliente HTTP
-
-        sync_status.status = "success"
-        sync_status.error_message = "Synchronized successfully"
-        sync_status.synced_at = datetime.now()
-    except Exception as e:
-        sync_status.status = "failed"
-        sync_status.error_message = str(e)
-        sync_status.synced_at = datetime.now()
+    # Se vuelve a encolar en el outbox; el worker registra el resultado
+    message = db.scalar(
+        select(OrderOutbox).where(
+            OrderOutbox.order_id == order_id, OrderOutbox.topic == CIANBOX_SYNC
+        )
+    )
+    if message is None:
+        enqueue_order_sync(db, order_id)
+    else:
+        message.status = "pending"
+        message.attempts = 0
+        message.available_at = datetime.now()
+
+    sync_status.status = "pending"
+    sync_status.error_message = None
+    sync_status.synced_at = None
 
     db.commit()
     return sync_status
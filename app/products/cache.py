@@ -0,0 +1,61 @@
+from sqlalchemy.orm import Session
+
+from app.core.cache import LRUCache, versions
+from app.core.config import get_settings
+
+settings = get_settings()
+
+CATALOG = "products"
+
+product_list_cache = LRUCache(
+    max_bytes=settings.product_cache_max_bytes,
+    ttl_seconds=settings.product_cache_ttl_seconds,
+)
+
+
+def catalog_version(session: Session) -> int:
+    return versions.get(session, CATALOG)
+
+
+def bump_catalog_version(session: Session) -> None:
+    """
+    Invalidates every cached catalog page, in every process. Must be called
+    in the transaction of any change to products, their stock, their images
+    or their categories, right before committing it.
+    """
+    versions.bump(session, CATALOG)
+
+
+def product_list_cache_key(
+    version: int,
+    limit: int,
+    skip: int,
+    search: str | None,
+    min_price: float | None,
+    max_price: float | None,
+    order_by: str | None,
+    order_dir: str,
+    cursor: str | None,
+    count: str | None,
+    fields: frozenset[str] | None,
+) -> tuple:
+    """
+    Builds the cache key of a product list page from its normalized query
+    parameters and the current catalog version (see `catalog_version`).
+    """
+    if search is not None:
+        search = " ".join(search.lower().split()) or None
+
+    return (
+        version,
+        limit,
+        skip if cursor is None else 0,
+        search,
+        None if min_price is None else float(min_price),
+        None if max_price is None else float(max_price),
+        order_by or ("relevance" if search else "id"),
+        order_dir.lower(),
+        cursor,
+        count or ("none" if cursor else "exact"),
+        fields,
+    )
@@ -1,6 +1,6 @@
 from typing import List
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, DateTime, Float, ForeignKey, Boolean
+from sqlalchemy.orm import Mapped, WriteOnlyMapped, mapped_column, relationship
+from sqlalchemy import String, DateTime, Float, ForeignKey, Boolean, Index
 from datetime import datetime
 from app.core.database import Base
 from app.orders.models import OrderItem
@@ -9,14 +9,24 @@ from app.stock.models import StockHistory
 
 class Product(Base):
     __tablename__ = "products"
+    # Los índices del listado son parciales y se definen después de la clase
+    __table_args__ = (
+        # Upsert de la ingesta de Cianbox (ver app.integrations.cianbox.ingest)
+        Index("ix_products_cianbox_id", "cianbox_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String, nullable=False)
     description: Mapped[str] = mapped_column(String, nullable=True)
     price: Mapped[float] = mapped_column(Float, nullable=False)
     stock: Mapped[int] = mapped_column(default=0)
+    # Cantidad retenida por reservas activas (ver app.stock.reservations)
+    reserved: Mapped[int] = mapped_column(default=0, server_default="0")
+    # Umbrales de alerta (cantidad_minima / cantidad_critica de Cianbox); 0 = sin alerta
+    min_stock: Mapped[int] = mapped_column(default=0, server_default="0")
+    critical_stock: Mapped[int] = mapped_column(default=0, server_default="0")
     category_id: Mapped[int] = mapped_column(
-        ForeignKey("categories.id"), nullable=False
+        ForeignKey("categories.id"), nullable=False, index=True
     )
     images: Mapped[List["ProductImage"]] = relationship(
         "ProductImage", back_populates="product", cascade="all, delete-orphan"
@@ -28,18 +38,63 @@ class Product(Base):
         onupdate=datetime.now,
     )
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # ID del producto en Cianbox; NULL para los productos cargados localmente
+    cianbox_id: Mapped[int | None] = mapped_column(nullable=True)
 
     category: Mapped["Category"] = relationship("Category", back_populates="products")  # type: ignore
-    stock_history: Mapped[List["StockHistory"]] = relationship(
-        back_populates="product", cascade="all, delete-orphan"
+    # Solo escritura: el historial se consulta paginado (ver app.stock.service)
+    stock_history: WriteOnlyMapped["StockHistory"] = relationship(
+        back_populates="product", cascade="all, delete-orphan", passive_deletes=True
     )
     order_items: Mapped[list["OrderItem"]] = relationship(
         "OrderItem", back_populates="product"
     )
 
 
+# Índices para los filtros y órdenes del listado (ver get_products), solo de
+# los productos activos. La condición es la misma expresión que usan las
+# consultas: SQLite solo usa un índice parcial si su WHERE aparece tal cual.
+# En SQLite el rowid (id) se agrega al final de cada índice, así que también
+# sirven como desempate del orden y de la paginación por cursor.
+ACTIVE_PRODUCT = Product.is_active.is_(True)
+Index(
+    "ix_products_active_id",
+    Product.id,
+    sqlite_where=ACTIVE_PRODUCT,
+    postgresql_where=ACTIVE_PRODUCT,
+)
+Index(
+    "ix_products_active_price",
+    Product.price,
+    sqlite_where=ACTIVE_PRODUCT,
+    postgresql_where=ACTIVE_PRODUCT,
+)
+Index(
+    "ix_products_active_created_at",
+    Product.created_at,
+    sqlite_where=ACTIVE_PRODUCT,
+    postgresql_where=ACTIVE_PRODUCT,
+)
+Index(
+    "ix_products_active_name",
+    Product.name,
+    sqlite_where=ACTIVE_PRODUCT,
+    postgresql_where=ACTIVE_PRODUCT,
+)
+Index(
+    "ix_products_active_stock",
+    Product.stock,
+    sqlite_where=ACTIVE_PRODUCT,
+    postgresql_where=ACTIVE_PRODUCT,
+)
+
+
 class ProductImage(Base):
     __tablename__ = "product_images"
+    # Imágenes de un producto en orden (carga de relaciones y miniatura)
+    __table_args__ = (
+        Index("ix_product_images_product_id_position", "product_id", "position"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=False)
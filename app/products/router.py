@@ -1,13 +1,20 @@
 from typing import Annotated, List
-from fastapi import APIRouter, Depends, File, Query, UploadFile
+from fastapi import APIRouter, Depends, File, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.auth.dependencies import require_roles
 from app.core import db_connection
+from app.core.http_cache import build_etag, cache_headers, is_not_modified
 from app.products import service
 from app.products.schemas import (
+    BulkImportResponse,
+    BulkUpdateResponse,
+    ProductBulkUpdate,
     ProductImageResponse,
     ProductPublicResponse,
+    ProductSparseResponse,
     PaginatedProductResponse,
+    PaginatedSparseProductResponse,
     ProductCreate,
     ProductUpdate,
 )
@@ -18,17 +25,20 @@ router = APIRouter(prefix="/products", tags=["Products"])
 
 db: Session = db_connection.session
 
-@router.get("/")
+@router.get("/", response_model_exclude_unset=True)
 def get_products(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     search: str | None = Query(None, max_length=50),
     min_price: float | None = Query(None, ge=0),
     max_price: float | None = Query(None, ge=0),
-    order_by: str = Query("id"),
+    order_by: str | None = Query(None),
     order_dir: str = Query("asc", pattern="^(asc|desc)$"),
-) -> PaginatedProductResponse:
-    products, page, total_pages = service.get_products(
+    cursor: str | None = Query(None, max_length=200),
+    count: str | None = Query(None, pattern="^(exact|estimate|none)$"),
+    fields: str | None = Query(None, max_length=200),
+) -> PaginatedProductResponse | PaginatedSparseProductResponse:
+    return service.get_products_page(
         skip=skip,
         limit=limit,
         search=search,
@@ -36,20 +46,51 @@ def get_products(
         max_price=max_price,
         order_by=order_by,
         order_dir=order_dir,
+        cursor=cursor,
+        count=count,
+        fields=fields,
     )
 
-    return PaginatedProductResponse(
-        data=products,
-        page=page,
-        total_pages=total_pages,
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    dependencies=[Depends(require_roles(RoleEnum.ADMIN, RoleEnum.SELLER))],
+)
+def export_products(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = Query(False),
+):
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"products.{format}"
+    if gzip:
+        media_type = "application/gzip"
+        filename += ".gz"
+
+    return StreamingResponse(
+        service.export_products(format, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
 
-@router.get("/{product_id}")
+@router.get("/{product_id}", response_model_exclude_unset=True)
 def get_product(
-    product_id: int
-) -> ProductPublicResponse:
-    return service.get_by_id(product_id)
+    product_id: int,
+    request: Request,
+    response: Response,
+    fields: str | None = Query(None, max_length=200),
+) -> ProductPublicResponse | ProductSparseResponse:
+    updated_at, category_updated_at = service.get_last_modified(product_id)
+    # El producto incluye su categoría: renombrarla cambia la representación
+    etag = build_etag("product", product_id, updated_at, category_updated_at, fields or "")
+    updated_at = max(updated_at, category_updated_at)
+    headers = cache_headers(etag, updated_at)
+    if is_not_modified(request, etag, updated_at):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return service.get_by_id(product_id, fields)
 
 
 @router.post(
@@ -61,6 +102,32 @@ def create_product(
     return service.create(product)
 
 
+@router.post(
+    "/bulk",
+    dependencies=[Depends(require_roles(RoleEnum.ADMIN))],
+)
+def bulk_create_products(
+    file: UploadFile = File(...),
+    format: str | None = Query(None, pattern="^(ndjson|csv)$"),
+) -> BulkImportResponse:
+    # Sin formato explícito se deduce del tipo o la extensión del archivo
+    if format is None:
+        is_csv = file.content_type == "text/csv" or (
+            file.filename or ""
+        ).lower().endswith(".csv")
+        format = "csv" if is_csv else "ndjson"
+
+    return service.bulk_create(file.file, format)
+
+
+@router.patch(
+    "/bulk",
+    dependencies=[Depends(require_roles(RoleEnum.ADMIN))],
+)
+def bulk_update_products(data: ProductBulkUpdate) -> BulkUpdateResponse:
+    return service.bulk_update(data)
+
+
 @router.put("/{product_id}")
 def update_product(
     product_id: int, updated_data: ProductUpdate
@@ -101,8 +168,15 @@ async def upload_image(
 
 @router.get("/{product_id}/images")
 def get_images(
-    product_id: int,
+    product_id: int, request: Request, response: Response
 ) -> List[ProductImageResponse]:
+    updated_at, _ = service.get_last_modified(product_id)
+    etag = build_etag("product-images", product_id, updated_at)
+    headers = cache_headers(etag, updated_at)
+    if is_not_modified(request, etag, updated_at):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
     return service.get_product_images(product_id)
 
 
@@ -1,6 +1,6 @@
 from datetime import datetime
-from typing import List
-from pydantic import BaseModel
+from typing import List, Literal
+from pydantic import BaseModel, Field, model_validator
 from app.categories.schemas import CategoryResponse
 
 
@@ -18,6 +18,8 @@ class ProductBase(BaseModel):
 class ProductCreate(ProductBase):
     description: str | None = None
     category_id: int
+    min_stock: int = Field(0, ge=0)
+    critical_stock: int = Field(0, ge=0)
 
 
 class ProductUpdate(BaseModel):
@@ -26,6 +28,8 @@ class ProductUpdate(BaseModel):
     category_id: int | None = None
     stock: int | None = None
     price: float | None = None
+    min_stock: int | None = Field(None, ge=0)
+    critical_stock: int | None = Field(None, ge=0)
 
 
 
@@ -43,6 +47,8 @@ class ProductPublicResponse(ProductBase):
     id: int
     description: str | None
     stock: int
+    min_stock: int = 0
+    critical_stock: int = 0
     category: CategoryResponse
     images: List[ProductImageResponse] = []
     created_at: datetime
@@ -54,10 +60,98 @@ class ProductPublicResponse(ProductBase):
     }
 
 
+class ProductSparseResponse(BaseModel):
+    """Product with only the fields requested through `fields=`."""
+
+    id: int
+    name: str | None = None
+    description: str | None = None
+    price: float | None = None
+    stock: int | None = None
+    category: CategoryResponse | None = None
+    images: List[ProductImageResponse] | None = None
+    thumbnail: str | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+
 class PaginatedProductResponse(BaseModel):
     data: List[ProductPublicResponse]
-    page: int
-    total_pages: int
+    page: int | None = None
+    total_pages: int | None = None
+    has_next: bool = False
+    next_cursor: str | None = None
+
+
+class PaginatedSparseProductResponse(BaseModel):
+    data: List[ProductSparseResponse]
+    page: int | None = None
+    total_pages: int | None = None
+    has_next: bool = False
+    next_cursor: str | None = None
+
+
+class PriceRule(BaseModel):
+    mode: Literal["percent", "absolute"] = Field(
+        ..., description="percent: aplica un porcentaje; absolute: suma un monto"
+    )
+    value: float
+
+
+class ProductBulkFilter(BaseModel):
+    category_id: int | None = None
+    min_price: float | None = Field(None, ge=0)
+    max_price: float | None = Field(None, ge=0)
+    # Un filtro vacío alcanza a todo el catálogo: hay que pedirlo explícitamente
+    all: bool = False
+
+    @model_validator(mode="after")
+    def check_criteria(self):
+        if not self.all and (self.category_id, self.min_price, self.max_price) == (None,) * 3:
+            raise ValueError("filter needs a criterion, or all: true to select every product")
+        return self
+
+
+class ProductBulkUpdate(BaseModel):
+    ids: List[int] | None = Field(None, min_length=1)
+    filter: ProductBulkFilter | None = None
+    changes: ProductUpdate | None = None
+    price_rule: PriceRule | None = None
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {"ids": [1, 2, 3], "price_rule": {"mode": "percent", "value": 10}},
+                {"filter": {"category_id": 4}, "changes": {"description": "Oferta"}},
+                {"filter": {"all": True}, "price_rule": {"mode": "percent", "value": -5}},
+            ]
+        }
+    }
+
+    @model_validator(mode="after")
+    def check_target_and_changes(self):
+        if self.ids is None and self.filter is None:
+            raise ValueError("Either ids or filter must be given")
+        if self.changes is None and self.price_rule is None:
+            raise ValueError("Either changes or price_rule must be given")
+        if self.price_rule is not None and self.changes and self.changes.price is not None:
+            raise ValueError("price and price_rule cannot be used together")
+        return self
+
+
+class BulkUpdateResponse(BaseModel):
+    updated: int
+
+
+class BulkImportError(BaseModel):
+    row: int
+    error: str
+
+
+class BulkImportResponse(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkImportError] = []
 
 
 # Stock
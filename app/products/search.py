@@ -0,0 +1,223 @@
+import re
+import sys
+from typing import Type
+
+from sqlalchemy import (
+    Engine,
+    bindparam,
+    column,
+    false,
+    literal_column,
+    or_,
+    select,
+    table,
+    text,
+)
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.products.models import Product
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchBackend:
+    """
+    Base search backend. Filters the product query by a search term and keeps
+    its index in sync with the products table. The default implementation has
+    no index and falls back to a LIKE over name and description.
+    """
+
+    def apply(
+        self, query: Query, term: str
+    ) -> tuple[Query, ColumnElement | None]:
+        """
+        Filters the query by the search term.
+        :param query: Product query to filter
+        :param term: Search term sent by the client
+        :return: Tuple containing the filtered query and a relevance column (lower is better), if any
+        """
+        pattern = f"%{term}%"
+        query = query.filter(
+            or_(Product.name.ilike(pattern), Product.description.ilike(pattern))
+        )
+        return query, None
+
+    def create_index(self, engine: Engine) -> None:
+        pass
+
+    def index_product(self, db: Session, product: Product) -> None:
+        pass
+
+    def index_new_products(self, db: Session, rows: list[dict]) -> None:
+        """
+        Indexes products that were just inserted in bulk.
+        :param rows: Dicts with the id, name and description of each product
+        """
+        pass
+
+    def reindex_products(self, db: Session, product_ids: list[int]) -> None:
+        """
+        Refreshes the index entries of products updated in bulk.
+        :param product_ids: IDs of the updated products
+        """
+        pass
+
+    def remove_product(self, db: Session, product_id: int) -> None:
+        pass
+
+    def rebuild(self, db: Session) -> int:
+        return 0
+
+
+class SQLiteFTSSearchBackend(SearchBackend):
+    """
+    Search backend for SQLite based on an FTS5 shadow table (`products_fts`)
+    whose rowid is the product id. Only active products are indexed.
+    """
+
+    TABLE_NAME = "products_fts"
+
+    fts = table(TABLE_NAME, column("rowid"), column("rank"))
+
+    def apply(
+        self, query: Query, term: str
+    ) -> tuple[Query, ColumnElement | None]:
+        match = self._build_match(term)
+        if not match:
+            # Un término sin palabras (p. ej. "!!!") no coincide con ningún producto
+            return query.filter(false()), None
+
+        # Materializado: si no, el planificador puede recorrer products y
+        # consultar el índice una vez por fila (p. ej. en el conteo total)
+        hits = (
+            select(
+                self.fts.c.rowid.label("product_id"),
+                self.fts.c.rank.label("rank"),
+            )
+            .where(literal_column(self.TABLE_NAME).op("MATCH")(match))
+            .cte("search_hits")
+            .prefix_with("MATERIALIZED")
+        )
+        query = query.join(hits, hits.c.product_id == Product.id)
+        return query, hits.c.rank
+
+    def create_index(self, engine: Engine) -> None:
+        with engine.begin() as connection:
+            connection.execute(
+                text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.TABLE_NAME} "
+                    "USING fts5(name, description, tokenize='unicode61 remove_diacritics 2')"
+                )
+            )
+
+    def index_product(self, db: Session, product: Product) -> None:
+        self.remove_product(db, product.id)
+        db.execute(
+            text(
+                f"INSERT INTO {self.TABLE_NAME} (rowid, name, description) "
+                "VALUES (:id, :name, :description)"
+            ),
+            {
+                "id": product.id,
+                "name": product.name,
+                "description": product.description or "",
+            },
+        )
+
+    def index_new_products(self, db: Session, rows: list[dict]) -> None:
+        if not rows:
+            return
+        db.execute(
+            text(
+                f"INSERT INTO {self.TABLE_NAME} (rowid, name, description) "
+                "VALUES (:id, :name, :description)"
+            ),
+            [
+                {
+                    "id": row["id"],
+                    "name": row["name"],
+                    "description": row["description"] or "",
+                }
+                for row in rows
+            ],
+        )
+
+    def reindex_products(self, db: Session, product_ids: list[int]) -> None:
+        if not product_ids:
+            return
+        params = {"ids": product_ids}
+        db.execute(
+            text(f"DELETE FROM {self.TABLE_NAME} WHERE rowid IN :ids").bindparams(
+                bindparam("ids", expanding=True)
+            ),
+            params,
+        )
+        db.execute(
+            text(
+                f"INSERT INTO {self.TABLE_NAME} (rowid, name, description) "
+                "SELECT id, name, coalesce(description, '') FROM products "
+                "WHERE is_active = 1 AND id IN :ids"
+            ).bindparams(bindparam("ids", expanding=True)),
+            params,
+        )
+
+    def remove_product(self, db: Session, product_id: int) -> None:
+        db.execute(
+            text(f"DELETE FROM {self.TABLE_NAME} WHERE rowid = :id"),
+            {"id": product_id},
+        )
+
+    def rebuild(self, db: Session) -> int:
+        db.execute(text(f"DELETE FROM {self.TABLE_NAME}"))
+        result = db.execute(
+            text(
+                f"INSERT INTO {self.TABLE_NAME} (rowid, name, description) "
+                "SELECT id, name, coalesce(description, '') FROM products "
+                "WHERE is_active = 1"
+            )
+        )
+        db.execute(
+            text(f"INSERT INTO {self.TABLE_NAME} ({self.TABLE_NAME}) VALUES ('optimize')")
+        )
+        return result.rowcount
+
+    @staticmethod
+    def _build_match(term: str) -> str:
+        # Cada palabra se busca como prefijo; las palabras se combinan con AND
+        tokens = TOKEN_PATTERN.findall(term)
+        return " ".join(f'"{token}"*' for token in tokens)
+
+
+SEARCH_BACKENDS: dict[str, Type[SearchBackend]] = {
+    "sqlite": SQLiteFTSSearchBackend,
+}
+
+
+def register_search_backend(dialect: str, backend: Type[SearchBackend]) -> None:
+    """
+    Registers a search backend for a database dialect (e.g. 'postgresql').
+    :param dialect: SQLAlchemy dialect name
+    :param backend: SearchBackend subclass to use for that dialect
+    """
+    SEARCH_BACKENDS[dialect] = backend
+
+
+def get_search_backend(dialect: str) -> SearchBackend:
+    return SEARCH_BACKENDS.get(dialect, SearchBackend)()
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.products.search rebuild
+    from app.core import db_connection
+
+    if sys.argv[1:] != ["rebuild"]:
+        print("Usage: python -m app.products.search rebuild")
+        sys.exit(1)
+
+    backend = get_search_backend(db_connection.engine.dialect.name)
+    backend.create_index(db_connection.engine)
+    session = db_connection.session
+    indexed = backend.rebuild(session)
+    session.commit()
+    print(f"Search index rebuilt: {indexed} products indexed")
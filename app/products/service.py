@@ -1,30 +1,112 @@
+import csv
+from datetime import datetime
+import io
+import json
 from logging import Logger
 import os
 import shutil
 import tempfile
-from typing import List
+from typing import BinaryIO, Iterator, List
 import uuid
+import zlib
 from fastapi import File, UploadFile
-from sqlalchemy import asc, desc
-from sqlalchemy.orm import Session, joinedload
+from pydantic import ValidationError
+from sqlalchemy import Row, and_, asc, desc, func, insert, select, update as sql_update
+from sqlalchemy.orm import Session, selectinload
 
 from app.categories.models import Category
+from app.categories.schemas import CategoryResponse
 from app.core.cloudinary import (
     delete_image_from_url,
     upload_image as upload_image_service,
 )
 from app.core.exceptions import BadRequestException, NotFoundException
 from app.core.logger import setup_logger
+from app.core.pagination import cached_count, encode_cursor, keyset_filter
 from app.core import db_connection
-from app.products.models import Product, ProductImage, StockHistory
-from app.products.schemas import ProductCreate, ProductImageResponse, ProductUpdate
-from app.products.schemas import ProductPublicResponse
+from app.products.models import Product, ProductImage
+from app.products.schemas import (
+    BulkImportError,
+    BulkImportResponse,
+    BulkUpdateResponse,
+    ProductBulkUpdate,
+    ProductCreate,
+    ProductImageResponse,
+    ProductUpdate,
+)
+from app.products.schemas import (
+    PaginatedProductResponse,
+    PaginatedSparseProductResponse,
+    ProductPublicResponse,
+    ProductSparseResponse,
+)
+from app.products.cache import (
+    CATALOG,
+    bump_catalog_version,
+    catalog_version,
+    product_list_cache,
+    product_list_cache_key,
+)
+from app.products.search import get_search_backend
+from app.stock import ledger
+from app.stock.alerts import refresh_alerts
+from app.stock.engine import apply_stock_movement
 
 logger: Logger = setup_logger(__name__)
 
+ALLOWED_ORDER_FIELDS = {"id", "name", "price", "stock", "created_at"}
+RELEVANCE_ORDER_FIELD = "relevance"
+
+
+def product_relations() -> tuple:
+    # Las relaciones se cargan con un IN (...) por página en lugar de un JOIN,
+    # que repetía cada producto una vez por imagen y obligaba a paginar sobre una subconsulta.
+    # Se construyen al usarse para no configurar los mappers al importar el módulo.
+    return (
+        selectinload(Product.category),
+        selectinload(Product.images),
+    )
+
+
+# Campos que se pueden pedir con `fields=`; thumbnail es la URL de la primera imagen
+PRODUCT_COLUMN_FIELDS = {
+    "id",
+    "name",
+    "description",
+    "price",
+    "stock",
+    "created_at",
+    "updated_at",
+}
+PRODUCT_RELATION_FIELDS = {"category", "images", "thumbnail"}
+SPARSE_FIELDS = PRODUCT_COLUMN_FIELDS | PRODUCT_RELATION_FIELDS
+
+EXPORT_FIELDS = (
+    "id",
+    "name",
+    "description",
+    "price",
+    "stock",
+    "category_id",
+    "category",
+    "thumbnail",
+    "created_at",
+    "updated_at",
+)
+EXPORT_BATCH_SIZE = 1000
+IMPORT_CHUNK_SIZE = 5000
+
+MANUAL_STOCK_REASON = "Ajuste manual"
+
+# Cambios que obligan a reindexar la búsqueda o a recalcular las alertas de stock
+SEARCH_FIELDS = {"name", "description"}
+ALERT_FIELDS = {"min_stock", "critical_stock", "category_id"}
+
 
 db: Session = db_connection.session
 
+search_backend = get_search_backend(db_connection.engine.dialect.name)
+
 
 def get_products(
     skip: int = 0,
@@ -32,31 +114,43 @@ def get_products(
     search: str | None = None,
     min_price: float | None = None,
     max_price: float | None = None,
-    order_by: str = "id",
+    order_by: str | None = None,
     order_dir: str = "asc",
-) -> tuple[List[ProductPublicResponse], int, int]:
+    cursor: str | None = None,
+    count: str | None = None,
+    fields: frozenset[str] | None = None,
+) -> tuple[
+    List[ProductPublicResponse] | List[ProductSparseResponse],
+    int | None,
+    int | None,
+    str | None,
+]:
     """
     Get a paginated list of products with optional filters and sorting.
+    When a cursor is given the page is fetched by keyset over (order_by, id)
+    instead of by offset, and the total count is skipped unless requested.
+    Searches go through the search backend and are ordered by relevance unless
+    another order is requested.
     :param db: Database session
     :param skip: Number of products to skip (for pagination)
     :param limit: Maximum number of products to return
-    :param search: Optional search term to filter products by name
+    :param search: Optional search term to filter products by name and description
     :param min_price: Optional minimum price to filter products
     :param max_price: Optional maximum price to filter products
-    :param order_by: Field to order the results by (default is 'id')
+    :param order_by: Field to order the results by (default is 'relevance' when searching, 'id' otherwise)
     :param order_dir: Direction of the order ('asc' or 'desc', default is 'asc')
-    :return: Tuple containing a list of ProductPublicResponse, current page number, and total pages
+    :param cursor: Optional cursor returned with a previous page
+    :param count: How to compute total pages: 'exact', 'estimate' or 'none' (default is 'exact' for offset pages, 'none' for cursor pages)
+    :param fields: Optional set of fields to return (see `parse_fields`); only those columns and relations are loaded
+    :return: Tuple containing a list of ProductPublicResponse (or ProductSparseResponse), current page number, total pages and the next cursor
     """
+    _flush_stock_ledger()
 
-    query = (
-        db.query(Product)
-        .filter(Product.is_active.is_(True))
-        .options(joinedload(Product.category))
-        .options(joinedload(Product.images))
-    )
+    query = db.query(Product).filter(Product.is_active.is_(True))
 
+    rank = None
     if search:
-        query = query.filter(Product.name.ilike(f"%{search}%"))
+        query, rank = search_backend.apply(query, search)
 
     if min_price is not None:
         query = query.filter(Product.price >= min_price)
@@ -64,8 +158,19 @@ def get_products(
     if max_price is not None:
         query = query.filter(Product.price <= max_price)
 
-    ALLOWED_ORDER_FIELDS = {"id", "name", "price", "stock", "created_at"}
-    if order_by not in ALLOWED_ORDER_FIELDS:
+    count_query = query
+
+    if order_by is None:
+        order_by = RELEVANCE_ORDER_FIELD if search else "id"
+
+    if order_by == RELEVANCE_ORDER_FIELD:
+        if not search:
+            raise BadRequestException("Ordering by relevance requires a search term")
+        # Sin índice de búsqueda no hay ranking: se ordena por id
+        column = rank if rank is not None else Product.id
+    elif order_by in ALLOWED_ORDER_FIELDS:
+        column = getattr(Product, order_by)
+    else:
         logger.error(
             f"Invalid order_by field: {order_by}. Allowed fields are: {', '.join(ALLOWED_ORDER_FIELDS)}"
         )
@@ -73,26 +178,282 @@ def get_products(
             f"Invalid order_by field. Allowed fields are: {', '.join(ALLOWED_ORDER_FIELDS)}"
         )
 
-    column = getattr(Product, order_by)
-    query = query.order_by(desc(column) if order_dir.lower() == "desc" else asc(column))
+    sorts_by_rank = rank is not None and column is rank
+    if sorts_by_rank:
+        query = query.add_columns(rank)
 
-    products: List[Product] = query.offset(skip).limit(limit).all()
-    total: int = query.count()
-    total_pages: int = total // limit + (1 if total % limit > 0 else 0)
-    page: int = skip // limit + 1
+    descending = order_dir.lower() == "desc"
+    direction = desc if descending else asc
+    query = query.order_by(direction(column), direction(Product.id))
+
+    page: int | None = None
+    if cursor:
+        page_query = query.filter(keyset_filter(column, Product.id, cursor, descending))
+    else:
+        page_query = query.offset(skip)
+        page = skip // limit + 1
+
+    if count is None:
+        count = "none" if cursor else "exact"
+
+    total_pages: int | None = None
+    total = cached_count(
+        db, CATALOG, (search, min_price, max_price), count_query.count, count
+    )
+    if total is not None:
+        total_pages = total // limit + (1 if total % limit > 0 else 0)
+
+    # Se pide un registro extra para saber si existe una página siguiente
+    if fields is None:
+        rows = page_query.options(*product_relations()).limit(limit + 1).all()
+    else:
+        rows = (
+            page_query.with_entities(
+                *_sparse_columns(fields), column.label("sort_value")
+            )
+            .limit(limit + 1)
+            .all()
+        )
+
+    next_cursor: str | None = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if fields is not None:
+            next_cursor = encode_cursor(rows[-1].sort_value, rows[-1].id)
+        elif sorts_by_rank:
+            last, last_rank = rows[-1]
+            next_cursor = encode_cursor(last_rank, last.id)
+        else:
+            last = rows[-1]
+            next_cursor = encode_cursor(getattr(last, column.key), last.id)
+
+    if fields is not None:
+        return _sparse_products(rows, fields), page, total_pages, next_cursor
+
+    products: List[Product] = [row[0] for row in rows] if sorts_by_rank else rows
 
     result = [ProductPublicResponse.model_validate(p) for p in products]
-    return result, page, total_pages
+    return result, page, total_pages, next_cursor
+
+
+def parse_fields(fields: str | None) -> frozenset[str] | None:
+    """
+    Parses the `fields` query parameter (comma separated field names).
+    The id is always included.
+    :param fields: Raw value of the parameter
+    :return: Set of requested fields, or None to return the full representation
+    """
+    if not fields:
+        return None
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    invalid = requested - SPARSE_FIELDS
+    if invalid:
+        raise BadRequestException(
+            f"Invalid fields: {', '.join(sorted(invalid))}. Allowed fields are: {', '.join(sorted(SPARSE_FIELDS))}"
+        )
+    return frozenset(requested | {"id"})
 
 
-def get_by_id(product_id: int) -> ProductPublicResponse:
+def get_products_page(
+    skip: int = 0,
+    limit: int = 10,
+    search: str | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    order_by: str | None = None,
+    order_dir: str = "asc",
+    cursor: str | None = None,
+    count: str | None = None,
+    fields: str | None = None,
+) -> PaginatedProductResponse | PaginatedSparseProductResponse:
+    """
+    Read-through cached version of `get_products` that returns the final page.
+    Pages are cached by their normalized parameters and the catalog version,
+    so any write to the catalog makes the previous pages unreachable.
+    :return: PaginatedProductResponse (or PaginatedSparseProductResponse when fields are given) for the requested page
+    """
+    # El flush del ledger cambia la versión del catálogo: va antes de armar la clave
+    _flush_stock_ledger()
+    key = product_list_cache_key(
+        version=catalog_version(db),
+        limit=limit,
+        skip=skip,
+        search=search,
+        min_price=min_price,
+        max_price=max_price,
+        order_by=order_by,
+        order_dir=order_dir,
+        cursor=cursor,
+        count=count,
+        fields=parse_fields(fields),
+    )
+    cached: PaginatedProductResponse | None = product_list_cache.get(key)
+    if cached is not None:
+        return cached
+
+    _, _, skip, search, min_price, max_price, order_by, order_dir, cursor, count, fields = key
+    products, page, total_pages, next_cursor = get_products(
+        skip=skip,
+        limit=limit,
+        search=search,
+        min_price=min_price,
+        max_price=max_price,
+        order_by=order_by,
+        order_dir=order_dir,
+        cursor=cursor,
+        count=count,
+        fields=fields,
+    )
+    response_model = (
+        PaginatedProductResponse if fields is None else PaginatedSparseProductResponse
+    )
+    response = response_model(
+        data=products,
+        page=page,
+        total_pages=total_pages,
+        has_next=next_cursor is not None,
+        next_cursor=next_cursor,
+    )
+
+    product_list_cache.set(key, response, size=len(response.model_dump_json()))
+    return response
+
+
+def export_products(export_format: str = "ndjson", compress: bool = False) -> Iterator[bytes]:
+    """
+    Streams the whole active catalog as NDJSON or CSV.
+    Rows are read with `yield_per` from a dedicated session and encoded in
+    batches, so memory stays constant regardless of the catalog size.
+    :param export_format: 'ndjson' or 'csv'
+    :param compress: Whether to gzip the output on the fly
+    :return: Iterator of encoded chunks, to be sent with a StreamingResponse
+    """
+    thumbnail = (
+        select(ProductImage.url)
+        .where(ProductImage.product_id == Product.id)
+        .order_by(ProductImage.position, ProductImage.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    statement = (
+        select(
+            Product.id,
+            Product.name,
+            Product.description,
+            Product.price,
+            Product.stock,
+            Product.category_id,
+            Category.name.label("category"),
+            thumbnail.label("thumbnail"),
+            Product.created_at,
+            Product.updated_at,
+        )
+        .join(Category, Category.id == Product.category_id)
+        .where(Product.is_active.is_(True))
+        .order_by(Product.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    session: Session = db_connection.session
+    try:
+        if export_format == "csv":
+            chunks = _csv_chunks(session.execute(statement))
+        else:
+            chunks = _ndjson_chunks(session.execute(statement))
+
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            if compressor is not None:
+                data = compressor.compress(data)
+            if data:
+                yield data
+
+        if compressor is not None:
+            yield compressor.flush()
+    finally:
+        session.close()
+
+    logger.info(f"Catalog exported as {export_format} (compressed: {compress})")
+
+
+def _ndjson_chunks(result) -> Iterator[str]:
+    for partition in result.partitions():
+        yield "".join(
+            json.dumps(_export_row(row), ensure_ascii=False) + "\n" for row in partition
+        )
+
+
+def _csv_chunks(result) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for partition in result.partitions():
+        writer.writerows(_export_row(row).values() for row in partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Cabecera de un catálogo vacío
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _export_row(row: Row) -> dict:
+    data = dict(zip(EXPORT_FIELDS, row))
+    data["created_at"] = data["created_at"].isoformat()
+    data["updated_at"] = data["updated_at"].isoformat()
+    return data
+
+
+def get_last_modified(product_id: int) -> tuple[datetime, datetime]:
+    """
+    Get the last modification dates of an active product and of its category
+    without loading them. Image changes also update the product date, so it
+    can validate both the product and its image list; the product
+    representation also embeds the category, so it depends on both.
+    :param product_id: ID of the product
+    :return: Tuple containing Product.updated_at and Category.updated_at
+    """
+    _flush_stock_ledger()
+    row = (
+        db.query(Product.updated_at, Category.updated_at)
+        .join(Category, Category.id == Product.category_id)
+        .filter(Product.id == product_id, Product.is_active.is_(True))
+        .first()
+    )
+    if row is None:
+        logger.error(f"Product with ID {product_id} not found")
+        raise NotFoundException(f"Product with ID {product_id} not found")
+    return row[0], row[1]
+
+
+def get_by_id(
+    product_id: int, fields: str | None = None
+) -> ProductPublicResponse | ProductSparseResponse:
     """
     Get a product by its ID.
     :param db: Database session
     :param product_id: ID of the product to retrieve
-    :return: ProductPublicResponse containing product details
+    :param fields: Optional comma separated list of fields to return
+    :return: ProductPublicResponse containing product details, or ProductSparseResponse when fields are given
     """
-    product = _get_one_product(product_id)
+    _flush_stock_ledger()
+    requested = parse_fields(fields)
+    if requested is not None:
+        rows = (
+            db.query(Product)
+            .filter_by(id=product_id, is_active=True)
+            .with_entities(*_sparse_columns(requested))
+            .all()
+        )
+        if not rows:
+            logger.error(f"Product with ID {product_id} not found")
+            raise NotFoundException(f"Product with ID {product_id} not found")
+        return _sparse_products(rows, requested)[0]
+
+    product = _get_one_product(product_id, load_relations=True)
 
     return ProductPublicResponse.model_validate(product)
 
@@ -102,21 +463,167 @@ def create(product_data: ProductCreate) -> ProductPublicResponse:
 
     new_product = Product(**product_data.model_dump())
     db.add(new_product)
+    db.flush()
+    search_backend.index_product(db, new_product)
+    refresh_alerts(db, [new_product.id])
+    bump_catalog_version(db)
     db.commit()
     db.refresh(new_product)
 
     product_with_category = (
-        db.query(Product).options(joinedload(Product.category)).get(new_product.id)
+        db.query(Product).options(*product_relations()).get(new_product.id)
     )
 
     logger.info(f"Product created successfully with ID: {new_product.id}")
     return ProductPublicResponse.model_validate(product_with_category)
 
 
+def bulk_create(
+    file: BinaryIO, import_format: str = "ndjson", chunk_size: int = IMPORT_CHUNK_SIZE
+) -> BulkImportResponse:
+    """
+    Imports products from an NDJSON or CSV file with `ProductCreate` rows.
+    Rows are validated and inserted in chunks, with one transaction per chunk
+    and a single category lookup for the ids not seen before. Invalid rows are
+    skipped and reported with their row number (1-based, header excluded).
+    :param file: Binary file object with the uploaded content
+    :param import_format: 'ndjson' or 'csv'
+    :param chunk_size: Number of rows per transaction
+    :return: BulkImportResponse with the inserted count and the per-row errors
+    """
+    if import_format == "csv":
+        rows = _read_csv_rows(file)
+    else:
+        rows = _read_ndjson_rows(file)
+
+    valid_categories: set[int] = set()
+    invalid_categories: set[int] = set()
+    errors: List[BulkImportError] = []
+    inserted = 0
+
+    chunk: list[tuple[int, dict | None, str | None]] = []
+    for row_number, raw, parse_error in rows:
+        chunk.append((row_number, raw, parse_error))
+        if len(chunk) >= chunk_size:
+            inserted += _import_chunk(chunk, valid_categories, invalid_categories, errors)
+            chunk = []
+    if chunk:
+        inserted += _import_chunk(chunk, valid_categories, invalid_categories, errors)
+
+    errors.sort(key=lambda error: error.row)
+    logger.info(f"Bulk import finished: {inserted} products inserted, {len(errors)} rows failed")
+    return BulkImportResponse(inserted=inserted, failed=len(errors), errors=errors)
+
+
+def _import_chunk(
+    chunk: list[tuple[int, dict | None, str | None]],
+    valid_categories: set[int],
+    invalid_categories: set[int],
+    errors: List[BulkImportError],
+) -> int:
+    products: list[tuple[int, ProductCreate]] = []
+    for row_number, raw, parse_error in chunk:
+        if parse_error is not None:
+            errors.append(BulkImportError(row=row_number, error=parse_error))
+            continue
+        try:
+            products.append((row_number, ProductCreate.model_validate(raw)))
+        except ValidationError as e:
+            errors.append(BulkImportError(row=row_number, error=_format_validation_error(e)))
+
+    # Una sola consulta por chunk para las categorías que todavía no se conocen
+    unknown = {
+        product.category_id for _, product in products
+    } - valid_categories - invalid_categories
+    if unknown:
+        found = set(db.scalars(select(Category.id).where(Category.id.in_(unknown))))
+        valid_categories |= found
+        invalid_categories |= unknown - found
+
+    values = []
+    for row_number, product in products:
+        if product.category_id in invalid_categories:
+            errors.append(
+                BulkImportError(
+                    row=row_number,
+                    error=f"Category with ID {product.category_id} does not exist",
+                )
+            )
+            continue
+        values.append((row_number, product.model_dump()))
+
+    if not values:
+        return 0
+
+    products_table = Product.__table__
+    now = datetime.now()
+    try:
+        # INSERT de Core con executemany: evita la maquinaria de unit of work del ORM
+        result = db.connection().execute(
+            insert(products_table).returning(
+                products_table.c.id, products_table.c.name, products_table.c.description
+            ),
+            [
+                {**data, "created_at": now, "updated_at": now, "is_active": True, "stock": 0}
+                for _, data in values
+            ],
+        )
+        rows = [row._asdict() for row in result]
+        search_backend.index_new_products(db, rows)
+        refresh_alerts(db, [row["id"] for row in rows])
+        bump_catalog_version(db)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error importing products chunk: {str(e)}")
+        errors.extend(
+            BulkImportError(row=row_number, error=f"Error inserting row: {str(e)}")
+            for row_number, _ in values
+        )
+        return 0
+
+    return len(values)
+
+
+def _read_ndjson_rows(file: BinaryIO) -> Iterator[tuple[int, dict | None, str | None]]:
+    row_number = 0
+    for line in file:
+        line = line.strip()
+        if not line:
+            continue
+        row_number += 1
+        try:
+            raw = json.loads(line)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            yield row_number, None, f"Invalid JSON: {str(e)}"
+            continue
+        if not isinstance(raw, dict):
+            yield row_number, None, "Each line must be a JSON object"
+            continue
+        yield row_number, raw, None
+
+
+def _read_csv_rows(file: BinaryIO) -> Iterator[tuple[int, dict | None, str | None]]:
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    for row_number, raw in enumerate(reader, start=1):
+        # Las celdas vacías de un CSV equivalen a valores nulos
+        yield row_number, {
+            key: (value if value != "" else None) for key, value in raw.items() if key
+        }, None
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+        for err in error.errors()
+    )
+
+
 def update(
     product_id: int, product_data: ProductUpdate
 ) -> ProductPublicResponse:
-    # Validar que el producto existe
+    # Validar que el producto existe; el stock leído incluye lo pendiente del ledger
+    _flush_stock_ledger()
     product = _get_one_product(product_id)
     # Guarda el estado original antes de modificar
     original_data = product.to_dict().copy()
@@ -125,14 +632,22 @@ def update(
     if product_data.category_id is not None:
         _get_category_or_400(product_data.category_id)
 
-    print(
-        f"Updating product {product_id} with data: {product_data.model_dump(exclude_none=True)}"
-    )
-    # Actualizar los campos del producto
-    for key, value in product_data.model_dump(exclude_none=True).items():
+    # Actualizar los campos del producto; el stock se mueve como un ajuste
+    changes = product_data.model_dump(exclude_none=True)
+    new_stock = changes.pop("stock", None)
+    for key, value in changes.items():
         setattr(product, key, value)
 
     try:
+        if new_stock is not None and new_stock != product.stock:
+            apply_stock_movement(
+                db, product_id, new_stock - product.stock, MANUAL_STOCK_REASON
+            )
+        if ALERT_FIELDS & changes.keys():
+            db.flush()
+            refresh_alerts(db, [product_id])
+        search_backend.index_product(db, product)
+        bump_catalog_version(db)
         db.commit()
     except Exception as e:
         db.rollback()
@@ -141,8 +656,7 @@ def update(
 
     db.refresh(product)
 
-    product_with_category = _get_one_product(product_id)
-    print(f"Product with category: {product_with_category.to_dict()}")
+    product_with_category = _get_one_product(product_id, load_relations=True)
     if not product_with_category:
         logger.error(f"Product with ID {product_id} not found after update")
         raise NotFoundException(f"Product with ID {product_id} not found")
@@ -153,6 +667,77 @@ def update(
     return ProductPublicResponse.model_validate(product_with_category)
 
 
+def bulk_update(data: ProductBulkUpdate) -> BulkUpdateResponse:
+    """
+    Update many active products with a single UPDATE statement.
+    Products are selected by ids and/or filter (an empty filter is rejected
+    unless it sets `all`); fields in `changes` are set as given and
+    `price_rule` recomputes the price from the current one.
+    :param data: Target products and changes to apply
+    :return: BulkUpdateResponse with the number of updated products
+    """
+    changes = data.changes.model_dump(exclude_none=True) if data.changes else {}
+    if "stock" in changes:
+        raise BadRequestException("Stock cannot be updated in bulk, use the stock endpoints")
+    if "category_id" in changes:
+        _get_category_or_400(changes["category_id"])
+
+    values = {getattr(Product, key): value for key, value in changes.items()}
+    if data.price_rule is not None:
+        values[Product.price] = _apply_price_rule(data.price_rule.mode, data.price_rule.value)
+    if not values:
+        raise BadRequestException("No changes to apply")
+    values[Product.updated_at] = datetime.now()
+
+    conditions = [Product.is_active.is_(True)]
+    if data.ids is not None:
+        conditions.append(Product.id.in_(data.ids))
+    if data.filter is not None:
+        if data.filter.category_id is not None:
+            conditions.append(Product.category_id == data.filter.category_id)
+        if data.filter.min_price is not None:
+            conditions.append(Product.price >= data.filter.min_price)
+        if data.filter.max_price is not None:
+            conditions.append(Product.price <= data.filter.max_price)
+    if data.price_rule is not None:
+        # Un descuento nunca puede dejar un precio negativo
+        conditions.append(values[Product.price] >= 0)
+    where = and_(*conditions)
+
+    try:
+        # Los ids se leen antes del UPDATE porque el filtro de precio puede dejar de coincidir
+        updated_ids = (
+            db.scalars(select(Product.id).where(where)).all()
+            if SEARCH_FIELDS & changes.keys() or ALERT_FIELDS & changes.keys()
+            else []
+        )
+        result = db.execute(
+            sql_update(Product)
+            .where(where)
+            .values(values)
+            .execution_options(synchronize_session=False)
+        )
+        if SEARCH_FIELDS & changes.keys():
+            search_backend.reindex_products(db, updated_ids)
+        if ALERT_FIELDS & changes.keys():
+            refresh_alerts(db, updated_ids)
+        bump_catalog_version(db)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error updating products in bulk: {str(e)}")
+        raise BadRequestException(f"Error updating products: {str(e)}")
+
+    logger.info(f"Bulk update applied to {result.rowcount} products")
+    return BulkUpdateResponse(updated=result.rowcount)
+
+
+def _apply_price_rule(mode: str, value: float):
+    if mode == "percent":
+        return func.round(Product.price * (1 + value / 100), 2)
+    return func.round(Product.price + value, 2)
+
+
 def delete(product_id: int) -> None:
     """
     Delete a product by its ID.
@@ -164,6 +749,10 @@ def delete(product_id: int) -> None:
     product = _get_one_product(product_id)
 
     product.is_active = False
+    db.flush()
+    search_backend.remove_product(db, product_id)
+    refresh_alerts(db, [product_id])
+    bump_catalog_version(db)
     db.commit()
     logger.info(f"Product {product_id} deleted successfully")
     return None
@@ -179,6 +768,10 @@ def restore(product_id: int) -> ProductPublicResponse:
     product = _get_one_product(product_id, include_inactives=True)
 
     product.is_active = True
+    db.flush()
+    search_backend.index_product(db, product)
+    refresh_alerts(db, [product_id])
+    bump_catalog_version(db)
     db.commit()
     db.refresh(product)
 
@@ -200,9 +793,19 @@ def update_stock(product_id: int, new_stock: int) -> ProductPublicResponse:
         )
         raise BadRequestException("Stock cannot be negative")
 
+    _flush_stock_ledger()
     product = _get_one_product(product_id)
-    product.stock = new_stock
-    db.commit()
+    # El cambio se registra como movimiento para que historial y snapshots cuadren
+    try:
+        if new_stock != product.stock:
+            apply_stock_movement(
+                db, product_id, new_stock - product.stock, MANUAL_STOCK_REASON
+            )
+            bump_catalog_version(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     db.refresh(product)
 
     logger.info(f"Stock updated for product {product_id}: new stock {product.stock}")
@@ -228,32 +831,33 @@ def adjust_stock(
             "Adjustment quantity cannot be zero. No change made to stock."
         )
 
-    product = _get_one_product(product_id)
-
-    new_stock: int = product.stock + quantity
-    if new_stock < 0:
+    try:
+        if ledger.stock_ledger is not None:
+            ledger.stock_ledger.append(product_id, quantity, reason)
+        else:
+            apply_stock_movement(db, product_id, quantity, reason)
+            bump_catalog_version(db)
+            db.commit()
+    except BadRequestException:
+        db.rollback()
         logger.error(
-            f"Insufficient stock for product {product_id}: current stock {product.stock}, attempted adjustment {quantity}"
+            f"Insufficient stock for product {product_id}: attempted adjustment {quantity}"
         )
-        raise BadRequestException("Not enough stock to complete this operation")
-
-    product.stock = new_stock
-
-    history = StockHistory(
-        product_id=product.id,
-        quantity=quantity,
-        reason=reason,
-    )
-    db.add(history)
+        raise
+    except Exception:
+        db.rollback()
+        raise
 
-    db.commit()
+    product = _get_one_product(product_id)
     db.refresh(product)
 
+    response = ProductPublicResponse.model_validate(product)
+    response.stock = ledger.current_stock(product_id, product.stock)
     logger.info(
-        f"Stock adjusted for product {product_id}: new stock {product.stock}, quantity adjusted {quantity}, reason: {reason}"
+        f"Stock adjusted for product {product_id}: new stock {response.stock}, quantity adjusted {quantity}, reason: {reason}"
     )
 
-    return ProductPublicResponse.model_validate(product)
+    return response
 
 
 async def upload_image(
@@ -318,6 +922,8 @@ async def upload_image(
         image.position = image_position
 
         db.add(image)
+        _touch_product(product_id)
+        bump_catalog_version(db)
         db.commit()
         db.refresh(image)
 
@@ -363,6 +969,8 @@ def delete_image(product_id: int, image_id: int) -> None:
 
     # Eliminar imagen de la base de datos
     db.delete(image)
+    _touch_product(product_id)
+    bump_catalog_version(db)
     db.commit()
     logger.info(
         f"Image with ID {image_id} deleted successfully from product {product_id}"
@@ -400,6 +1008,8 @@ def update_image_position(
         existing_image.position = image.position  # Move existing image to old position
 
     image.position = new_position
+    _touch_product(image.product_id)
+    bump_catalog_version(db)
     db.commit()
     db.refresh(image)
 
@@ -407,6 +1017,77 @@ def update_image_position(
     return ProductImageResponse.model_validate(image)
 
 
+def _sparse_columns(fields: frozenset[str]) -> list:
+    columns: list = [getattr(Product, field) for field in sorted(fields & PRODUCT_COLUMN_FIELDS)]
+
+    if "category" in fields:
+        columns.append(Product.category_id)
+
+    if "thumbnail" in fields:
+        thumbnail = (
+            select(ProductImage.url)
+            .where(ProductImage.product_id == Product.id)
+            .order_by(ProductImage.position, ProductImage.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        columns.append(thumbnail.label("thumbnail"))
+
+    return columns
+
+
+def _sparse_products(
+    rows: List[Row], fields: frozenset[str]
+) -> List[ProductSparseResponse]:
+    # Las relaciones pedidas se cargan con un IN (...) cada una
+    categories: dict[int, Category] = {}
+    if "category" in fields:
+        category_ids = {row.category_id for row in rows}
+        categories = {
+            category.id: category
+            for category in db.query(Category).filter(Category.id.in_(category_ids))
+        }
+
+    images: dict[int, List[ProductImage]] = {}
+    if "images" in fields:
+        product_ids = [row.id for row in rows]
+        for image in (
+            db.query(ProductImage)
+            .filter(ProductImage.product_id.in_(product_ids))
+            .order_by(ProductImage.product_id, ProductImage.position)
+        ):
+            images.setdefault(image.product_id, []).append(image)
+
+    result = []
+    for row in rows:
+        data = {field: getattr(row, field) for field in fields & PRODUCT_COLUMN_FIELDS}
+        if "thumbnail" in fields:
+            data["thumbnail"] = row.thumbnail
+        if "category" in fields:
+            data["category"] = CategoryResponse.model_validate(categories[row.category_id])
+        if "images" in fields:
+            data["images"] = [
+                ProductImageResponse.model_validate(image)
+                for image in images.get(row.id, [])
+            ]
+        result.append(ProductSparseResponse(**data))
+    return result
+
+
+def _flush_stock_ledger() -> None:
+    # Los movimientos del ledger sin aplicar se vuelcan antes de leer el stock;
+    # lo que la sesión tenga cargado queda vencido
+    if ledger.flush_pending():
+        db.expire_all()
+
+
+def _touch_product(product_id: int) -> None:
+    # Las imágenes forman parte de la representación del producto
+    db.query(Product).filter_by(id=product_id).update(
+        {Product.updated_at: datetime.now()}, synchronize_session=False
+    )
+
+
 def _get_category_or_400(category_id: int) -> Category:
     category = db.query(Category).filter_by(id=category_id).first()
     if not category:
@@ -415,12 +1096,16 @@ def _get_category_or_400(category_id: int) -> Category:
 
 
 def _get_one_product(
-    product_id: int, include_inactives: bool = False
+    product_id: int, include_inactives: bool = False, load_relations: bool = False
 ) -> Product:
+    query = db.query(Product)
+    if load_relations:
+        query = query.options(*product_relations())
+
     if include_inactives:
-        product = db.query(Product).filter_by(id=product_id).first()
+        product = query.filter_by(id=product_id).first()
     else:
-        product = db.query(Product).filter_by(id=product_id, is_active=True).first()
+        product = query.filter_by(id=product_id, is_active=True).first()
 
     if not product:
         logger.error(f"Product with ID {product_id} not found")
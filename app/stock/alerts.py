@@ -0,0 +1,106 @@
+import sys
+from datetime import datetime
+
+from sqlalchemy import Select, and_, case, delete, literal, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.sql import execute_upsert, upsert
+from app.products.models import Product
+from app.stock.models import StockAlert
+
+CRITICAL = "critical"
+LOW = "low"
+ALERT_LEVELS = (CRITICAL, LOW)
+
+
+def alert_level() -> ColumnElement:
+    """
+    Alert level of a product row: 'critical' at or below `critical_stock`,
+    'low' at or below `min_stock`, NULL otherwise. A threshold of 0 disables it.
+    """
+    return case(
+        (
+            and_(Product.critical_stock > 0, Product.stock <= Product.critical_stock),
+            literal(CRITICAL),
+        ),
+        (and_(Product.min_stock > 0, Product.stock <= Product.min_stock), literal(LOW)),
+        else_=None,
+    )
+
+
+def refresh_alerts(session: Session, product_ids: list[int]) -> None:
+    """
+    Brings the alerts of the given products in line with their current stock
+    and thresholds. Meant to run in the same transaction that changed them,
+    so its cost depends only on the products moved.
+    :param session: Session whose transaction the alerts join
+    :param product_ids: IDs of the products whose stock or thresholds changed
+    """
+    if not product_ids:
+        return
+    level = alert_level()
+    alerting = select(Product.id).where(
+        Product.id.in_(product_ids), Product.is_active.is_(True), level.is_not(None)
+    )
+
+    session.execute(
+        delete(StockAlert)
+        .where(StockAlert.product_id.in_(product_ids), StockAlert.product_id.not_in(alerting))
+        .execution_options(synchronize_session=False)
+    )
+    rows = select(
+        Product.id.label("product_id"),
+        Product.category_id.label("category_id"),
+        level.label("level"),
+        literal(datetime.now()).label("since"),
+    ).where(Product.id.in_(alerting))
+    execute_upsert(session, _upsert_alerts(session, rows))
+
+
+def rebuild_alerts(session: Session) -> int:
+    """
+    Recomputes every alert from the products table, e.g. after thresholds
+    were loaded outside the API. The caller commits.
+    :return: Number of active alerts
+    """
+    session.execute(delete(StockAlert))
+    rows = select(
+        Product.id.label("product_id"),
+        Product.category_id.label("category_id"),
+        alert_level().label("level"),
+        literal(datetime.now()).label("since"),
+    ).where(Product.is_active.is_(True), alert_level().is_not(None))
+    return execute_upsert(session, _upsert_alerts(session, rows)).rowcount
+
+
+def _upsert_alerts(session: Session, rows: Select):
+    table = StockAlert.__table__
+    return upsert(
+        session.get_bind().dialect.name,
+        table,
+        index_elements=["product_id"],
+        update_columns=["category_id", "level"],
+        select=rows,
+        # Solo se reinicia `since` cuando cambia el nivel
+        update_values=lambda excluded: {
+            "since": case(
+                (table.c.level == excluded.level, table.c.since), else_=excluded.since
+            )
+        },
+    )
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.stock.alerts rebuild
+    import app.models  # noqa: F401  (registra todos los modelos)
+    from app.core import db_connection
+
+    if sys.argv[1:] != ["rebuild"]:
+        print("Usage: python -m app.stock.alerts rebuild")
+        sys.exit(1)
+
+    session = db_connection.session
+    alerts = rebuild_alerts(session)
+    session.commit()
+    print(f"Stock alerts rebuilt: {alerts} products below threshold")
@@ -0,0 +1,242 @@
+import argparse
+import gzip
+import json
+import os
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import BinaryIO, NamedTuple
+
+from sqlalchemy import bindparam, delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.logger import setup_logger
+from app.stock.models import StockHistory, StockHistoryArchive
+from app.stock.snapshots import OPENING_BALANCE_REASON, day_start, record_opening_snapshots
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+_history = StockHistory.__table__
+
+# Suma el neto de un lote al saldo inicial del producto en el horizonte
+ADD_TO_OPENING_BALANCE = (
+    _history.update()
+    .where(
+        _history.c.product_id == bindparam("opening_product_id"),
+        _history.c.created_at == bindparam("horizon"),
+        _history.c.is_opening_balance.is_(True),
+    )
+    .values(quantity=_history.c.quantity + bindparam("net"))
+)
+
+
+class CompactionResult(NamedTuple):
+    batches: int
+    archived: int
+    products: int
+
+
+def compact_history(
+    session: Session,
+    horizon: datetime,
+    batch_size: int = 5000,
+    output: BinaryIO | None = None,
+    pause: float = 0,
+) -> CompactionResult:
+    """
+    Rolls the stock movements older than `horizon` into one opening-balance
+    row per product (is_opening_balance, created_at = horizon) and moves
+    the original rows to `stock_history_archive`, or to `output` as gzipped
+    NDJSON if given.
+
+    Rows are processed oldest first in batches of `batch_size`, each in its
+    own short transaction. After every batch the sum of each product's
+    history is unchanged, so the job can be stopped at any point and resumed
+    by running it again. Opening balances from a previous run with an older
+    horizon are folded into the new one. Writes to the file happen before
+    the batch commits, so a resumed run may repeat rows there (dedupe by id).
+
+    Every batch also refreshes the snapshot closing the day before the
+    horizon for the products it touched, so point-in-time stock from that
+    day on (see app.stock.snapshots) stays exact without the compacted rows.
+    Before the horizon it is only exact for days that already have a snapshot.
+    :param session: Database session; committed after every batch
+    :param horizon: Movements created before this instant are compacted
+    :param batch_size: Maximum number of movements per transaction
+    :param output: Optional binary file to append the archived rows to
+    :param pause: Seconds to wait between batches, to leave room for writers
+    :return: CompactionResult with the batches run, rows archived and products touched
+    """
+    gzip_output = gzip.GzipFile(fileobj=output, mode="ab") if output is not None else None
+    batches = archived = 0
+    products: set[int] = set()
+
+    try:
+        while True:
+            rows = session.execute(
+                select(
+                    StockHistory.id,
+                    StockHistory.product_id,
+                    StockHistory.quantity,
+                    StockHistory.reason,
+                    StockHistory.created_at,
+                    StockHistory.is_opening_balance,
+                )
+                .where(StockHistory.created_at < horizon)
+                .order_by(StockHistory.created_at, StockHistory.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            try:
+                archived += _compact_batch(session, rows, horizon, gzip_output)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Error compacting stock history: {str(e)}")
+                raise
+
+            batches += 1
+            products.update(row.product_id for row in rows)
+            logger.info(f"Stock history compaction: batch {batches}, {archived} rows archived")
+            if pause:
+                time.sleep(pause)
+    finally:
+        if gzip_output is not None:
+            gzip_output.close()
+
+    return CompactionResult(batches=batches, archived=archived, products=len(products))
+
+
+def _compact_batch(
+    session: Session, rows: list, horizon: datetime, gzip_output: gzip.GzipFile | None
+) -> int:
+    net: dict[int, int] = defaultdict(int)
+    for row in rows:
+        net[row.product_id] += row.quantity
+
+    # Los saldos iniciales de corridas anteriores se suman al nuevo, no se archivan
+    movements = [row for row in rows if not row.is_opening_balance]
+    if movements and gzip_output is not None:
+        _write_ndjson(gzip_output, movements)
+    elif movements:
+        archived_at = datetime.now()
+        session.execute(
+            insert(StockHistoryArchive.__table__),
+            [
+                {
+                    "id": row.id,
+                    "product_id": row.product_id,
+                    "quantity": row.quantity,
+                    "reason": row.reason,
+                    "created_at": row.created_at,
+                    "archived_at": archived_at,
+                }
+                for row in movements
+            ],
+        )
+
+    session.execute(
+        delete(StockHistory)
+        .where(StockHistory.id.in_([row.id for row in rows]))
+        .execution_options(synchronize_session=False)
+    )
+
+    existing = set(
+        session.scalars(
+            select(StockHistory.product_id).where(
+                StockHistory.product_id.in_(net),
+                StockHistory.created_at == horizon,
+                StockHistory.is_opening_balance.is_(True),
+            )
+        )
+    )
+    if existing:
+        session.connection().execute(
+            ADD_TO_OPENING_BALANCE,
+            [
+                {"opening_product_id": product_id, "net": net[product_id], "horizon": horizon}
+                for product_id in existing
+            ],
+        )
+    new = [product_id for product_id in net if product_id not in existing]
+    if new:
+        session.execute(
+            insert(_history),
+            [
+                {
+                    "product_id": product_id,
+                    "quantity": net[product_id],
+                    "reason": OPENING_BALANCE_REASON,
+                    "created_at": horizon,
+                    "is_opening_balance": True,
+                }
+                for product_id in new
+            ],
+        )
+    record_opening_snapshots(session, list(net), horizon)
+    return len(movements)
+
+
+def _write_ndjson(gzip_output: gzip.GzipFile, rows: list) -> None:
+    gzip_output.write(
+        "".join(
+            json.dumps(
+                {
+                    "id": row.id,
+                    "product_id": row.product_id,
+                    "quantity": row.quantity,
+                    "reason": row.reason,
+                    "created_at": row.created_at.isoformat(),
+                },
+                ensure_ascii=False,
+            )
+            + "\n"
+            for row in rows
+        ).encode("utf-8")
+    )
+    # El lote debe estar en disco antes de borrarlo de la base
+    gzip_output.flush()
+    gzip_output.fileobj.flush()
+    os.fsync(gzip_output.fileobj.fileno())
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.stock.archive compact [--older-than-days N] [--batch-size N]
+    #      [--output archivo.ndjson.gz] [--pause-ms N]
+    import app.models  # noqa: F401
+    from app.core import db_connection
+
+    parser = argparse.ArgumentParser(prog="python -m app.stock.archive")
+    parser.add_argument("command", choices=["compact"])
+    parser.add_argument(
+        "--older-than-days", type=int, default=settings.stock_history_retention_days
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.stock_history_compaction_batch
+    )
+    parser.add_argument("--output", help="Append archived rows to this .ndjson.gz file")
+    parser.add_argument("--pause-ms", type=int, default=0)
+    args = parser.parse_args()
+
+    # Horizonte al inicio del día: las corridas del mismo día retoman el mismo saldo
+    horizon = day_start(date.today() - timedelta(days=args.older_than_days))
+    output = open(args.output, "ab") if args.output else None
+    try:
+        result = compact_history(
+            db_connection.session,
+            horizon,
+            batch_size=args.batch_size,
+            output=output,
+            pause=args.pause_ms / 1000,
+        )
+    finally:
+        if output is not None:
+            output.close()
+    print(
+        f"Stock history before {horizon.date()} compacted: {result.archived} rows archived "
+        f"for {result.products} products in {result.batches} batches"
+    )
@@ -0,0 +1,186 @@
+import sys
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, NamedTuple
+
+from sqlalchemy import bindparam, delete, func, select
+from sqlalchemy.orm import Session
+
+from app.core.sql import execute_upsert, upsert
+from app.stock.models import ProductBranchStock, ProductBranchStockTotal
+
+_branch_stock = ProductBranchStock.__table__
+_totals = ProductBranchStockTotal.__table__
+
+DELETE_BRANCH_STOCK = _branch_stock.delete().where(
+    _branch_stock.c.product_id == bindparam("removed_product_id"),
+    _branch_stock.c.branch_id == bindparam("removed_branch_id"),
+)
+
+
+class BranchStock(NamedTuple):
+    product_id: int
+    branch_id: int
+    stock: int
+    reserved: int
+    available: int
+
+
+def sync_branch_stock(
+    session: Session, rows: list[BranchStock], replace: Iterable[int] | None = None
+) -> int:
+    """
+    Writes the branch stock of a batch of products and applies the
+    differences to their totals, so the totals stay exact without summing
+    the branches again. Unchanged rows are not written.
+    Meant to run in the caller's transaction; the caller commits.
+    :param session: Session whose transaction the rows join
+    :param rows: Branch stock rows; the last one wins for a repeated pair
+    :param replace: IDs of products whose every branch is in `rows`; their
+        branches missing from `rows` are removed
+    :return: Number of branch rows inserted, updated or removed
+    """
+    latest = {(row.product_id, row.branch_id): row for row in rows}
+    replace = set(replace or ())
+    product_ids = {product_id for product_id, _ in latest} | replace
+    if not product_ids:
+        return 0
+
+    previous = {
+        (row.product_id, row.branch_id): (row.stock, row.reserved, row.available)
+        for row in session.execute(
+            select(
+                ProductBranchStock.product_id,
+                ProductBranchStock.branch_id,
+                ProductBranchStock.stock,
+                ProductBranchStock.reserved,
+                ProductBranchStock.available,
+            )
+            .where(ProductBranchStock.product_id.in_(product_ids))
+            .with_for_update()
+        )
+    }
+
+    # Diferencias por producto: stock, reservado, disponible y cantidad de sucursales
+    deltas: dict[int, list[int]] = defaultdict(lambda: [0, 0, 0, 0])
+    changed = []
+    for key, row in latest.items():
+        old = previous.get(key)
+        new = (row.stock, row.reserved, row.available)
+        if old == new:
+            continue
+        changed.append(row)
+        delta = deltas[row.product_id]
+        for i, value in enumerate(new):
+            delta[i] += value - (old[i] if old else 0)
+        delta[3] += old is None
+
+    removed = [key for key in previous if key not in latest and key[0] in replace]
+    for key in removed:
+        delta = deltas[key[0]]
+        for i, value in enumerate(previous[key]):
+            delta[i] -= value
+        delta[3] -= 1
+
+    if not changed and not removed:
+        return 0
+
+    dialect = session.get_bind().dialect.name
+    connection = session.connection()
+    now = datetime.now()
+    if changed:
+        execute_upsert(
+            connection,
+            upsert(
+                dialect,
+                _branch_stock,
+                ["product_id", "branch_id"],
+                ["stock", "reserved", "available", "updated_at"],
+            ),
+            [{**row._asdict(), "updated_at": now} for row in changed],
+        )
+    if removed:
+        connection.execute(
+            DELETE_BRANCH_STOCK,
+            [
+                {"removed_product_id": product_id, "removed_branch_id": branch_id}
+                for product_id, branch_id in removed
+            ],
+        )
+    execute_upsert(
+        connection,
+        _add_to_totals(dialect),
+        [
+            {
+                "product_id": product_id,
+                "stock": stock,
+                "reserved": reserved,
+                "available": available,
+                "branches": branches,
+                "updated_at": now,
+            }
+            for product_id, (stock, reserved, available, branches) in deltas.items()
+        ],
+    )
+    return len(changed) + len(removed)
+
+
+def rebuild_branch_totals(session: Session) -> int:
+    """
+    Recomputes every total from the branch rows, e.g. after branch stock was
+    loaded outside `sync_branch_stock`. The caller commits.
+    :return: Number of products with branch stock
+    """
+    session.execute(delete(ProductBranchStockTotal))
+    rows = (
+        select(
+            ProductBranchStock.product_id.label("product_id"),
+            func.sum(ProductBranchStock.stock).label("stock"),
+            func.sum(ProductBranchStock.reserved).label("reserved"),
+            func.sum(ProductBranchStock.available).label("available"),
+            func.count().label("branches"),
+            func.max(ProductBranchStock.updated_at).label("updated_at"),
+        )
+        # SQLite necesita un WHERE para no leer ON CONFLICT como parte de un join
+        .where(ProductBranchStock.product_id.is_not(None))
+        .group_by(ProductBranchStock.product_id)
+    )
+    return execute_upsert(
+        session,
+        upsert(
+            session.get_bind().dialect.name,
+            _totals,
+            ["product_id"],
+            ["stock", "reserved", "available", "branches", "updated_at"],
+            select=rows,
+        )
+    ).rowcount
+
+
+def _add_to_totals(dialect: str):
+    # La fila nueva trae la diferencia: se suma a la existente o se inserta tal cual
+    return upsert(
+        dialect,
+        _totals,
+        ["product_id"],
+        ["updated_at"],
+        update_values=lambda excluded: {
+            name: _totals.c[name] + excluded[name]
+            for name in ("stock", "reserved", "available", "branches")
+        },
+    )
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.stock.branches rebuild
+    import app.models  # noqa: F401  (registra todos los modelos)
+    from app.core import db_connection
+
+    if sys.argv[1:] != ["rebuild"]:
+        print("Usage: python -m app.stock.branches rebuild")
+        sys.exit(1)
+
+    session = db_connection.session
+    products = rebuild_branch_totals(session)
+    session.commit()
+    print(f"Branch stock totals rebuilt for {products} products")
@@ -0,0 +1,198 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlalchemy import bindparam, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.exceptions import BadRequestException, NotFoundException
+from app.products.models import Product
+from app.stock.alerts import refresh_alerts
+from app.stock.models import StockHistory
+from app.stock.reservations import release_expired
+from app.stock.snapshots import record_snapshots
+
+settings = get_settings()
+
+
+# UPDATE products SET stock = stock + :quantity
+# WHERE id = :product_id AND is_active
+#   AND (:quantity >= 0 OR stock - reserved + :quantity >= 0)
+# Las bajas no pueden tomar unidades reservadas por carritos (ver
+# `app.stock.reservations`); las altas siempre se aplican.
+_products = Product.__table__
+CONDITIONAL_UPDATE = (
+    _products.update()
+    .where(
+        _products.c.id == bindparam("product_id"),
+        _products.c.is_active.is_(True),
+        or_(
+            bindparam("quantity") >= 0,
+            _products.c.stock - _products.c.reserved + bindparam("quantity") >= 0,
+        ),
+    )
+    .values(
+        stock=_products.c.stock + bindparam("quantity"),
+        updated_at=bindparam("now"),
+    )
+)
+
+
+class StockMovement(NamedTuple):
+    product_id: int
+    quantity: int
+    reason: str
+
+
+class RejectedMovement(NamedTuple):
+    line: int
+    product_id: int
+    error: str
+
+
+def apply_stock_movement(
+    session: Session, product_id: int, quantity: int, reason: str
+) -> None:
+    """
+    Applies a stock movement with a single conditional UPDATE, so concurrent
+    movements on the same product can neither lose updates nor leave the
+    stock negative. A decrement may only take available stock (stock minus
+    reserved), so it never takes units held by a reservation. The StockHistory row, today's stock snapshot (see
+    `app.stock.snapshots`) and the stock alert (see `app.stock.alerts`) are
+    written in the same transaction. Expired reservations of the product are
+    released first, so they never block a decrement.
+    The caller owns the transaction: it must commit on success and roll
+    back if this function raises.
+    :param session: Session whose transaction the movement joins
+    :param product_id: ID of the product to move
+    :param quantity: Quantity to add (negative to remove)
+    :param reason: Reason for the movement
+    """
+    if quantity < 0:
+        release_expired(session, [product_id])
+    if not _move(session, product_id, quantity):
+        raise _rejection(session, product_id)
+
+    session.add(
+        StockHistory(product_id=product_id, quantity=quantity, reason=reason)
+    )
+    if settings.stock_snapshots_incremental:
+        record_snapshots(session, [product_id])
+    refresh_alerts(session, [product_id])
+
+
+def apply_stock_movements(
+    session: Session, movements: list[StockMovement], atomic: bool = True
+) -> list[RejectedMovement]:
+    """
+    Applies many stock movements in the session transaction and records their
+    history with a single executemany INSERT.
+    In atomic mode the quantities are netted per product and applied with one
+    conditional UPDATE per product; if any product would end up with less
+    than its reserved stock or does not exist, the transaction is rolled back and the first such line
+    is raised.
+    Otherwise each line is applied on its own, in order, and the lines that
+    could not be applied are returned.
+    :param session: Session whose transaction the movements join
+    :param movements: Movements to apply, in order
+    :param atomic: Whether all movements must be applied or none
+    :return: Rejected lines (always empty in atomic mode)
+    """
+    release_expired(
+        session, list({movement.product_id for movement in movements if movement.quantity < 0})
+    )
+    if atomic:
+        _move_net(session, movements)
+        applied, rejected = movements, []
+    else:
+        applied, rejected = [], []
+        for line, movement in enumerate(movements):
+            if _move(session, movement.product_id, movement.quantity):
+                applied.append(movement)
+            else:
+                error = _rejection(session, movement.product_id)
+                rejected.append(RejectedMovement(line, movement.product_id, error.detail))
+
+    if applied:
+        now = datetime.now()
+        session.execute(
+            insert(StockHistory.__table__),
+            [
+                {
+                    "product_id": movement.product_id,
+                    "quantity": movement.quantity,
+                    "reason": movement.reason,
+                    "created_at": now,
+                }
+                for movement in applied
+            ],
+        )
+        moved = list({movement.product_id for movement in applied})
+        if settings.stock_snapshots_incremental:
+            record_snapshots(session, moved)
+        refresh_alerts(session, moved)
+    return rejected
+
+
+def _move(session: Session, product_id: int, quantity: int) -> bool:
+    result = session.connection().execute(
+        CONDITIONAL_UPDATE,
+        {"product_id": product_id, "quantity": quantity, "now": datetime.now()},
+    )
+    return result.rowcount == 1
+
+
+def _move_net(session: Session, movements: list[StockMovement]) -> None:
+    net: dict[int, int] = defaultdict(int)
+    for movement in movements:
+        net[movement.product_id] += movement.quantity
+
+    now = datetime.now()
+    params = [
+        {"product_id": product_id, "quantity": quantity, "now": now}
+        for product_id, quantity in net.items()
+    ]
+
+    connection = session.connection()
+    if connection.dialect.supports_sane_multi_rowcount:
+        failed = connection.execute(CONDITIONAL_UPDATE, params).rowcount != len(params)
+    else:
+        failed = any(connection.execute(CONDITIONAL_UPDATE, param).rowcount != 1 for param in params)
+    if not failed:
+        return
+
+    # Se informa la primera línea de un producto que no pudo moverse, con el
+    # disponible que vio el UPDATE (reservas vencidas ya liberadas)
+    session.rollback()
+    release_expired(session, list(net))
+    available = dict(
+        session.execute(
+            select(Product.id, Product.stock - Product.reserved).where(
+                Product.id.in_(net), Product.is_active.is_(True)
+            )
+        ).all()
+    )
+    for line, movement in enumerate(movements):
+        stock = available.get(movement.product_id)
+        if stock is None:
+            raise NotFoundException(
+                f"Line {line}: product with ID {movement.product_id} not found"
+            )
+        change = net[movement.product_id]
+        if change < 0 and stock + change < 0:
+            raise BadRequestException(
+                f"Line {line}: not enough stock for product {movement.product_id} "
+                f"(available {stock}, net change {change})"
+            )
+    raise BadRequestException("Stock movements could not be applied")
+
+
+def _rejection(session: Session, product_id: int) -> BadRequestException | NotFoundException:
+    # Solo en el camino de error se consulta por qué no se aplicó
+    exists = session.scalar(
+        select(Product.id).where(Product.id == product_id, Product.is_active.is_(True))
+    )
+    if exists is None:
+        return NotFoundException(f"Product with ID {product_id} not found")
+    return BadRequestException("Not enough stock to complete this operation")
@@ -0,0 +1,484 @@
+import json
+import os
+import queue
+import threading
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+from sqlalchemy import bindparam, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.exceptions import BadRequestException, NotFoundException
+from app.core.logger import setup_logger
+from app.products.cache import bump_catalog_version
+from app.products.models import Product
+from app.stock.alerts import refresh_alerts
+from app.stock.models import StockHistory, StockLedgerCheckpoint, StockLedgerRejection
+from app.stock.reservations import available_stock, available_stocks, release_expired
+from app.stock.snapshots import record_snapshots
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+
+_products = Product.__table__
+
+# Los movimientos se validan al registrarse, pero otro camino (pedidos, lotes,
+# ajustes) puede haber tomado el stock antes del flush: las bajas se aplican
+# solo si no dejan el stock por debajo de lo reservado
+APPLY_NET_DELTA = (
+    _products.update()
+    .where(
+        _products.c.id == bindparam("product_id"),
+        or_(
+            bindparam("quantity") >= 0,
+            _products.c.stock - _products.c.reserved + bindparam("quantity") >= 0,
+        ),
+    )
+    .values(
+        stock=_products.c.stock + bindparam("quantity"),
+        updated_at=bindparam("now"),
+    )
+)
+
+
+class LedgerEntry(NamedTuple):
+    seq: int
+    product_id: int
+    quantity: int
+    reason: str
+    created_at: datetime
+
+    def to_line(self) -> str:
+        return json.dumps(
+            [self.seq, self.product_id, self.quantity, self.reason, self.created_at.isoformat()],
+            ensure_ascii=False,
+        ) + "\n"
+
+    @classmethod
+    def from_line(cls, line: str) -> "LedgerEntry":
+        seq, product_id, quantity, reason, created_at = json.loads(line)
+        return cls(seq, product_id, quantity, reason, datetime.fromisoformat(created_at))
+
+
+class StockLedger:
+    """
+    Write-behind stock ledger for a single process.
+
+    Movements are validated in memory against the available stock (stock
+    minus active reservations) plus the pending deltas, appended to an
+    append-only segment file and acknowledged once fsynced. A writer thread
+    fsyncs all the movements queued meanwhile in one go (group commit). A
+    flusher thread periodically moves the durable movements to
+    `stock_history`, applies their net delta per product to `products.stock`
+    and advances the checkpoint, all in one transaction. On start, the
+    movements after the checkpoint are replayed from the segments, so an
+    acknowledged movement is always either applied or recorded as rejected.
+
+    The available stock of a product is read from the database on its first
+    append and refreshed by every flush that moves it; once nothing is
+    pending for a product it is read again on the next append. Other paths
+    (orders, batches, the Cianbox ingest) can still take the stock in the
+    meantime, so the flush applies the net delta of a product only if it
+    does not leave the stock below the reserved quantity. Otherwise the
+    movements of that product are applied one by one, and those that no
+    longer fit go to `stock_ledger_rejections` instead of the history.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        session_factory: Callable[[], Session],
+        flush_interval: float = 0.05,
+        segment_max_bytes: int = 16 * 1024 * 1024,
+    ):
+        self.directory = Path(directory)
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.segment_max_bytes = segment_max_bytes
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Stock y reservas activas leídos de la base, más los deltas sin aplicar
+        self._applied: dict[int, int] = {}
+        self._held: dict[int, int] = {}
+        self._pending: dict[int, int] = defaultdict(int)
+        self._durable: list[LedgerEntry] = []
+        self._seq = 0
+        self._checkpoint = 0
+
+        self._queue: queue.Queue = queue.Queue()
+        self._stopping = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._segment = None
+        self._segments: list[tuple[Path, int]] = []  # (ruta, último seq) de segmentos cerrados
+
+    # -- ciclo de vida -----------------------------------------------------
+
+    def start(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._recover()
+        self._open_segment()
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._write_loop, name="stock-ledger-writer", daemon=True),
+            threading.Thread(target=self._flush_loop, name="stock-ledger-flusher", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Stock ledger started at {self.directory} (pending movements: {len(self._durable)})")
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.flush()
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+        logger.info("Stock ledger stopped")
+
+    # -- API ---------------------------------------------------------------
+
+    def append(self, product_id: int, quantity: int, reason: str) -> int:
+        """
+        Records a stock movement. Returns once the movement is durable on disk;
+        it is applied to the database by the next flush, or recorded in
+        `stock_ledger_rejections` under the returned sequence number if the
+        stock was taken by another path meanwhile.
+        :param product_id: ID of the product to move
+        :param quantity: Quantity to add (negative to remove)
+        :param reason: Reason for the movement
+        :return: Sequence number of the movement
+        """
+        entry = None
+        while entry is None:
+            self._load_levels(product_id)
+            with self._lock:
+                # Otro append rechazado pudo descartar lo leído: se vuelve a leer
+                if product_id not in self._applied:
+                    continue
+                available = (
+                    self._applied[product_id] - self._held[product_id] + self._pending[product_id]
+                )
+                if quantity < 0 and available + quantity < 0:
+                    self._forget_if_idle(product_id)
+                    raise BadRequestException("Not enough stock to complete this operation")
+                self._seq += 1
+                entry = LedgerEntry(self._seq, product_id, quantity, reason, datetime.now())
+                self._pending[product_id] += quantity
+
+        written = threading.Event()
+        result: dict = {}
+        self._queue.put((entry, written, result))
+        written.wait()
+
+        if "error" in result:
+            with self._lock:
+                self._pending[product_id] -= quantity
+                self._forget_if_idle(product_id)
+            raise result["error"]
+        return entry.seq
+
+    def balance(self, product_id: int) -> int | None:
+        """
+        Returns the stock of a product including the movements not flushed yet,
+        or None if nothing is pending for it (the database stock is current).
+        """
+        with self._lock:
+            if not self._pending.get(product_id):
+                return None
+            return self._applied[product_id] + self._pending[product_id]
+
+    def flush(self) -> int:
+        """
+        Applies the durable movements to the database in one transaction.
+        :return: Number of movements applied
+        """
+        with self._flush_lock:
+            with self._lock:
+                entries, self._durable = self._durable, []
+            if not entries:
+                return 0
+
+            net: dict[int, int] = defaultdict(int)
+            for entry in entries:
+                net[entry.product_id] += entry.quantity
+
+            session = self.session_factory()
+            try:
+                rejected = self._apply(session, entries, net)
+                levels = available_stocks(session, list(net))
+                bump_catalog_version(session)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                with self._lock:
+                    self._durable = entries + self._durable
+                logger.error(f"Error flushing stock ledger: {str(e)}")
+                return 0
+            finally:
+                session.close()
+
+            with self._lock:
+                for product_id, quantity in net.items():
+                    self._pending[product_id] -= quantity
+                    if self._pending[product_id]:
+                        self._applied[product_id], self._held[product_id] = levels.get(
+                            product_id, (0, 0)
+                        )
+                    else:
+                        self._forget_if_idle(product_id)
+                self._checkpoint = entries[-1].seq
+
+            self._delete_flushed_segments()
+            return len(entries) - rejected
+
+    # -- internos ----------------------------------------------------------
+
+    def _apply(self, session: Session, entries: list[LedgerEntry], net: dict[int, int]) -> int:
+        """:return: Number of movements rejected because the stock was taken meanwhile"""
+        now = datetime.now()
+        release_expired(
+            session, [product_id for product_id, quantity in net.items() if quantity < 0]
+        )
+        connection = session.connection()
+        conflicts = {
+            product_id
+            for product_id, quantity in net.items()
+            if connection.execute(
+                APPLY_NET_DELTA, {"product_id": product_id, "quantity": quantity, "now": now}
+            ).rowcount != 1
+        }
+
+        applied, rejected = [], []
+        for entry in entries:
+            if entry.product_id in conflicts and connection.execute(
+                APPLY_NET_DELTA,
+                {"product_id": entry.product_id, "quantity": entry.quantity, "now": now},
+            ).rowcount != 1:
+                logger.error(
+                    f"Rejecting stock ledger movement {entry.seq}: not enough stock "
+                    f"for product {entry.product_id} (quantity {entry.quantity})"
+                )
+                rejected.append(entry)
+                continue
+            applied.append(entry)
+
+        if rejected:
+            session.execute(
+                insert(StockLedgerRejection.__table__),
+                [
+                    {
+                        **entry._asdict(),
+                        "rejected_at": now,
+                        "error": "Not enough stock when the movement was flushed",
+                    }
+                    for entry in rejected
+                ],
+            )
+
+        if applied:
+            session.execute(
+                insert(StockHistory.__table__),
+                [
+                    {
+                        "product_id": entry.product_id,
+                        "quantity": entry.quantity,
+                        "reason": entry.reason,
+                        "created_at": entry.created_at,
+                    }
+                    for entry in applied
+                ],
+            )
+        if settings.stock_snapshots_incremental:
+            record_snapshots(session, list(net))
+        refresh_alerts(session, list(net))
+
+        checkpoint = session.get(StockLedgerCheckpoint, 1)
+        if checkpoint is None:
+            session.add(StockLedgerCheckpoint(id=1, last_seq=entries[-1].seq, updated_at=now))
+        else:
+            checkpoint.last_seq = entries[-1].seq
+            checkpoint.updated_at = now
+        return len(rejected)
+
+    def _forget_if_idle(self, product_id: int) -> None:
+        # Sin pendientes se vuelve a leer de la base en el próximo append;
+        # se llama con self._lock tomado
+        if not self._pending.get(product_id):
+            self._pending.pop(product_id, None)
+            self._applied.pop(product_id, None)
+            self._held.pop(product_id, None)
+
+    def _load_levels(self, product_id: int) -> None:
+        with self._lock:
+            if product_id in self._applied:
+                return
+        # Solo la primera lectura espera a los flushes: uno a medio publicar
+        # dejaría la base adelantada respecto de lo pendiente
+        with self._flush_lock:
+            stock, held = self._read_levels(product_id)
+            with self._lock:
+                if product_id not in self._applied:
+                    self._applied[product_id], self._held[product_id] = stock, held
+
+    def _read_levels(self, product_id: int) -> tuple[int, int]:
+        """:return: Tuple (stock, reserved) of an active product, without expired holds"""
+        session = self.session_factory()
+        try:
+            levels = available_stock(session, product_id)
+        finally:
+            session.close()
+        if levels is None:
+            raise NotFoundException(f"Product with ID {product_id} not found")
+        return levels
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # Se agrupan todos los movimientos encolados en un solo fsync
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            requests = [request for request in batch if request is not None]
+            if requests:
+                self._write_batch(requests)
+            if len(requests) != len(batch) and self._stopping.is_set():
+                return
+
+    def _write_batch(self, requests: list) -> None:
+        entries = [entry for entry, _, _ in requests]
+        try:
+            self._segment.write("".join(entry.to_line() for entry in entries))
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+        except OSError as e:
+            logger.error(f"Error writing stock ledger segment: {str(e)}")
+            for _, written, result in requests:
+                result["error"] = e
+                written.set()
+            return
+
+        with self._lock:
+            self._durable.extend(entries)
+        for _, written, _ in requests:
+            written.set()
+
+        if self._segment.tell() >= self.segment_max_bytes:
+            with self._lock:
+                self._segments.append((Path(self._segment.name), entries[-1].seq))
+            self._segment.close()
+            self._open_segment()
+
+    def _flush_loop(self) -> None:
+        while not self._stopping.wait(self.flush_interval):
+            self.flush()
+
+    def _open_segment(self) -> None:
+        path = self.directory / f"{SEGMENT_PREFIX}{self._seq + 1:020d}{SEGMENT_SUFFIX}"
+        self._segment = open(path, "a", encoding="utf-8")
+
+    def _delete_flushed_segments(self) -> None:
+        with self._lock:
+            flushed = [path for path, last_seq in self._segments if last_seq <= self._checkpoint]
+            self._segments = [
+                (path, last_seq) for path, last_seq in self._segments if last_seq > self._checkpoint
+            ]
+        for path in flushed:
+            path.unlink(missing_ok=True)
+
+    def _recover(self) -> None:
+        session = self.session_factory()
+        try:
+            checkpoint = session.get(StockLedgerCheckpoint, 1)
+            self._checkpoint = checkpoint.last_seq if checkpoint else 0
+        finally:
+            session.close()
+        self._seq = self._checkpoint
+
+        for path in sorted(self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}")):
+            last_seq = self._checkpoint
+            with open(path, encoding="utf-8") as segment:
+                for line in segment:
+                    try:
+                        entry = LedgerEntry.from_line(line)
+                    except (ValueError, TypeError):
+                        # Última línea incompleta de una escritura interrumpida
+                        logger.error(f"Skipping corrupt stock ledger line in {path.name}")
+                        continue
+                    last_seq = max(last_seq, entry.seq)
+                    if entry.seq > self._checkpoint:
+                        self._durable.append(entry)
+                        self._pending[entry.product_id] += entry.quantity
+            self._seq = max(self._seq, last_seq)
+            self._segments.append((path, last_seq))
+
+        for product_id in list(self._pending):
+            try:
+                self._applied[product_id], self._held[product_id] = self._read_levels(product_id)
+            except NotFoundException:
+                self._applied[product_id], self._held[product_id] = 0, 0
+        self._delete_flushed_segments()
+
+
+stock_ledger: StockLedger | None = None
+
+
+def current_stock(product_id: int, stock: int) -> int:
+    """
+    Returns the stock of a product including the movements the ledger has
+    not flushed yet, or `stock` (as read from the database) if there are none.
+    """
+    if stock_ledger is not None:
+        balance = stock_ledger.balance(product_id)
+        if balance is not None:
+            return balance
+    return stock
+
+
+def flush_pending() -> int:
+    """
+    Applies the movements the ledger has acknowledged but not flushed yet, so
+    a following read of `products.stock` (and of the catalog version and
+    updated_at that caches depend on) includes them. A no-op when the ledger
+    is disabled or has nothing pending.
+    :return: Number of movements applied
+    """
+    if stock_ledger is None:
+        return 0
+    return stock_ledger.flush()
+
+
+def start_ledger() -> None:
+    """Starts the write-behind ledger if `stock_ledger_enabled` is set."""
+    global stock_ledger
+    if not settings.stock_ledger_enabled or stock_ledger is not None:
+        return
+
+    from app.core import db_connection
+
+    stock_ledger = StockLedger(
+        settings.stock_ledger_dir,
+        session_factory=lambda: db_connection.session,
+        flush_interval=settings.stock_ledger_flush_interval_ms / 1000,
+    )
+    stock_ledger.start()
+
+
+def stop_ledger() -> None:
+    global stock_ledger
+    if stock_ledger is not None:
+        stock_ledger.stop()
+        stock_ledger = None
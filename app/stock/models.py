@@ -1,16 +1,177 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, String, DateTime
-from datetime import datetime
+from sqlalchemy import Boolean, Date, ForeignKey, String, DateTime, Index, false, func
+from datetime import date, datetime
 from app.core.database import Base
 
 
 class StockHistory(Base):
     __tablename__ = "stock_history"
+    # Historial de un producto por rango de fechas (paginado por cursor) y
+    # movimientos de un día de todos los productos (compactación de snapshots)
+    __table_args__ = (
+        Index("ix_stock_history_product_id_created_at", "product_id", "created_at"),
+        Index("ix_stock_history_created_at", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     product_id: Mapped[int] = mapped_column(ForeignKey("products.id"))
     quantity: Mapped[int]
     reason: Mapped[str]
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    # Fila que resume los movimientos compactados (ver app.stock.archive)
+    is_opening_balance: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, server_default=false()
+    )
 
     product: Mapped["Product"] = relationship("Product", back_populates="stock_history")
+
+
+class StockHistoryArchive(Base):
+    """
+    Stock movements moved out of `stock_history` by the compaction job
+    (see app.stock.archive). Rows keep their original id.
+    """
+
+    __tablename__ = "stock_history_archive"
+    __table_args__ = (
+        Index("ix_stock_history_archive_product_id_created_at", "product_id", "created_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    product_id: Mapped[int] = mapped_column(nullable=False)
+    quantity: Mapped[int] = mapped_column(nullable=False)
+    reason: Mapped[str] = mapped_column(nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class StockSnapshot(Base):
+    """
+    Closing stock of a product at the end of a day. Only days with movements
+    have a row; the stock on any other day is the one of the previous row.
+    """
+
+    __tablename__ = "stock_snapshots"
+
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    # Inicio del día siguiente: los movimientos desde este instante no están incluidos
+    closed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    closing_stock: Mapped[int] = mapped_column(nullable=False)
+
+
+class StockReservation(Base):
+    """
+    Short-lived hold of stock made during checkout. The held quantity is also
+    added to `Product.reserved`, so the available stock is stock - reserved.
+    """
+
+    __tablename__ = "stock_reservations"
+    # expires_at: barrido de reservas vencidas; (product_id, expires_at): reservas
+    # activas de un producto; (user_id, product_id): consumo al crear el pedido
+    __table_args__ = (
+        Index("ix_stock_reservations_expires_at", "expires_at"),
+        Index("ix_stock_reservations_product_id_expires_at", "product_id", "expires_at"),
+        Index("ix_stock_reservations_user_id_product_id", "user_id", "product_id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    quantity: Mapped[int] = mapped_column(nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+
+
+class StockLedgerCheckpoint(Base):
+    """Last ledger movement applied to the database (see app.stock.ledger)."""
+
+    __tablename__ = "stock_ledger_checkpoint"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    last_seq: Mapped[int] = mapped_column(nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=datetime.now, server_default=func.now()
+    )
+
+
+class StockLedgerRejection(Base):
+    """
+    Ledger movement acknowledged to the caller but not applied by the flush,
+    because other paths took the stock meanwhile (see app.stock.ledger).
+    """
+
+    __tablename__ = "stock_ledger_rejections"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    seq: Mapped[int] = mapped_column(nullable=False, unique=True)
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=False)
+    quantity: Mapped[int] = mapped_column(nullable=False)
+    reason: Mapped[str] = mapped_column(nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    rejected_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    error: Mapped[str] = mapped_column(nullable=False)
+
+
+class StockAlert(Base):
+    """
+    Active product below one of its stock thresholds. Maintained by the stock
+    paths (see app.stock.alerts), so listing alerts never scans products.
+    """
+
+    __tablename__ = "stock_alerts"
+    # Listado paginado por product_id, por categoría o por nivel
+    __table_args__ = (
+        Index("ix_stock_alerts_category_id_product_id", "category_id", "product_id"),
+        Index("ix_stock_alerts_level_product_id", "level", "product_id"),
+    )
+
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), primary_key=True)
+    # Copia de products.category_id para filtrar sin join
+    category_id: Mapped[int] = mapped_column(nullable=False)
+    level: Mapped[str] = mapped_column(String(10), nullable=False)
+    # Momento en que el producto entró en el nivel actual
+    since: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class ProductBranchStock(Base):
+    """
+    Stock of a product at a branch (Cianbox `stock_sucursal`), written by the
+    catalog ingestion through app.stock.branches.
+    """
+
+    __tablename__ = "product_branch_stock"
+    # Productos disponibles en una sucursal, de mayor a menor disponible
+    __table_args__ = (
+        Index(
+            "ix_product_branch_stock_branch_id_available",
+            "branch_id",
+            "available",
+            "product_id",
+        ),
+    )
+
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), primary_key=True)
+    # id_sucursal de Cianbox
+    branch_id: Mapped[int] = mapped_column(primary_key=True)
+    stock: Mapped[int] = mapped_column(nullable=False)
+    reserved: Mapped[int] = mapped_column(nullable=False)
+    available: Mapped[int] = mapped_column(nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class ProductBranchStockTotal(Base):
+    """
+    Sum of the branch stock of a product, updated with the difference of
+    every change in `product_branch_stock` so it is never recomputed on read.
+    """
+
+    __tablename__ = "product_branch_stock_totals"
+
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), primary_key=True)
+    stock: Mapped[int] = mapped_column(nullable=False)
+    reserved: Mapped[int] = mapped_column(nullable=False)
+    available: Mapped[int] = mapped_column(nullable=False)
+    # Sucursales con fila para el producto
+    branches: Mapped[int] = mapped_column(nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
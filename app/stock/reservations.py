@@ -0,0 +1,279 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, case, delete, func, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.config import get_settings
+from app.core.exceptions import BadRequestException, NotFoundException
+from app.products.models import Product
+from app.stock.alerts import refresh_alerts
+from app.stock.models import StockHistory, StockReservation
+from app.stock.snapshots import record_snapshots
+
+settings = get_settings()
+
+_products = Product.__table__
+
+# UPDATE products SET reserved = reserved + :quantity
+# WHERE id = :product_id AND is_active AND stock - reserved >= :quantity
+HOLD = (
+    _products.update()
+    .where(
+        _products.c.id == bindparam("product_id"),
+        _products.c.is_active.is_(True),
+        _products.c.stock - _products.c.reserved >= bindparam("quantity"),
+    )
+    .values(reserved=_products.c.reserved + bindparam("quantity"))
+)
+
+RELEASE = (
+    _products.update()
+    .where(_products.c.id == bindparam("product_id"))
+    .values(reserved=_products.c.reserved - bindparam("quantity"))
+)
+
+
+
+def reserve(
+    session: Session, product_id: int, quantity: int, user_id: int
+) -> StockReservation:
+    """
+    Holds stock of a product for a user until the reservation expires.
+    Expired reservations of the product are released first, in the same
+    transaction, so they never block the new hold.
+    The caller owns the transaction.
+    :param session: Session whose transaction the reservation joins
+    :param product_id: ID of the product to hold
+    :param quantity: Quantity to hold
+    :param user_id: ID of the user making the reservation
+    :return: The new reservation
+    """
+    now = datetime.now()
+    release_expired(session, [product_id], now)
+
+    result = session.connection().execute(
+        HOLD, {"product_id": product_id, "quantity": quantity}
+    )
+    if result.rowcount != 1:
+        exists = session.scalar(
+            select(Product.id).where(Product.id == product_id, Product.is_active.is_(True))
+        )
+        if exists is None:
+            raise NotFoundException(f"Product with ID {product_id} not found")
+        raise BadRequestException("Not enough stock available to reserve")
+
+    reservation = StockReservation(
+        product_id=product_id,
+        user_id=user_id,
+        quantity=quantity,
+        expires_at=now + timedelta(seconds=settings.stock_reservation_ttl_seconds),
+        created_at=now,
+    )
+    session.add(reservation)
+    session.flush()
+    return reservation
+
+
+def release(session: Session, reservation_id: int, user_id: int | None = None) -> bool:
+    """
+    Releases a reservation before it expires.
+    :param session: Session whose transaction the release joins
+    :param reservation_id: ID of the reservation
+    :param user_id: If given, only a reservation of this user is released
+    :return: True if the reservation existed and was released
+    """
+    condition = StockReservation.id == reservation_id
+    if user_id is not None:
+        condition &= StockReservation.user_id == user_id
+    return bool(_release(session, condition))
+
+
+def release_expired(
+    session: Session, product_ids: list[int], now: datetime | None = None
+) -> None:
+    """
+    Releases the expired reservations of the given products, in the caller's
+    transaction, so `products.reserved` only counts active holds before the
+    stock is checked against it.
+    :param session: Session whose transaction the release joins
+    :param product_ids: IDs of the products about to be checked
+    :param now: Reference time for expiry
+    """
+    if product_ids:
+        _release(
+            session,
+            _expired(now or datetime.now()) & StockReservation.product_id.in_(product_ids),
+        )
+
+
+def sweep_expired(session: Session, now: datetime | None = None, limit: int = 1000) -> int:
+    """
+    Releases up to `limit` expired reservations, oldest first. The index on
+    expires_at makes each sweep proportional to the rows it releases.
+    :return: Number of reservations released
+    """
+    now = now or datetime.now()
+    expired_ids = (
+        select(StockReservation.id)
+        .where(_expired(now))
+        .order_by(StockReservation.expires_at)
+        .limit(limit)
+    )
+    return len(_release(session, StockReservation.id.in_(expired_ids)))
+
+
+def consume_order_lines(
+    session: Session, user_id: int, lines: list[tuple[int, int]], reason: str
+) -> None:
+    """
+    Takes the stock of the lines of an order with a fixed number of
+    statements, whatever the number of lines. For each product the user's
+    active reservations are consumed and the rest of the quantity must be
+    available (not held by other users). Each line is recorded in StockHistory.
+    :param session: Session whose transaction the order is created in
+    :param user_id: ID of the user placing the order
+    :param lines: (product_id, quantity) of each order line
+    :param reason: Reason of the stock movements
+    """
+    if not lines:
+        return
+    quantities: dict[int, int] = defaultdict(int)
+    for product_id, quantity in lines:
+        quantities[product_id] += quantity
+    product_ids = list(quantities)
+
+    now = datetime.now()
+    release_expired(session, product_ids, now)
+
+    held: dict[int, int] = defaultdict(int)
+    for product_id, quantity in session.execute(
+        delete(StockReservation)
+        .where(
+            StockReservation.user_id == user_id,
+            StockReservation.product_id.in_(product_ids),
+        )
+        .returning(StockReservation.product_id, StockReservation.quantity)
+        .execution_options(synchronize_session=False)
+    ):
+        held[product_id] += quantity
+
+    moved = set(session.connection().execute(_consume(quantities, held, now)).scalars())
+    if len(moved) != len(product_ids):
+        # Se informa el primero que no pudo descontarse; el llamador hace rollback
+        failed = next(product_id for product_id in product_ids if product_id not in moved)
+        raise BadRequestException(f"Not enough stock for product {failed}")
+
+    session.execute(
+        insert(StockHistory.__table__),
+        [
+            {"product_id": product_id, "quantity": -quantity, "reason": reason, "created_at": now}
+            for product_id, quantity in lines
+        ],
+    )
+    if settings.stock_snapshots_incremental:
+        record_snapshots(session, product_ids)
+    refresh_alerts(session, product_ids)
+
+
+def _consume(quantities: dict[int, int], held: dict[int, int], now: datetime):
+    # UPDATE products SET stock = stock - q, reserved = reserved - h
+    # WHERE id IN (...) AND is_active AND stock - q >= reserved - h RETURNING id
+    # q y h salen de un CASE por producto: se liberan las reservas propias (h)
+    # y se respetan las de los demás
+    quantity = case(quantities, value=_products.c.id, else_=0)
+    own = case(
+        {product_id: held[product_id] for product_id in quantities},
+        value=_products.c.id,
+        else_=0,
+    )
+    return (
+        _products.update()
+        .where(
+            _products.c.id.in_(list(quantities)),
+            _products.c.is_active.is_(True),
+            _products.c.stock - quantity >= _products.c.reserved - own,
+        )
+        .values(
+            stock=_products.c.stock - quantity,
+            reserved=_products.c.reserved - own,
+            updated_at=now,
+        )
+        .returning(_products.c.id)
+    )
+
+
+def available_stock(session: Session, product_id: int) -> tuple[int, int] | None:
+    """
+    Returns the stock of a product and the quantity held by reservations that
+    have not expired yet (expired ones may still be waiting for a sweep).
+    :return: Tuple (stock, reserved), or None if the product does not exist
+    """
+    return available_stocks(session, [product_id]).get(product_id)
+
+
+def available_stocks(session: Session, product_ids: list[int]) -> dict[int, tuple[int, int]]:
+    """
+    Returns the stock and the quantity held by active reservations of many
+    products in one query (see `available_stock`).
+    :return: product_id -> (stock, reserved) for the products that exist
+    """
+    active = (
+        select(func.coalesce(func.sum(StockReservation.quantity), 0))
+        .where(
+            StockReservation.product_id == Product.id,
+            StockReservation.expires_at > datetime.now(),
+        )
+        .scalar_subquery()
+    )
+    rows = session.execute(
+        select(Product.id, Product.stock, active).where(
+            Product.id.in_(product_ids), Product.is_active.is_(True)
+        )
+    ).all()
+    return {product_id: (stock, reserved) for product_id, stock, reserved in rows}
+
+
+def _expired(now: datetime) -> ColumnElement:
+    return StockReservation.expires_at <= now
+
+
+def _release(session: Session, condition: ColumnElement) -> list:
+    # DELETE ... RETURNING: solo se descuenta lo que esta transacción borró
+    rows = session.execute(
+        delete(StockReservation)
+        .where(condition)
+        .returning(StockReservation.product_id, StockReservation.quantity)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    held: dict[int, int] = defaultdict(int)
+    for product_id, quantity in rows:
+        held[product_id] += quantity
+    if held:
+        session.connection().execute(
+            RELEASE,
+            [{"product_id": product_id, "quantity": quantity} for product_id, quantity in held.items()],
+        )
+    return rows
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.stock.reservations sweep
+    import sys
+
+    import app.models  # noqa: F401
+    from app.core import db_connection
+
+    if sys.argv[1:] != ["sweep"]:
+        print("Usage: python -m app.stock.reservations sweep")
+        sys.exit(1)
+
+    session = db_connection.session
+    total = 0
+    while released := sweep_expired(session):
+        session.commit()
+        total += released
+    session.commit()
+    print(f"Expired stock reservations released: {total}")
@@ -1,15 +1,30 @@
+from datetime import date, datetime
 from typing import Annotated, List
-from fastapi import APIRouter, Body, Depends, Path
+from fastapi import APIRouter, Body, Depends, Header, Path, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.auth.dependencies import require_roles
-from app.stock.schemas import StockMovementCreate
+from app.auth.dependencies import get_current_user, require_roles
+from app.idempotency.service import idempotent
+from app.stock.schemas import (
+    PaginatedBranchAvailabilityResponse,
+    PaginatedStockAlertResponse,
+    PaginatedStockHistoryResponse,
+    ProductBranchStockResponse,
+    StockAtResponse,
+    StockAvailabilityResponse,
+    StockBatchCreate,
+    StockBatchResponse,
+    StockMovementCreate,
+    StockReportResponse,
+    StockReservationCreate,
+    StockReservationResponse,
+)
 from app.products.schemas import (
     ProductPublicResponse,
-    StockHistoryResponse,
     StockUpdate,
 )
-from app.stock.service import adjust_stock
+from app.stock import service as stock_service
 from app.products import service as product_service
 from app.users.models import User
 from app.users.roles import RoleEnum
@@ -17,12 +32,89 @@ from app.users.roles import RoleEnum
 router = APIRouter(prefix="/stock", tags=["Stock"])
 
 
+@router.post(
+    "/batch",
+    response_model=StockBatchResponse,
+    dependencies=[Depends(require_roles(RoleEnum.ADMIN, RoleEnum.SELLER))],
+)
+def move_stock_batch(batch: StockBatchCreate = Body(...)):
+    return stock_service.adjust_stock_batch(batch)
+
+
+@router.get(
+    "/report",
+    response_model=StockReportResponse,
+    dependencies=[Depends(require_roles(RoleEnum.ADMIN, RoleEnum.SELLER))],
+)
+def get_stock_report(day: date = Query(..., alias="date")):
+    return stock_service.get_stock_report(day)
+
+
+@router.get(
+    "/alerts",
+    response_model=PaginatedStockAlertResponse,
+    dependencies=[Depends(require_roles(RoleEnum.ADMIN, RoleEnum.SELLER))],
+)
+def get_stock_alerts(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = Query(None, max_length=200),
+    category_id: int | None = Query(None, gt=0),
+    level: str | None = Query(None, pattern="^(low|critical)$"),
+):
+    return stock_service.get_stock_alerts(
+        limit=limit, cursor=cursor, category_id=category_id, level=level
+    )
+
+
+@router.get("/branches/{branch_id}", response_model=PaginatedBranchAvailabilityResponse)
+def get_branch_availability(
+    branch_id: int = Path(..., ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = Query(None, max_length=200),
+    min_available: int = Query(1, ge=0),
+):
+    return stock_service.get_branch_availability(
+        branch_id, limit=limit, cursor=cursor, min_available=min_available
+    )
+
+
+@router.post(
+    "/reservations",
+    response_model=StockReservationResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+def create_reservation(
+    data: StockReservationCreate,
+    current_user: User = Depends(get_current_user),
+):
+    return stock_service.create_reservation(data, current_user.id)
+
+
+@router.delete(
+    "/reservations/{reservation_id}", status_code=status.HTTP_204_NO_CONTENT
+)
+def cancel_reservation(
+    reservation_id: int,
+    current_user: User = Depends(get_current_user),
+):
+    stock_service.cancel_reservation(reservation_id, current_user.id)
+
+
 @router.post("/{product_id}", response_model=ProductPublicResponse)
 def move_stock(
     product_id: int = Path(..., gt=0),
     movement: StockMovementCreate = Body(...),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
 ):
-    return adjust_stock(product_id, movement.quantity, movement.reason)
+    return idempotent(
+        idempotency_key,
+        scope=f"POST /stock/{product_id}",
+        payload=movement.model_dump(mode="json"),
+        operation=lambda: stock_service.adjust_stock(
+            product_id, movement.quantity, movement.reason, commit=False
+        ),
+        response_model=ProductPublicResponse,
+    )
 
 
 @router.patch(
@@ -37,7 +129,56 @@ def update_stock(
     return product_service.update_stock(product_id, stock_data.stock)
 
 
-@router.get("/{product_id}/stock-history", response_model=List[StockHistoryResponse])
-def get_stock_history(product_id: int):
-    product = product_service._get_one_product(product_id)
-    return product.stock_history
+@router.get(
+    "/{product_id}/stock-history", response_model=PaginatedStockHistoryResponse
+)
+def get_stock_history(
+    product_id: int,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = Query(None, max_length=200),
+    date_from: datetime | None = Query(None, alias="from"),
+    date_to: datetime | None = Query(None, alias="to"),
+    order_dir: str = Query("desc", pattern="^(asc|desc)$"),
+):
+    return stock_service.get_stock_history(
+        product_id,
+        limit=limit,
+        cursor=cursor,
+        date_from=date_from,
+        date_to=date_to,
+        order_dir=order_dir,
+    )
+
+
+@router.get("/{product_id}/availability", response_model=StockAvailabilityResponse)
+def get_availability(product_id: int):
+    return stock_service.get_availability(product_id)
+
+
+@router.get("/{product_id}/branches", response_model=ProductBranchStockResponse)
+def get_product_branch_stock(product_id: int):
+    return stock_service.get_product_branch_stock(product_id)
+
+
+@router.get("/{product_id}/at", response_model=StockAtResponse)
+def get_stock_at(product_id: int, day: date = Query(..., alias="date")):
+    return stock_service.get_stock_at(product_id, day)
+
+
+@router.get(
+    "/{product_id}/stock-history/export",
+    response_class=StreamingResponse,
+    dependencies=[Depends(require_roles(RoleEnum.ADMIN, RoleEnum.SELLER))],
+)
+def export_stock_history(
+    product_id: int,
+    date_from: datetime | None = Query(None, alias="from"),
+    date_to: datetime | None = Query(None, alias="to"),
+):
+    return StreamingResponse(
+        stock_service.export_stock_history(product_id, date_from, date_to),
+        media_type="application/x-ndjson",
+        headers={
+            "Content-Disposition": f'attachment; filename="stock-history-{product_id}.ndjson"'
+        },
+    )
@@ -1,5 +1,9 @@
+from datetime import date, datetime
+from typing import List, Literal
 from pydantic import BaseModel, Field
 
+from app.products.schemas import StockHistoryResponse
+
 
 class StockMovementCreate(BaseModel):
     quantity: int = Field(..., description="Cantidad positiva o negativa")
@@ -12,4 +16,128 @@ class StockMovementCreate(BaseModel):
                 {"quantity": -2, "reason": "Venta"},
             ]
         }
-    }
\ No newline at end of file
+    }
+
+
+class StockBatchLine(StockMovementCreate):
+    product_id: int = Field(..., gt=0)
+
+
+class StockBatchCreate(BaseModel):
+    mode: Literal["atomic", "partial"] = Field(
+        "atomic",
+        description="atomic: se aplican todas las líneas o ninguna; partial: se informa el resultado de cada línea",
+    )
+    items: List[StockBatchLine] = Field(..., min_length=1, max_length=1000)
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "mode": "atomic",
+                    "items": [
+                        {"product_id": 1, "quantity": 24, "reason": "Recepción"},
+                        {"product_id": 2, "quantity": -1, "reason": "Inventario"},
+                    ],
+                }
+            ]
+        }
+    }
+
+
+class StockBatchError(BaseModel):
+    line: int
+    product_id: int
+    error: str
+
+
+class StockBatchResponse(BaseModel):
+    applied: int
+    rejected: int
+    errors: List[StockBatchError] = []
+
+
+class PaginatedStockHistoryResponse(BaseModel):
+    data: List[StockHistoryResponse]
+    has_next: bool = False
+    next_cursor: str | None = None
+
+
+class StockLevel(BaseModel):
+    product_id: int
+    stock: int
+
+
+class StockAtResponse(StockLevel):
+    date: date
+
+
+class StockReportResponse(BaseModel):
+    date: date
+    items: List[StockLevel]
+
+
+class StockReservationCreate(BaseModel):
+    product_id: int = Field(..., gt=0)
+    quantity: int = Field(..., gt=0)
+
+
+class StockReservationResponse(BaseModel):
+    id: int
+    product_id: int
+    quantity: int
+    expires_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+class StockAvailabilityResponse(BaseModel):
+    product_id: int
+    stock: int
+    reserved: int
+    available: int
+
+
+class BranchStockResponse(BaseModel):
+    product_id: int
+    branch_id: int
+    stock: int
+    reserved: int
+    available: int
+    updated_at: datetime
+
+
+class BranchAvailabilityResponse(BranchStockResponse):
+    name: str
+
+
+class PaginatedBranchAvailabilityResponse(BaseModel):
+    data: List[BranchAvailabilityResponse]
+    has_next: bool = False
+    next_cursor: str | None = None
+
+
+class ProductBranchStockResponse(BaseModel):
+    product_id: int
+    # Totales de todas las sucursales
+    stock: int
+    reserved: int
+    available: int
+    branches: List[BranchStockResponse]
+
+
+class StockAlertResponse(BaseModel):
+    product_id: int
+    name: str
+    category_id: int
+    level: str
+    stock: int
+    min_stock: int
+    critical_stock: int
+    since: datetime
+
+
+class PaginatedStockAlertResponse(BaseModel):
+    data: List[StockAlertResponse]
+    has_next: bool = False
+    next_cursor: str | None = None
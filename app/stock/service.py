@@ -1,28 +1,467 @@
-from sqlalchemy.orm import Session, joinedload
+import json
+from datetime import date, datetime
+from typing import Iterator
+from sqlalchemy import asc, desc, select
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.core.exceptions import NotFoundException
+from app.core.logger import setup_logger
+from app.core.pagination import encode_cursor, keyset_filter
 from app.products.models import Product
-from app.core.exceptions import NotFoundException, BadRequestException
-from app.stock.models import StockHistory
+from app.products.cache import bump_catalog_version
+from app.products.service import _get_one_product, product_relations
+from app.stock.engine import StockMovement, apply_stock_movement, apply_stock_movements
 from app.products.schemas import ProductPublicResponse
+from app.products.schemas import StockHistoryResponse
+from app.stock.models import (
+    ProductBranchStock,
+    ProductBranchStockTotal,
+    StockAlert,
+    StockHistory,
+)
+from app.stock.schemas import (
+    BranchAvailabilityResponse,
+    BranchStockResponse,
+    PaginatedBranchAvailabilityResponse,
+    PaginatedStockAlertResponse,
+    PaginatedStockHistoryResponse,
+    ProductBranchStockResponse,
+    StockAtResponse,
+    StockAlertResponse,
+    StockAvailabilityResponse,
+    StockBatchCreate,
+    StockBatchError,
+    StockBatchResponse,
+    StockLevel,
+    StockReportResponse,
+    StockReservationCreate,
+    StockReservationResponse,
+)
+from app.stock import ledger, reservations
+from app.stock.snapshots import stock_at_statement
 from app.core import db_connection
 
 db: Session = db_connection.session
+logger = setup_logger(__name__)
+settings = get_settings()
 
-def adjust_stock(product_id: int, quantity: int, reason: str) -> ProductPublicResponse:
-    product = db.query(Product).filter_by(id=product_id).first()
-    if not product:
+HISTORY_EXPORT_BATCH_SIZE = 1000
+
+def adjust_stock(
+    product_id: int, quantity: int, reason: str, commit: bool = True
+) -> ProductPublicResponse:
+    """
+    Applies a stock movement to a product, through the ledger when it is enabled.
+    :param product_id: ID of the product
+    :param quantity: Quantity to add (negative to remove)
+    :param reason: Reason for the movement
+    :param commit: False leaves the transaction open for the caller
+    :return: The product with its updated stock
+    """
+    if ledger.stock_ledger is not None:
+        ledger.stock_ledger.append(product_id, quantity, reason)
+    else:
+        try:
+            apply_stock_movement(db, product_id, quantity, reason)
+            bump_catalog_version(db)
+            if commit:
+                db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    product = (
+        db.query(Product)
+        .options(*product_relations())
+        .populate_existing()
+        .filter_by(id=product_id)
+        .one()
+    )
+    response = ProductPublicResponse.model_validate(product)
+    response.stock = ledger.current_stock(product_id, product.stock)
+    return response
+
+
+def adjust_stock_batch(batch: StockBatchCreate) -> StockBatchResponse:
+    """
+    Applies a batch of stock movements in a single transaction.
+    :param batch: Movements to apply and whether they are all-or-nothing
+    :return: StockBatchResponse with the applied and rejected lines
+    """
+    movements = [
+        StockMovement(item.product_id, item.quantity, item.reason)
+        for item in batch.items
+    ]
+    try:
+        rejected = apply_stock_movements(
+            db, movements, atomic=batch.mode == "atomic"
+        )
+        applied = len(movements) - len(rejected)
+        if applied:
+            bump_catalog_version(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return StockBatchResponse(
+        applied=applied,
+        rejected=len(rejected),
+        errors=[StockBatchError(**line._asdict()) for line in rejected],
+    )
+
+
+def get_stock_history(
+    product_id: int,
+    limit: int = 50,
+    cursor: str | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    order_dir: str = "desc",
+) -> PaginatedStockHistoryResponse:
+    """
+    Get a page of the stock movements of a product.
+    Pages are fetched by keyset over (created_at, id), so the cost of a page
+    does not depend on how many movements the product has.
+    :param product_id: ID of the product
+    :param limit: Maximum number of movements to return
+    :param cursor: Optional cursor returned with a previous page
+    :param date_from: Only movements created at or after this date
+    :param date_to: Only movements created before this date
+    :param order_dir: 'desc' (newest first, default) or 'asc'
+    :return: PaginatedStockHistoryResponse with the movements and the next cursor
+    """
+    _get_one_product(product_id)
+
+    descending = order_dir.lower() == "desc"
+    statement = _history_statement(product_id, date_from, date_to, descending)
+    if cursor:
+        statement = statement.where(
+            keyset_filter(StockHistory.created_at, StockHistory.id, cursor, descending)
+        )
+
+    # Se pide un registro extra para saber si existe una página siguiente
+    rows = db.scalars(statement.limit(limit + 1)).all()
+
+    next_cursor = None
+    has_next = len(rows) > limit
+    if has_next:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return PaginatedStockHistoryResponse(
+        data=[StockHistoryResponse.model_validate(row) for row in rows],
+        has_next=has_next,
+        next_cursor=next_cursor,
+    )
+
+
+def export_stock_history(
+    product_id: int,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+) -> Iterator[bytes]:
+    """
+    Streams the stock movements of a product as NDJSON, oldest first.
+    The product is validated before streaming starts; rows are then read with
+    `yield_per` from a dedicated session, so memory stays constant.
+    :param product_id: ID of the product
+    :param date_from: Only movements created at or after this date
+    :param date_to: Only movements created before this date
+    :return: Iterator of encoded chunks, to be sent with a StreamingResponse
+    """
+    _get_one_product(product_id)
+
+    statement = (
+        _history_statement(product_id, date_from, date_to, descending=False)
+        .with_only_columns(
+            StockHistory.id,
+            StockHistory.quantity,
+            StockHistory.reason,
+            StockHistory.created_at,
+        )
+        .execution_options(yield_per=HISTORY_EXPORT_BATCH_SIZE)
+    )
+    return _ndjson_history(statement, product_id)
+
+
+def get_stock_at(product_id: int, day: date) -> StockAtResponse:
+    """
+    Get the closing stock of a product on a given day.
+    :param product_id: ID of the product
+    :param day: Day to query
+    :return: StockAtResponse with the stock at the end of that day
+    """
+    _get_one_product(product_id)
+
+    stock = db.execute(
+        stock_at_statement(day).where(Product.id == product_id)
+    ).one_or_none()
+    # El producto todavía no existía ese día
+    return StockAtResponse(
+        product_id=product_id, date=day, stock=stock.stock if stock else 0
+    )
+
+
+def get_stock_report(day: date) -> StockReportResponse:
+    """
+    Get the closing stock of every active product on a given day, computed
+    in a single query over the snapshots (see `stock_at_statement`).
+    :param day: Day to query
+    :return: StockReportResponse with one entry per product
+    """
+    rows = db.execute(stock_at_statement(day)).all()
+    return StockReportResponse(
+        date=day,
+        items=[StockLevel(product_id=row.id, stock=row.stock) for row in rows],
+    )
+
+
+def create_reservation(
+    data: StockReservationCreate, user_id: int
+) -> StockReservationResponse:
+    """
+    Hold stock of a product for the current user during checkout.
+    :param data: Product and quantity to hold
+    :param user_id: ID of the user making the reservation
+    :return: StockReservationResponse with the reservation and its expiry
+    """
+    # Cada reserva nueva libera un lote acotado de reservas vencidas
+    if reservations.sweep_expired(db, limit=settings.stock_reservation_sweep_batch):
+        db.commit()
+
+    try:
+        reservation = reservations.reserve(db, data.product_id, data.quantity, user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    logger.info(
+        f"Reserved {data.quantity} units of product {data.product_id} for user {user_id} until {reservation.expires_at}"
+    )
+    return StockReservationResponse.model_validate(reservation)
+
+
+def cancel_reservation(reservation_id: int, user_id: int) -> None:
+    """
+    Release a reservation of the current user before it expires.
+    :param reservation_id: ID of the reservation
+    :param user_id: ID of the user that made it
+    """
+    try:
+        released = reservations.release(db, reservation_id, user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if not released:
+        logger.error(f"Reservation {reservation_id} not found for user {user_id}")
+        raise NotFoundException(f"Reservation with ID {reservation_id} not found")
+
+
+def get_availability(product_id: int) -> StockAvailabilityResponse:
+    """
+    Get the stock of a product that is not held by active reservations.
+    :param product_id: ID of the product
+    :return: StockAvailabilityResponse with stock, reserved and available quantities
+    """
+    levels = reservations.available_stock(db, product_id)
+    if levels is None:
         raise NotFoundException(f"Product with ID {product_id} not found")
 
-    new_stock = product.stock + quantity
-    if new_stock < 0:
-        raise BadRequestException("Stock no puede quedar negativo")
+    stock, reserved = levels
+    stock = ledger.current_stock(product_id, stock)
+    return StockAvailabilityResponse(
+        product_id=product_id,
+        stock=stock,
+        reserved=reserved,
+        available=max(stock - reserved, 0),
+    )
+
+
+def get_stock_alerts(
+    limit: int = 50,
+    cursor: str | None = None,
+    category_id: int | None = None,
+    level: str | None = None,
+) -> PaginatedStockAlertResponse:
+    """
+    Get a page of the products below one of their stock thresholds.
+    Reads the alert set kept by `app.stock.alerts`, paged by keyset over the
+    product id, so the cost does not depend on the size of the catalog.
+    :param limit: Maximum number of alerts to return
+    :param cursor: Optional cursor returned with a previous page
+    :param category_id: Only products of this category
+    :param level: Only alerts of this level ('low' or 'critical')
+    :return: PaginatedStockAlertResponse with the alerts and the next cursor
+    """
+    statement = (
+        select(
+            StockAlert.product_id,
+            Product.name,
+            StockAlert.category_id,
+            StockAlert.level,
+            Product.stock,
+            Product.min_stock,
+            Product.critical_stock,
+            StockAlert.since,
+        )
+        .join(Product, Product.id == StockAlert.product_id)
+        .order_by(StockAlert.product_id)
+    )
+    if category_id is not None:
+        statement = statement.where(StockAlert.category_id == category_id)
+    if level is not None:
+        statement = statement.where(StockAlert.level == level)
+    if cursor:
+        statement = statement.where(
+            keyset_filter(StockAlert.product_id, StockAlert.product_id, cursor, False)
+        )
+
+    rows = db.execute(statement.limit(limit + 1)).all()
+
+    next_cursor = None
+    has_next = len(rows) > limit
+    if has_next:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].product_id, rows[-1].product_id)
+
+    alerts = []
+    for row in rows:
+        alert = StockAlertResponse.model_validate(row._asdict())
+        alert.stock = ledger.current_stock(row.product_id, row.stock)
+        alerts.append(alert)
+    return PaginatedStockAlertResponse(data=alerts, has_next=has_next, next_cursor=next_cursor)
+
+
+def get_branch_availability(
+    branch_id: int,
+    limit: int = 50,
+    cursor: str | None = None,
+    min_available: int = 1,
+) -> PaginatedBranchAvailabilityResponse:
+    """
+    Get a page of the active products available at a branch, most available
+    first. Walks the (branch_id, available, product_id) index by keyset, so
+    the cost does not depend on the number of products of the branch.
+    :param branch_id: Cianbox ID of the branch
+    :param limit: Maximum number of products to return
+    :param cursor: Optional cursor returned with a previous page
+    :param min_available: Minimum available quantity
+    :return: PaginatedBranchAvailabilityResponse with the products and the next cursor
+    """
+    statement = (
+        select(
+            ProductBranchStock.product_id,
+            ProductBranchStock.branch_id,
+            Product.name,
+            ProductBranchStock.stock,
+            ProductBranchStock.reserved,
+            ProductBranchStock.available,
+            ProductBranchStock.updated_at,
+        )
+        .join(Product, Product.id == ProductBranchStock.product_id)
+        .where(
+            ProductBranchStock.branch_id == branch_id,
+            ProductBranchStock.available >= min_available,
+            Product.is_active.is_(True),
+        )
+        .order_by(desc(ProductBranchStock.available), desc(ProductBranchStock.product_id))
+    )
+    if cursor:
+        statement = statement.where(
+            keyset_filter(
+                ProductBranchStock.available, ProductBranchStock.product_id, cursor, True
+            )
+        )
+
+    rows = db.execute(statement.limit(limit + 1)).all()
+
+    next_cursor = None
+    has_next = len(rows) > limit
+    if has_next:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].available, rows[-1].product_id)
+
+    return PaginatedBranchAvailabilityResponse(
+        data=[BranchAvailabilityResponse.model_validate(row._asdict()) for row in rows],
+        has_next=has_next,
+        next_cursor=next_cursor,
+    )
+
+
+def get_product_branch_stock(product_id: int) -> ProductBranchStockResponse:
+    """
+    Get the stock of a product at every branch, with the totals kept by
+    `app.stock.branches` (not summed on read).
+    :param product_id: ID of the product
+    :return: ProductBranchStockResponse with the totals and one row per branch
+    """
+    if db.scalar(select(Product.id).where(Product.id == product_id)) is None:
+        raise NotFoundException(f"Product with ID {product_id} not found")
+
+    total = db.get(ProductBranchStockTotal, product_id)
+    branches = db.execute(
+        select(
+            ProductBranchStock.product_id,
+            ProductBranchStock.branch_id,
+            ProductBranchStock.stock,
+            ProductBranchStock.reserved,
+            ProductBranchStock.available,
+            ProductBranchStock.updated_at,
+        )
+        .where(ProductBranchStock.product_id == product_id)
+        .order_by(ProductBranchStock.branch_id)
+    ).all()
+    return ProductBranchStockResponse(
+        product_id=product_id,
+        stock=total.stock if total else 0,
+        reserved=total.reserved if total else 0,
+        available=total.available if total else 0,
+        branches=[BranchStockResponse.model_validate(row._asdict()) for row in branches],
+    )
+
 
-    product.stock = new_stock
+def _ndjson_history(statement, product_id: int) -> Iterator[bytes]:
+    session: Session = db_connection.session
+    try:
+        for partition in session.execute(statement).partitions():
+            yield "".join(
+                json.dumps(
+                    {
+                        "id": row.id,
+                        "product_id": product_id,
+                        "quantity": row.quantity,
+                        "reason": row.reason,
+                        "created_at": row.created_at.isoformat(),
+                    },
+                    ensure_ascii=False,
+                )
+                + "\n"
+                for row in partition
+            ).encode("utf-8")
+    finally:
+        session.close()
 
-    history = StockHistory(product_id=product_id, quantity=quantity, reason=reason)
-    db.add(history)
+    logger.info(f"Stock history of product {product_id} exported")
 
-    db.commit()
-    db.refresh(product)
 
-    product = db.query(Product).options(joinedload(Product.category)).get(product_id)
-    return ProductPublicResponse.model_validate(product)
+def _history_statement(
+    product_id: int,
+    date_from: datetime | None,
+    date_to: datetime | None,
+    descending: bool,
+):
+    direction = desc if descending else asc
+    statement = (
+        select(StockHistory)
+        .where(StockHistory.product_id == product_id)
+        .order_by(direction(StockHistory.created_at), direction(StockHistory.id))
+    )
+    if date_from is not None:
+        statement = statement.where(StockHistory.created_at >= date_from)
+    if date_to is not None:
+        statement = statement.where(StockHistory.created_at < date_to)
+    return statement
@@ -0,0 +1,193 @@
+import argparse
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import Date, DateTime, Select, and_, case, func, literal, select
+from sqlalchemy.orm import Session
+
+from app.core.sql import execute_upsert, upsert
+from app.products.models import Product
+from app.stock.models import StockHistory, StockSnapshot
+
+# Motivo visible de los saldos iniciales; se identifican por is_opening_balance
+OPENING_BALANCE_REASON = "Saldo inicial"
+
+
+def day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+
+def record_snapshots(session: Session, product_ids: list[int], day: date | None = None) -> None:
+    """
+    Writes the current stock of the given products as their closing stock of
+    `day` (today by default), replacing the previous value for that day.
+    Meant to run in the same transaction as the stock movement.
+    :param session: Session whose transaction the snapshots join
+    :param product_ids: IDs of the products that just moved
+    :param day: Day the snapshot belongs to
+    """
+    if not product_ids:
+        return
+    day = day or date.today()
+    rows = select(
+        Product.id.label("product_id"),
+        literal(day, Date).label("day"),
+        literal(day_start(day + timedelta(days=1)), DateTime).label("closed_at"),
+        Product.stock.label("closing_stock"),
+    ).where(Product.id.in_(product_ids))
+    execute_upsert(session, _upsert_snapshots(session, rows))
+
+
+def compact_snapshots(session: Session, day: date) -> int:
+    """
+    Rebuilds the closing stock of `day` for every product that moved that day,
+    walking back from the current stock through the movements recorded since.
+    Used to backfill days when incremental snapshots were disabled.
+    :param session: Database session (the caller commits)
+    :param day: Day to compact; must be in the past
+    :return: Number of snapshots written
+    """
+    start, end = day_start(day), day_start(day + timedelta(days=1))
+    later_movements = (
+        select(func.coalesce(func.sum(StockHistory.quantity), 0))
+        .where(StockHistory.product_id == Product.id, StockHistory.created_at >= end)
+        .scalar_subquery()
+    )
+    moved = select(StockHistory.product_id).where(
+        StockHistory.created_at >= start, StockHistory.created_at < end
+    )
+    rows = select(
+        Product.id.label("product_id"),
+        literal(day, Date).label("day"),
+        literal(end, DateTime).label("closed_at"),
+        (Product.stock - later_movements).label("closing_stock"),
+    ).where(Product.id.in_(moved))
+    return execute_upsert(session, _upsert_snapshots(session, rows)).rowcount
+
+
+def record_opening_snapshots(session: Session, product_ids: list[int], horizon: datetime) -> None:
+    """
+    Writes the closing stock of the day before `horizon` for the given
+    products, walking back from the current stock through the movements
+    recorded since (the opening balance at `horizon` excluded). Written by the
+    history compaction so point-in-time stock after the horizon never needs
+    the compacted movements.
+    :param session: Session whose transaction the snapshots join
+    :param product_ids: IDs of the products whose history was compacted
+    :param horizon: Start of the day the opening balances were written at
+    """
+    if not product_ids:
+        return
+    later_movements = (
+        select(func.coalesce(func.sum(StockHistory.quantity), 0))
+        .where(
+            StockHistory.product_id == Product.id,
+            StockHistory.created_at >= horizon,
+            ~_is_opening_balance(horizon),
+        )
+        .scalar_subquery()
+    )
+    rows = select(
+        Product.id.label("product_id"),
+        literal((horizon - timedelta(days=1)).date(), Date).label("day"),
+        literal(horizon, DateTime).label("closed_at"),
+        (Product.stock - later_movements).label("closing_stock"),
+    ).where(Product.id.in_(product_ids))
+    execute_upsert(session, _upsert_snapshots(session, rows))
+
+
+def stock_at_statement(day: date) -> Select:
+    """
+    Builds a query with the closing stock of `day` for every active product
+    that existed by then, as (id, stock) rows.
+    Each product reads its latest snapshot up to `day` plus the movements
+    after it; products without a snapshot walk back from the current stock.
+    Opening balances at the snapshot's close are already part of it.
+    """
+    end = day_start(day + timedelta(days=1))
+
+    latest = (
+        select(StockSnapshot.product_id, func.max(StockSnapshot.day).label("day"))
+        .where(StockSnapshot.day <= day)
+        .group_by(StockSnapshot.product_id)
+        .subquery("latest")
+    )
+    snapshot = (
+        select(
+            StockSnapshot.product_id,
+            StockSnapshot.closed_at,
+            StockSnapshot.closing_stock,
+        )
+        .join(
+            latest,
+            and_(
+                latest.c.product_id == StockSnapshot.product_id,
+                latest.c.day == StockSnapshot.day,
+            ),
+        )
+        .subquery("snapshot")
+    )
+
+    movements_since_snapshot = (
+        select(func.coalesce(func.sum(StockHistory.quantity), 0))
+        .where(
+            StockHistory.product_id == Product.id,
+            StockHistory.created_at >= snapshot.c.closed_at,
+            StockHistory.created_at < end,
+            ~_is_opening_balance(snapshot.c.closed_at),
+        )
+        .scalar_subquery()
+    )
+    movements_after_day = (
+        select(func.coalesce(func.sum(StockHistory.quantity), 0))
+        .where(StockHistory.product_id == Product.id, StockHistory.created_at >= end)
+        .scalar_subquery()
+    )
+    stock = case(
+        (
+            snapshot.c.closing_stock.is_not(None),
+            snapshot.c.closing_stock + movements_since_snapshot,
+        ),
+        else_=Product.stock - movements_after_day,
+    )
+
+    return (
+        select(Product.id, stock.label("stock"))
+        .outerjoin(snapshot, snapshot.c.product_id == Product.id)
+        .where(Product.is_active.is_(True), Product.created_at < end)
+        .order_by(Product.id)
+    )
+
+
+def _is_opening_balance(at):
+    return and_(StockHistory.is_opening_balance.is_(True), StockHistory.created_at == at)
+
+
+def _upsert_snapshots(session: Session, rows: Select):
+    return upsert(
+        session.get_bind().dialect.name,
+        StockSnapshot.__table__,
+        index_elements=["product_id", "day"],
+        update_columns=["closed_at", "closing_stock"],
+        select=rows,
+    )
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.stock.snapshots compact [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+    import app.models  # noqa: F401
+    from app.core import db_connection
+
+    yesterday = date.today() - timedelta(days=1)
+    parser = argparse.ArgumentParser(prog="python -m app.stock.snapshots")
+    parser.add_argument("command", choices=["compact"])
+    parser.add_argument("--from", dest="day_from", type=date.fromisoformat, default=yesterday)
+    parser.add_argument("--to", dest="day_to", type=date.fromisoformat, default=yesterday)
+    args = parser.parse_args()
+
+    session = db_connection.session
+    day, written = args.day_from, 0
+    while day <= args.day_to:
+        written += compact_snapshots(session, day)
+        session.commit()
+        day += timedelta(days=1)
+    print(f"Stock snapshots compacted from {args.day_from} to {args.day_to}: {written} rows")
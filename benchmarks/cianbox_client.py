@@ -0,0 +1,119 @@
+"""
+Benchmark of Cianbox page fetching: one blocking request at a time with a
+new connection each (naive client) against the pooled async `CianboxClient`.
+
+Starts the local stub server (app.integrations.cianbox.stub_server) on a free
+port with the given latency and error rate, fetches the same pages with each
+strategy and reports throughput and latency percentiles. Pooled latencies
+include the time each request waits behind the concurrency limit.
+
+Uso: python -m benchmarks.cianbox_client [--requests 200] [--latency-ms 50]
+     [--error-rate 0.02] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+import socket
+import statistics
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from app.integrations.cianbox.client import CianboxClient, CianboxError
+from app.integrations.cianbox.stub_server import create_stub_app
+
+
+def start_stub(latency: float, error_rate: float) -> tuple[uvicorn.Server, str]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    app = create_stub_app(
+        products=10_000,
+        page_size=5,
+        latency=latency,
+        jitter=latency / 2,
+        error_rate=error_rate,
+        seed=1,
+    )
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def naive(base_url: str, pages: list[int]) -> tuple[list[float], int]:
+    # Cliente ingenuo: una conexión nueva por pedido, sin reintentos
+    timings, errors = [], 0
+    for page in pages:
+        start = time.perf_counter()
+        response = httpx.get(f"{base_url}/pv_productos", params={"page": page})
+        timings.append((time.perf_counter() - start) * 1000)
+        errors += response.status_code >= 400
+    return timings, errors
+
+
+def pooled(base_url: str, pages: list[int], concurrency: int) -> tuple[list[float], int]:
+    timings, errors = [], 0
+
+    async def run() -> None:
+        nonlocal errors
+        async with CianboxClient(
+            base_url=base_url,
+            max_connections=concurrency,
+            max_concurrency=concurrency,
+            rate_per_second=10_000,
+            burst=concurrency,
+            backoff_seconds=0.05,
+        ) as client:
+
+            async def fetch(page: int) -> None:
+                nonlocal errors
+                start = time.perf_counter()
+                try:
+                    await client.list_products(page)
+                except CianboxError:
+                    errors += 1
+                timings.append((time.perf_counter() - start) * 1000)
+
+            await asyncio.gather(*(fetch(page) for page in pages))
+
+    asyncio.run(run())
+    return timings, errors
+
+
+def report(name: str, timings: list[float], errors: int, elapsed: float) -> None:
+    percentiles = statistics.quantiles(timings, n=100)
+    print(
+        f"{name:<8} {len(timings) / elapsed:>9.1f} {percentiles[49]:>8.1f} "
+        f"{percentiles[94]:>8.1f} {percentiles[98]:>8.1f} {errors:>7}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    server, base_url = start_stub(args.latency_ms / 1000, args.error_rate)
+    pages = [1 + i % 200 for i in range(args.requests)]
+
+    print(f"{'client':<8} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    start = time.perf_counter()
+    timings, errors = naive(base_url, pages)
+    report("naive", timings, errors, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    timings, errors = pooled(base_url, pages, args.concurrency)
+    report("pooled", timings, errors, time.perf_counter() - start)
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
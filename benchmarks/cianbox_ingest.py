@@ -0,0 +1,81 @@
+"""
+Benchmark of the Cianbox catalog ingestion (app.integrations.cianbox.ingest)
+against the local stub server, for growing catalogue sizes.
+
+Runs a full ingestion into a temporary SQLite database for each size and
+then an incremental run with nothing new, reporting the time, products per
+second and the peak resident memory of the process so far. Memory depends
+on the pages in flight and the batch size, not on the catalogue size.
+
+Uso: python -m benchmarks.cianbox_ingest [--products 10000,100000,500000]
+     [--page-size 500] [--batch-size 1000] [--concurrency 8]
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models import *  # noqa: F401,F403 - registra todos los modelos
+from app.integrations.cianbox.client import CianboxClient
+from app.integrations.cianbox.ingest import ingest_products
+from app.integrations.cianbox.stub_server import create_stub_app
+from app.products.search import get_search_backend
+
+
+def run(products: int, page_size: int, batch_size: int, concurrency: int) -> None:
+    path = os.path.join(tempfile.mkdtemp(), "bench_ingest.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    get_search_backend("sqlite").create_index(engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+    app = create_stub_app(products=products, page_size=page_size)
+
+    async def ingest(full: bool):
+        async with CianboxClient(
+            base_url="http://cianbox.test",
+            transport=httpx.ASGITransport(app=app),
+            rate_per_second=100_000,
+            burst=concurrency,
+        ) as client:
+            return await ingest_products(
+                client, factory, full=full, batch_size=batch_size, concurrency=concurrency
+            )
+
+    for name, full in (("full", True), ("delta", False)):
+        start = time.perf_counter()
+        result = asyncio.run(ingest(full))
+        elapsed = time.perf_counter() - start
+        # ru_maxrss está en KiB en Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(
+            f"{products:>9} {name:<6} {result.upserted:>9} {elapsed:>9.1f} "
+            f"{result.upserted / elapsed:>9.0f} {peak:>10.1f}"
+        )
+
+    engine.dispose()
+    os.remove(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", default="10000,100000,500000")
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{'catalogue':>9} {'run':<6} {'products':>9} {'seconds':>9} {'per s':>9} {'max RSS MB':>8}")
+    for products in (int(value) for value in args.products.split(",")):
+        run(products, args.page_size, args.batch_size, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
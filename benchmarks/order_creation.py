@@ -0,0 +1,141 @@
+"""
+Benchmark of order creation latency against the number of lines: one query
+and one stock update per line (previous behaviour) against the set-based
+`create_order` (current behaviour).
+
+Seeds a temporary SQLite database and creates orders of increasing size with
+each strategy, reporting the SQL statements sent and the median latency.
+
+Uso: python -m benchmarks.order_creation [--lines 1,10,50,200] [--repeat 20]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models import *  # noqa: F401,F403 - registra todos los modelos
+from app.categories.models import Category
+from app.orders import service
+from app.orders.models import Order, OrderItem, SyncStatus
+from app.orders.schemas import OrderCreate
+from app.products.models import Product
+from app.stock.reservations import consume_order_lines
+
+PRODUCTS = 1000
+
+
+def seed(engine) -> None:
+    now = datetime.now()
+    with engine.begin() as connection:
+        connection.execute(insert(Category), [{"id": 1, "name": "Categoria"}])
+        connection.execute(
+            insert(Product),
+            [
+                {
+                    "id": i,
+                    "name": f"Producto {i}",
+                    "price": 100.0,
+                    "stock": 1_000_000,
+                    "category_id": 1,
+                    "created_at": now,
+                    "updated_at": now,
+                    "is_active": True,
+                }
+                for i in range(1, PRODUCTS + 1)
+            ],
+        )
+
+
+def create_order_per_line(order_data: OrderCreate, user_id: int) -> Order:
+    # Comportamiento anterior: una consulta y un UPDATE por línea
+    db = service.db
+    new_order = Order(user_id=user_id, total_amount=0.0, observations=order_data.observations)
+    db.add(new_order)
+    db.flush()
+
+    total = 0
+    for item in order_data.items:
+        db.query(Product).filter(Product.id == item.product_id).first()
+        consume_order_lines(
+            db, user_id, [(item.product_id, item.quantity)], f"Pedido #{new_order.id}"
+        )
+        subtotal = item.quantity * item.unit_price
+        total += subtotal
+        db.add(
+            OrderItem(
+                order_id=new_order.id,
+                product_id=item.product_id,
+                quantity=item.quantity,
+                unit_price=item.unit_price,
+                total_price=subtotal,
+            )
+        )
+    db.add(SyncStatus(order_id=new_order.id, platform="cianbox", status="pending"))
+    new_order.total_amount = total
+    db.commit()
+    db.refresh(new_order)
+    return new_order
+
+
+STRATEGIES = {
+    "per line": create_order_per_line,
+    "set-based": lambda order_data, user_id: service.create_order(order_data, user_id),
+}
+
+
+def measure(engine, create, order_data: OrderCreate, repeat: int) -> tuple[int, float]:
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    create(order_data, 1)
+    event.remove(engine, "before_cursor_execute", record)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        create(order_data, 1)
+        timings.append((time.perf_counter() - start) * 1000)
+    return len(statements), statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", default="1,10,50,200")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_orders.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    seed(engine)
+    service.db = sessionmaker(bind=engine, autoflush=False)()
+
+    print(f"{'lines':>6} {'strategy':<10} {'queries':>8} {'ms':>9}")
+    for lines in (int(value) for value in args.lines.split(",")):
+        order_data = OrderCreate(
+            items=[
+                {"product_id": 1 + i % PRODUCTS, "quantity": 1, "unit_price": 100.0}
+                for i in range(lines)
+            ]
+        )
+        for strategy, create in STRATEGIES.items():
+            statements, latency = measure(engine, create, order_data, args.repeat)
+            print(f"{lines:>6} {strategy:<10} {statements:>8} {latency:>9.2f}")
+
+    service.db.close()
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Benchmark of the product listing loaders: joinedload (previous behaviour)
+against selectinload (current behaviour).
+
+Seeds a temporary SQLite database where every product has 10 images, then
+loads listing pages and a product detail with each strategy. For every run it
+reports the number of SQL statements, the rows and values (rows x columns)
+they return and the latency.
+
+With 20000 products and pages of 100 selectinload moves 7400 values in
+1120 rows against 24000 values in 1000 rows, but on a local SQLite file
+the latency is about the same (35-40 ms per page with either strategy) and
+the detail is about 1 ms slower for its two extra queries. The saving is in
+the data transferred, which only shows up in latency with a database
+reached over the network.
+
+Uso: python -m benchmarks.product_listing [--products 20000] [--images 10] [--limit 100]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.core.database import Base
+from app.models import *  # noqa: F401,F403 - registra todos los modelos
+from app.products.models import Product, ProductImage
+from app.categories.models import Category
+from app.products.schemas import ProductPublicResponse
+
+STRATEGIES = {
+    "joinedload": (joinedload(Product.category), joinedload(Product.images)),
+    "selectinload": (selectinload(Product.category), selectinload(Product.images)),
+}
+
+
+def seed(engine, products: int, images: int) -> None:
+    now = datetime.now()
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Category),
+            [{"id": i, "name": f"Categoria {i}"} for i in range(1, 21)],
+        )
+        connection.execute(
+            insert(Product),
+            [
+                {
+                    "id": i,
+                    "name": f"Producto {i}",
+                    "description": f"Descripcion del producto {i}",
+                    "price": float(i % 500),
+                    "stock": i % 50,
+                    "category_id": 1 + i % 20,
+                    "created_at": now,
+                    "updated_at": now,
+                    "is_active": True,
+                }
+                for i in range(1, products + 1)
+            ],
+        )
+        connection.execute(
+            insert(ProductImage),
+            [
+                {
+                    "product_id": i,
+                    "url": f"https://res.cloudinary.com/demo/products/{i}-{j}.jpg",
+                    "public_id": f"products/{i}-{j}",
+                    "position": j,
+                    "created_at": now,
+                }
+                for i in range(1, products + 1)
+                for j in range(1, images + 1)
+            ],
+        )
+
+
+class StatementRecorder:
+    """Records every SELECT sent to the database during a load."""
+
+    def __init__(self, engine):
+        self.statements: list[tuple[str, tuple]] = []
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.statements.append((statement, parameters))
+
+    def rows_fetched(self, engine) -> tuple[int, int]:
+        # Se re-ejecutan las sentencias capturadas para contar las filas devueltas
+        raw = engine.raw_connection()
+        rows = values = 0
+        try:
+            cursor = raw.cursor()
+            for statement, parameters in self.statements:
+                result = cursor.execute(statement, parameters).fetchall()
+                rows += len(result)
+                values += sum(len(row) for row in result)
+            return rows, values
+        finally:
+            raw.close()
+
+
+def load_page(engine, options, skip: int, limit: int):
+    with Session(engine) as session:
+        products = (
+            session.query(Product)
+            .filter(Product.is_active.is_(True))
+            .options(*options)
+            .order_by(Product.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        return [ProductPublicResponse.model_validate(p) for p in products]
+
+
+def load_detail(engine, options, product_id: int):
+    with Session(engine) as session:
+        product = (
+            session.query(Product).options(*options).filter_by(id=product_id).first()
+        )
+        return ProductPublicResponse.model_validate(product)
+
+
+def measure(engine, load, repeat: int) -> tuple[int, int, int, float]:
+    recorder = StatementRecorder(engine)
+    load()
+    event.remove(engine, "before_cursor_execute", recorder._record)
+    statements = len(recorder.statements)
+    rows, values = recorder.rows_fetched(engine)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statements, rows, values, statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_listing.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    seed(engine, args.products, args.images)
+
+    scenarios = {
+        "first page": lambda options: load_page(engine, options, 0, args.limit),
+        "deep page": lambda options: load_page(
+            engine, options, args.products - args.limit, args.limit
+        ),
+        "detail": lambda options: load_detail(engine, options, args.products // 2),
+    }
+
+    print(
+        f"{args.products} products x {args.images} images, page size {args.limit}\n"
+    )
+    print(
+        f"{'scenario':<12} {'strategy':<13} {'queries':>8} {'rows':>8} {'values':>8} {'ms':>9}"
+    )
+    for name, load in scenarios.items():
+        for strategy, options in STRATEGIES.items():
+            statements, rows, values, latency = measure(
+                engine, lambda: load(options), args.repeat
+            )
+            print(
+                f"{name:<12} {strategy:<13} {statements:>8} {rows:>8} {values:>8} {latency:>9.2f}"
+            )
+
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import Query
+
+from app.categories import service
+from app.categories.models import Category
+from app.categories.schemas import CategoryCreate
+from app.core.pagination import count_cache
+from app.integrations.cianbox.ingest import CatalogWriter
+from app.integrations.cianbox.schemas import CianboxProduct
+
+
+@pytest.fixture
+def session(session_factory, mocker):
+    db = session_factory()
+    mocker.patch.object(service, "db", db)
+    count_cache.clear()
+    yield db
+    db.close()
+
+
+def test_count_modes(session):
+    service.create_category(CategoryCreate(name="Remeras"))
+
+    assert service.get_categories(count="exact").total == 1
+    assert service.get_categories(count="estimate").total == 1
+    assert service.get_categories(count="none").total is None
+
+
+def test_exact_count_is_cached_until_a_category_is_created(session, mocker):
+    service.create_category(CategoryCreate(name="Remeras"))
+    assert service.get_categories().total == 1
+
+    count = mocker.spy(Query, "count")
+    assert service.get_categories().total == 1
+    assert count.call_count == 0
+
+    service.create_category(CategoryCreate(name="Buzos"))
+    assert service.get_categories().total == 2
+    assert count.call_count == 1
+
+
+def test_estimate_may_use_a_stale_count(session, session_factory):
+    service.create_category(CategoryCreate(name="Remeras"))
+    assert service.get_categories().total == 1
+
+    # Alta por fuera del servicio, sin cambiar la versión
+    with session_factory() as other:
+        other.add(Category(name="Buzos"))
+        other.commit()
+
+    assert service.get_categories(count="estimate").total == 1
+
+
+def test_categories_created_by_the_cianbox_ingest_refresh_the_count(
+    session, session_factory
+):
+    service.create_category(CategoryCreate(name="Remeras"))
+    assert service.get_categories().total == 1
+
+    with session_factory() as other:
+        CatalogWriter(other).write(
+            [
+                CianboxProduct(
+                    id=1,
+                    updated=datetime(2024, 1, 1),
+                    producto="Buzo",
+                    id_categoria=7,
+                    categoria="Buzos",
+                )
+            ]
+        )
+
+    assert service.get_categories().total == 2
@@ -0,0 +1,21 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (registra todos los modelos)
+from app.core.database import Base
+from app.products.search import get_search_backend
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # Base en archivo: cada hilo usa su propia conexión, como en producción
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(engine)
+    get_search_backend("sqlite").create_index(engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+    yield factory
+    engine.dispose()
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.categories.models import Category
+from app.core import sql
+from app.core.cache import versions
+from app.core.models import CacheVersion
+from app.products.models import Product
+from app.stock.alerts import refresh_alerts
+from app.stock.branches import BranchStock, sync_branch_stock
+from app.stock.models import ProductBranchStockTotal, StockAlert
+
+
+@pytest.fixture(params=["native", "fallback"])
+def session(request, mocker, session_factory):
+    if request.param == "fallback":
+        # Sin ON CONFLICT para el dialecto: se usa UPDATE y luego INSERT
+        mocker.patch.dict(sql.DIALECT_INSERTS, clear=True)
+    with session_factory() as session:
+        yield session
+
+
+def add_product(session, **values) -> int:
+    category = Category(name="Remeras")
+    session.add(category)
+    session.flush()
+    product = Product(name="Remera", price=10, category_id=category.id, **values)
+    session.add(product)
+    session.flush()
+    return product.id
+
+
+def test_counter_is_inserted_then_incremented(session):
+    versions.bump(session, "products")
+    versions.bump(session, "products")
+    versions.bump(session, "categories")
+
+    rows = session.execute(select(CacheVersion.name, CacheVersion.version)).all()
+    assert sorted(rows) == [("categories", 1), ("products", 2)]
+
+
+def test_rows_from_a_select_keep_their_update_values(session):
+    product_id = add_product(session, stock=1, min_stock=5, critical_stock=2)
+    refresh_alerts(session, [product_id])
+    since = datetime.now() - timedelta(days=1)
+    session.execute(StockAlert.__table__.update().values(since=since))
+
+    # Mismo nivel: `since` no cambia; otro nivel lo reinicia
+    refresh_alerts(session, [product_id])
+    assert session.execute(select(StockAlert.level, StockAlert.since)).all() == [
+        ("critical", since)
+    ]
+    session.execute(Product.__table__.update().values(stock=4))
+    refresh_alerts(session, [product_id])
+    level, new_since = session.execute(select(StockAlert.level, StockAlert.since)).one()
+    assert level == "low" and new_since > since
+
+
+def test_deltas_are_added_to_existing_rows(session):
+    product_id = add_product(session)
+    for stock in (5, 8):
+        sync_branch_stock(session, [BranchStock(product_id, 1, stock, 0, stock)])
+
+    assert session.scalar(select(ProductBranchStockTotal.stock)) == 8
+
+
+def test_returning_gives_the_stored_rows(session):
+    table = CacheVersion.__table__
+    statement = sql.upsert(
+        session.get_bind().dialect.name, table, ["name"], ["version"]
+    ).returning(table.c.name, table.c.version)
+    rows = [{"name": "a", "version": 1, "updated_at": datetime.now()}]
+
+    assert sql.execute_upsert(session.connection(), statement, rows).all() == [("a", 1)]
+    rows[0]["version"] = 3
+    assert sql.execute_upsert(session.connection(), statement, rows).all() == [("a", 3)]
+
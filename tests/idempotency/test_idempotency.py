@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import func, select
+
+from app.categories.models import Category
+from app.core.exceptions import BadRequestException
+from app.idempotency import service
+from app.idempotency.models import IdempotencyKey
+
+
+class Movement(BaseModel):
+    id: int
+    stock: int
+
+
+@pytest.fixture
+def session(mocker, session_factory):
+    session = session_factory()
+    mocker.patch.object(service, "db", session)
+    service.response_cache.clear()
+    yield session
+    session.close()
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return Movement(id=1, stock=10 + self.calls)
+
+
+def run(key, operation, payload=None):
+    return service.idempotent(
+        key,
+        scope="POST /stock/1",
+        payload=payload or {"quantity": 1},
+        operation=operation,
+        response_model=Movement,
+    )
+
+
+def test_repeated_key_replays_the_stored_response(session):
+    operation = Counter()
+
+    first = run("abc", operation)
+    service.response_cache.clear()  # la repetición se resuelve también desde la base
+    replay = run("abc", operation)
+
+    assert operation.calls == 1
+    assert isinstance(replay, JSONResponse)
+    assert replay.headers[service.REPLAY_HEADER] == "true"
+    assert replay.body == first.model_dump_json().encode()
+    assert run("other", operation).stock == 12
+
+
+def test_key_reused_with_another_payload_is_rejected(session):
+    run("abc", Counter())
+    with pytest.raises(HTTPException) as error:
+        run("abc", Counter(), payload={"quantity": 2})
+    assert error.value.status_code == 422
+
+
+def test_failed_operation_releases_the_key(session):
+    def fail():
+        raise BadRequestException("Not enough stock to complete this operation")
+
+    with pytest.raises(BadRequestException):
+        run("abc", fail)
+    operation = Counter()
+    assert run("abc", operation).stock == 11
+    assert operation.calls == 1
+
+
+def test_write_and_stored_response_are_committed_together(session):
+    def create(name):
+        def operation():
+            category = Category(name=name)
+            session.add(category)
+            session.flush()
+            return Movement(id=category.id, stock=0)
+
+        return operation
+
+    def invalid():
+        # La respuesta no se puede serializar: la escritura tampoco queda
+        session.add(Category(name="Descartada"))
+        session.flush()
+        return {"id": "no es un número"}
+
+    run("abc", create("Guardada"))
+    with pytest.raises(Exception):
+        run("def", invalid)
+
+    session.rollback()
+    assert session.scalars(select(Category.name)).all() == ["Guardada"]
+    stored = session.scalars(select(IdempotencyKey.status_code)).all()
+    assert stored == [200]
+
+
+def test_key_in_progress_conflicts(session):
+    def nested():
+        # Un reintento llega mientras el primer pedido todavía se está procesando
+        return run("abc", Counter())
+
+    with pytest.raises(HTTPException) as error:
+        run("abc", nested)
+    assert error.value.status_code == 409
+
+
+def test_expired_keys_are_swept_in_batches(session):
+    past = datetime.now() - timedelta(days=2)
+    session.add_all(
+        IdempotencyKey(key_hash=f"{i:064d}", request_hash="x", expires_at=past)
+        for i in range(5)
+    )
+    session.commit()
+
+    assert service.sweep_expired_keys(session, limit=3) == 3
+    session.commit()
+    assert session.scalar(select(func.count()).select_from(IdempotencyKey)) == 2
@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.integrations.cianbox.client import CianboxClient, CianboxError, TokenBucket
+from app.integrations.cianbox.stub_server import create_stub_app
+
+
+def client_for(app, **kwargs) -> CianboxClient:
+    kwargs.setdefault("rate_per_second", 1000)
+    kwargs.setdefault("burst", 1000)
+    kwargs.setdefault("backoff_seconds", 0)
+    return CianboxClient(
+        base_url="http://cianbox.test", transport=httpx.ASGITransport(app=app), **kwargs
+    )
+
+
+def test_products_are_paged_in_the_mock_shape():
+    app = create_stub_app(products=250, page_size=100)
+
+    async def fetch():
+        async with client_for(app) as client:
+            return [await client.list_products(page) for page in (1, 2, 3)]
+
+    pages = asyncio.run(fetch())
+
+    assert [page["total_pages"] for page in pages] == [3, 3, 3]
+    assert [len(page["body"]) for page in pages] == [100, 100, 50]
+    product = pages[0]["body"][0]
+    assert product["id"] == 1
+    assert {"stock_sucursal", "id_categoria", "categoria", "updated"} <= product.keys()
+
+
+def test_updated_filter_skips_older_products():
+    app = create_stub_app(products=100, page_size=50)
+
+    async def fetch():
+        async with client_for(app) as client:
+            return await client.list_products(1, updated_since="2024-01-01 00:01:00")
+
+    page = asyncio.run(fetch())
+
+    assert page["total_pages"] == 1
+    assert [product["id"] for product in page["body"]][:2] == [61, 62]
+    assert len(page["body"]) == 40
+
+
+def test_server_errors_are_retried():
+    app = create_stub_app(products=10, error_rate=0.5, seed=3)
+
+    async def fetch():
+        async with client_for(app, retries=10) as client:
+            return await asyncio.gather(*(client.list_products(1) for _ in range(20)))
+
+    pages = asyncio.run(fetch())
+
+    assert all(len(page["body"]) == 10 for page in pages)
+    assert app.state.requests > 20
+
+
+def test_error_is_raised_when_retries_run_out():
+    app = create_stub_app(products=10, error_rate=1.0)
+
+    async def fetch():
+        async with client_for(app, retries=2) as client:
+            await client.list_products(1)
+
+    with pytest.raises(CianboxError) as error:
+        asyncio.run(fetch())
+
+    assert error.value.status_code in (429, 503)
+    assert app.state.requests == 3
+
+
+def test_orders_are_only_retried_when_they_were_not_sent():
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if len(calls) == 1:
+            raise httpx.ConnectError("Connection refused", request=request)
+        if request.method == "POST":
+            raise httpx.ReadTimeout("Timed out", request=request)
+        return httpx.Response(200, json={"status": "ok", "body": []})
+
+    async def send():
+        async with CianboxClient(
+            base_url="http://cianbox.test",
+            transport=httpx.MockTransport(handler),
+            retries=5,
+            backoff_seconds=0,
+        ) as client:
+            await client.create_order({"referencia": "pedido-1"}, reference="pedido-1")
+
+    with pytest.raises(CianboxError):
+        asyncio.run(send())
+    # La búsqueda se reintenta tras el error de conexión; el POST con timeout no
+    assert calls == ["GET", "GET", "POST"]
+
+
+def test_concurrency_is_bounded():
+    app = create_stub_app(products=10, latency=0.02)
+    running = peak = 0
+
+    @app.middleware("http")
+    async def count(request, call_next):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        try:
+            return await call_next(request)
+        finally:
+            running -= 1
+
+    async def fetch():
+        async with client_for(app, max_concurrency=3) as client:
+            await asyncio.gather(*(client.list_products(1) for _ in range(12)))
+
+    asyncio.run(fetch())
+
+    assert peak == 3
+
+
+def test_token_bucket_paces_requests_after_the_burst():
+    async def take(count: int) -> float:
+        bucket = TokenBucket(rate=50, capacity=5)
+        start = time.monotonic()
+        for _ in range(count):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # 5 pedidos salen en ráfaga; los otros 10 esperan 20 ms cada uno
+    elapsed = asyncio.run(take(15))
+
+    assert 0.18 <= elapsed < 0.5
@@ -0,0 +1,196 @@
+import asyncio
+from datetime import datetime
+
+import httpx
+from sqlalchemy import func, select
+
+from app.categories.models import Category
+from app.core.cache import versions
+from app.integrations.cianbox.client import CianboxClient
+from app.integrations.cianbox.ingest import (
+    SYNC_CLAMPED_REASON,
+    SYNC_REASON,
+    CatalogWriter,
+    ingest_products,
+)
+from app.integrations.cianbox.schemas import CianboxProduct
+from app.integrations.cianbox.stub_server import create_stub_app
+from app.products.models import Product
+from app.stock.models import ProductBranchStockTotal, StockHistory, StockReservation
+from app.stock.reservations import reserve
+
+
+def ingest(app, session_factory, **kwargs):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with CianboxClient(
+            base_url="http://cianbox.test", transport=transport, rate_per_second=1000, burst=1000
+        ) as client:
+            return await ingest_products(client, session_factory, **kwargs)
+
+    return asyncio.run(run())
+
+
+def test_catalog_is_ingested_in_batches(session_factory):
+    app = create_stub_app(products=230, page_size=50, categories=4)
+
+    result = ingest(app, session_factory, batch_size=40, concurrency=3)
+
+    assert (result.pages, result.upserted, result.failed) == (5, 230, 0)
+    assert result.high_water_mark == datetime(2024, 1, 1, 0, 3, 49)
+    with session_factory() as session:
+        assert session.scalar(select(func.count()).select_from(Product)) == 230
+        categories = session.scalars(select(Category.cianbox_id).order_by(Category.cianbox_id))
+        assert categories.all() == [1, 2, 3, 4]
+        product = session.scalars(select(Product).where(Product.cianbox_id == 17)).one()
+        assert product.name == "PRODUCTO 17"
+        assert product.category.cianbox_id == 17 % 4
+        # precio_neto 18 con IVA 21%
+        assert product.price == 21.78
+        # El stock inicial queda en el historial como cualquier movimiento
+        assert session.scalar(
+            select(func.sum(StockHistory.quantity)).where(StockHistory.product_id == product.id)
+        ) == product.stock
+
+
+def test_later_runs_only_pull_updated_products(mocker, session_factory):
+    ingest(create_stub_app(products=200, page_size=50), session_factory)
+
+    # Cianbox agrega 10 productos; solo se piden los cambios desde la marca (menos el solape)
+    mocker.patch("app.integrations.cianbox.ingest.settings.cianbox_ingest_overlap_seconds", 5)
+    app = create_stub_app(products=210, page_size=50)
+    result = ingest(app, session_factory)
+
+    assert (result.pages, result.upserted) == (1, 16)
+    assert app.state.requests == 1
+    with session_factory() as session:
+        assert session.scalar(select(func.count()).select_from(Product)) == 210
+        assert session.scalar(select(func.count()).select_from(Category)) == 20
+
+
+def test_existing_categories_are_linked_by_name(session_factory):
+    with session_factory() as session:
+        session.add(Category(name="CATEGORIA 1"))
+        session.commit()
+
+    ingest(create_stub_app(products=10, categories=2), session_factory)
+
+    with session_factory() as session:
+        assert session.execute(
+            select(Category.name, Category.cianbox_id).order_by(Category.id)
+        ).all() == [("CATEGORIA 1", 1), ("CATEGORIA 2", 2)]
+
+
+def write_products(session_factory, *categories: tuple[int, str]) -> int:
+    """Writes one product per (id_categoria, categoria) with a fresh writer."""
+    with session_factory() as session:
+        CatalogWriter(session).write(
+            [
+                CianboxProduct(
+                    id=index,
+                    updated=datetime(2024, 1, 1),
+                    producto=f"Producto {index}",
+                    id_categoria=category_id,
+                    categoria=name,
+                )
+                for index, (category_id, name) in enumerate(categories, start=1)
+            ]
+        )
+        return versions.get(session, Category.__tablename__)
+
+
+def category_names(session_factory) -> dict[int, str]:
+    with session_factory() as session:
+        return dict(session.execute(select(Category.cianbox_id, Category.name)).all())
+
+
+def test_category_names_taken_by_other_categories_get_a_suffix(session_factory):
+    with session_factory() as session:
+        session.add(Category(name="Bebidas", cianbox_id=99))
+        session.commit()
+
+    write_products(session_factory, (5, "Bebidas"), (6, "Almacén"), (7, "Almacén"))
+
+    assert category_names(session_factory) == {
+        99: "Bebidas",
+        5: "Bebidas (5)",
+        6: "Almacén",
+        7: "Almacén (7)",
+    }
+    with session_factory() as session:
+        product = session.scalars(select(Product).where(Product.cianbox_id == 1)).one()
+        assert product.category.name == "Bebidas (5)"
+
+
+def test_categories_version_changes_only_on_creates_and_renames(session_factory):
+    created = write_products(session_factory, (5, "Bebidas"))
+    assert write_products(session_factory, (5, "Bebidas")) == created
+
+    renamed = write_products(session_factory, (5, "Gaseosas"))
+    assert renamed > created
+    assert category_names(session_factory) == {5: "Gaseosas"}
+
+
+def test_stock_changes_are_recorded_in_history(session_factory):
+    ingest(create_stub_app(products=5), session_factory)
+    with session_factory() as session:
+        product = session.scalars(select(Product).where(Product.cianbox_id == 3)).one()
+        product.stock += 4
+        session.commit()
+
+    ingest(create_stub_app(products=5), session_factory, full=True)
+
+    with session_factory() as session:
+        product = session.scalars(select(Product).where(Product.cianbox_id == 3)).one()
+        assert session.execute(
+            select(StockHistory.quantity, StockHistory.reason)
+            .where(StockHistory.product_id == product.id)
+            .order_by(StockHistory.id)
+        ).all()[-1] == (-4, SYNC_REASON)
+
+
+def test_stock_below_the_reservations_is_clamped(session_factory):
+    ingest(create_stub_app(products=5), session_factory)
+    with session_factory() as session:
+        product = session.scalars(select(Product).where(Product.cianbox_id == 3)).one()
+        remote = product.stock
+        product.stock += 10
+        session.flush()
+        reserve(session, product.id, remote + 5, user_id=1)
+        session.commit()
+        product_id = product.id
+
+    ingest(create_stub_app(products=5), session_factory, full=True)
+
+    with session_factory() as session:
+        assert session.get(Product, product_id).stock == remote + 5
+        last = session.execute(
+            select(StockHistory.quantity, StockHistory.reason)
+            .where(StockHistory.product_id == product_id)
+            .order_by(StockHistory.id.desc())
+        ).first()
+        assert tuple(last) == (-5, SYNC_CLAMPED_REASON)
+
+        # Vencida la reserva, la próxima corrida aplica el stock de Cianbox
+        session.execute(
+            StockReservation.__table__.update().values(expires_at=datetime(2000, 1, 1))
+        )
+        session.commit()
+
+    ingest(create_stub_app(products=5), session_factory, full=True)
+
+    with session_factory() as session:
+        product = session.get(Product, product_id)
+        assert (product.stock, product.reserved) == (remote, 0)
+
+
+def test_branch_stock_is_ingested_with_its_totals(session_factory):
+    ingest(create_stub_app(products=20, branches=3), session_factory)
+
+    with session_factory() as session:
+        rows = session.execute(
+            select(Product.stock, ProductBranchStockTotal.stock, ProductBranchStockTotal.branches)
+            .join(ProductBranchStockTotal, ProductBranchStockTotal.product_id == Product.id)
+        ).all()
+        assert len(rows) == 20
+        assert all(stock == total and branches == 3 for stock, total, branches in rows)
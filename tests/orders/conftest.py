@@ -0,0 +1,28 @@
+import pytest
+
+from app.categories.models import Category
+from app.orders import service
+from app.products.models import Product
+
+
+@pytest.fixture
+def session_factory(session_factory):
+    # La base compartida (tests/conftest.py) con 300 productos para los pedidos
+    with session_factory() as session:
+        category = Category(name="Calzado")
+        session.add(category)
+        session.flush()
+        session.add_all(
+            Product(id=i, name=f"Producto {i}", price=10, stock=100, category_id=category.id)
+            for i in range(1, 301)
+        )
+        session.commit()
+    return session_factory
+
+
+@pytest.fixture
+def session(mocker, session_factory):
+    session = session_factory()
+    mocker.patch.object(service, "db", session)
+    yield session
+    session.close()
@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import event, func, select
+
+from app.core.exceptions import BadRequestException
+from app.orders import service
+from app.orders.models import Order, OrderItem
+from app.orders.schemas import OrderCreate
+from app.products.models import Product
+from app.stock.models import StockHistory
+
+USER_ID = 1
+
+
+def order(*lines):
+    return OrderCreate(
+        items=[
+            {"product_id": product_id, "quantity": quantity, "unit_price": 10.0}
+            for product_id, quantity in lines
+        ]
+    )
+
+
+def count_statements(session, call) -> int:
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return len(statements)
+
+
+def test_order_takes_the_stock_of_every_line(session):
+    created = service.create_order(order((1, 2), (2, 3), (1, 4)), USER_ID)
+
+    assert created.total_amount == 90
+    assert [item.quantity for item in created.items] == [2, 3, 4]
+    stocks = dict(session.execute(select(Product.id, Product.stock).where(Product.id.in_([1, 2]))).all())
+    assert stocks == {1: 94, 2: 97}
+    assert session.scalar(select(func.count()).select_from(StockHistory)) == 3
+
+
+def test_statements_do_not_grow_with_the_lines(session):
+    small = count_statements(
+        session, lambda: service.create_order(order(*[(i, 1) for i in range(1, 6)]), USER_ID)
+    )
+    large = count_statements(
+        session, lambda: service.create_order(order(*[(i, 1) for i in range(1, 201)]), USER_ID)
+    )
+    assert large == small
+
+
+def test_failed_order_writes_nothing(session):
+    with pytest.raises(ValueError, match="Product with ID 999 not found"):
+        service.create_order(order((1, 1), (999, 1)), USER_ID)
+
+    with pytest.raises(BadRequestException, match="product 2"):
+        service.create_order(order((1, 1), (2, 101), (3, 1)), USER_ID)
+
+    assert session.scalar(select(func.count()).select_from(Order)) == 0
+    assert session.scalar(select(func.count()).select_from(OrderItem)) == 0
+    assert session.scalar(select(func.sum(Product.stock))) == 300 * 100
@@ -0,0 +1,178 @@
+import asyncio
+import functools
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import select, update
+
+from app.integrations.cianbox.client import CianboxClient
+from app.integrations.cianbox.schemas import SyncStatusResponse
+from app.integrations.cianbox.stub_server import create_stub_app
+from app.integrations.cianbox.sync_order import send_order
+from app.orders import outbox, service
+from app.orders.models import Order, OrderOutbox, SyncStatus
+from app.orders.schemas import OrderCreate
+
+
+def create_orders(count: int) -> list[int]:
+    return [
+        service.create_order(
+            OrderCreate(items=[{"product_id": i, "quantity": 1, "unit_price": 10.0}]), 1
+        ).id
+        for i in range(1, count + 1)
+    ]
+
+
+def synced(order) -> SyncStatusResponse:
+    return SyncStatusResponse(order_id=order.id, platform="cianbox", status="synced")
+
+
+def states(session_factory):
+    with session_factory() as session:
+        messages = session.execute(
+            select(OrderOutbox.order_id, OrderOutbox.status, OrderOutbox.attempts)
+        ).all()
+        statuses = session.execute(select(SyncStatus.order_id, SyncStatus.status)).all()
+        return sorted(messages), sorted(statuses)
+
+
+def test_orders_are_synced_by_the_worker(session, session_factory):
+    order_ids = create_orders(3)
+    assert states(session_factory) == (
+        [(order_id, "pending", 0) for order_id in order_ids],
+        [(order_id, "pending") for order_id in order_ids],
+    )
+
+    assert asyncio.run(outbox.process_batch(session_factory, synced)) == 3
+    assert asyncio.run(outbox.process_batch(session_factory, synced)) == 0
+    assert states(session_factory) == (
+        [(order_id, "done", 1) for order_id in order_ids],
+        [(order_id, "synced") for order_id in order_ids],
+    )
+
+
+def test_failed_sync_is_retried_with_backoff(mocker, session, session_factory):
+    mocker.patch.object(outbox.settings, "order_outbox_max_attempts", 2)
+    [order_id] = create_orders(1)
+
+    def failing(order):
+        raise ConnectionError("Cianbox unavailable")
+
+    assert asyncio.run(outbox.process_batch(session_factory, failing)) == 1
+    # El reintento no vence hasta que pasa el backoff
+    assert asyncio.run(outbox.process_batch(session_factory, failing)) == 0
+    assert states(session_factory) == ([(order_id, "pending", 1)], [(order_id, "pending")])
+
+    with session_factory() as other:
+        other.execute(update(OrderOutbox).values(available_at=datetime.now()))
+        other.commit()
+    assert asyncio.run(outbox.process_batch(session_factory, failing)) == 1
+    assert states(session_factory) == ([(order_id, "failed", 2)], [(order_id, "error")])
+
+
+def test_batch_syncs_orders_concurrently(session, session_factory):
+    create_orders(10)
+
+    def slow(order):
+        time.sleep(0.2)
+        return synced(order)
+
+    start = time.perf_counter()
+    assert asyncio.run(outbox.process_batch(session_factory, slow)) == 10
+    assert time.perf_counter() - start < 1
+
+
+def test_orders_are_sent_through_the_stub_server(session, session_factory):
+    order_ids = create_orders(3)
+    app = create_stub_app(products=1)
+
+    async def run() -> int:
+        transport = httpx.ASGITransport(app=app)
+        async with CianboxClient(base_url="http://cianbox.test", transport=transport) as client:
+            return await outbox.process_batch(session_factory, functools.partial(send_order, client))
+
+    assert asyncio.run(run()) == 3
+    assert sorted(payload["referencia"] for payload in app.state.orders) == [
+        f"pedido-{order_id}" for order_id in order_ids
+    ]
+    assert states(session_factory)[1] == [(order_id, "synced") for order_id in order_ids]
+
+
+def test_result_of_an_expired_claim_is_discarded(session, session_factory):
+    [order_id] = create_orders(1)
+
+    def outlives_the_lease(order):
+        # Otro worker reclama el mensaje cuando vence el lease de este
+        with session_factory() as other:
+            lease = timedelta(seconds=outbox.settings.order_outbox_lease_seconds)
+            later = datetime.now() + lease + timedelta(seconds=1)
+            assert len(outbox.claim_batch(other, 10, now=later)) == 1
+        return synced(order)
+
+    assert asyncio.run(outbox.process_batch(session_factory, outlives_the_lease)) == 1
+    # El intento 2 sigue en curso: el resultado del intento 1 no lo pisa
+    assert states(session_factory) == ([(order_id, "pending", 2)], [(order_id, "pending")])
+
+
+def test_syncs_are_bounded_by_the_lease(mocker, session, session_factory):
+    mocker.patch.object(outbox.settings, "order_outbox_sync_timeout_seconds", 0.1)
+    [order_id] = create_orders(1)
+
+    def hangs(order):
+        time.sleep(0.5)
+        return synced(order)
+
+    assert asyncio.run(outbox.process_batch(session_factory, hangs)) == 1
+    assert states(session_factory) == ([(order_id, "pending", 1)], [(order_id, "pending")])
+    with session_factory() as other:
+        assert "lease" in other.scalar(select(OrderOutbox.last_error))
+
+
+def test_resent_orders_are_deduplicated_by_cianbox(session, session_factory):
+    [order_id] = create_orders(1)
+    app = create_stub_app(products=1)
+
+    async def send_twice() -> None:
+        transport = httpx.ASGITransport(app=app)
+        async with CianboxClient(base_url="http://cianbox.test", transport=transport) as client:
+            with session_factory() as other:
+                order = other.get(Order, order_id)
+                for _ in range(2):
+                    assert (await send_order(client, order)).status == "synced"
+
+    asyncio.run(send_twice())
+    assert [payload["referencia"] for payload in app.state.orders] == [f"pedido-{order_id}"]
+
+
+class LosesFirstOrderResponse(httpx.AsyncBaseTransport):
+    """Delivers the first order to Cianbox but times out before its response."""
+
+    def __init__(self, app):
+        self.inner = httpx.ASGITransport(app=app)
+        self.lost = False
+
+    async def handle_async_request(self, request):
+        response = await self.inner.handle_async_request(request)
+        if request.method == "POST" and not self.lost:
+            self.lost = True
+            raise httpx.ReadTimeout("Timed out waiting for the response", request=request)
+        return response
+
+
+def test_order_created_by_a_timed_out_send_is_not_sent_again(session, session_factory):
+    [order_id] = create_orders(1)
+    app = create_stub_app(products=1)
+
+    async def send_twice() -> list[str]:
+        transport = LosesFirstOrderResponse(app)
+        async with CianboxClient(
+            base_url="http://cianbox.test", transport=transport, backoff_seconds=0
+        ) as client:
+            with session_factory() as other:
+                order = other.get(Order, order_id)
+                return [(await send_order(client, order)).status for _ in range(2)]
+
+    # El primer intento no se reintenta: el segundo encuentra el pedido y no lo reenvía
+    assert asyncio.run(send_twice()) == ["error", "synced"]
+    assert len(app.state.orders) == 1
@@ -0,0 +1,61 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.app import app
+from app.categories.models import Category
+from app.core.pagination import count_cache
+from app.core.security import get_current_user
+from app.products import service
+from app.products.cache import product_list_cache
+from app.products.models import Product
+from app.products.search import SQLiteFTSSearchBackend
+from app.users.models import User
+from app.users.roles import RoleEnum
+
+
+@pytest.fixture
+def session(session_factory, mocker):
+    db = session_factory()
+    mocker.patch.object(service, "db", db)
+    mocker.patch.object(service, "search_backend", SQLiteFTSSearchBackend())
+    # Las cachés son globales: cada prueba empieza sin páginas ni conteos
+    product_list_cache.clear()
+    count_cache.clear()
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def category_id(session):
+    category = Category(name="Remeras")
+    session.add(category)
+    session.commit()
+    return category.id
+
+
+@pytest.fixture
+def client():
+    # Sin lifespan: la app no abre la base real
+    return TestClient(app)
+
+
+@pytest.fixture
+def admin_client(client):
+    app.dependency_overrides[get_current_user] = lambda: User(
+        id=1, email="admin@test.com", role=RoleEnum.ADMIN
+    )
+    yield client
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+def add_products(session, category_id: int, prices: list[float]) -> list[int]:
+    """Creates one active product per price and returns their ids in order."""
+    products = [
+        Product(name=f"Producto {i}", price=price, stock=i, category_id=category_id)
+        for i, price in enumerate(prices)
+    ]
+    session.add_all(products)
+    session.flush()
+    SQLiteFTSSearchBackend().rebuild(session)
+    session.commit()
+    return [product.id for product in products]
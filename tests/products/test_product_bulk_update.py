@@ -0,0 +1,114 @@
+import pytest
+from sqlalchemy import select
+
+from app.categories.models import Category
+from app.core.exceptions import BadRequestException
+from app.products import service
+from app.products.models import Product
+from app.products.schemas import ProductBulkUpdate, ProductUpdate
+from app.stock.models import StockAlert
+from tests.products.conftest import add_products
+
+
+def prices(session) -> list[float]:
+    session.expire_all()
+    return list(session.scalars(select(Product.price).order_by(Product.id)))
+
+
+def bulk_update(**data):
+    return service.bulk_update(ProductBulkUpdate.model_validate(data))
+
+
+def test_price_rules_apply_to_the_selected_ids(session, category_id):
+    ids = add_products(session, category_id, [10.0, 20.0, 30.0])
+
+    assert bulk_update(ids=ids[:2], price_rule={"mode": "percent", "value": 10}).updated == 2
+    assert prices(session) == [11.0, 22.0, 30.0]
+
+    assert bulk_update(ids=ids, price_rule={"mode": "absolute", "value": -1.5}).updated == 3
+    assert prices(session) == [9.5, 20.5, 28.5]
+
+
+def test_filter_selects_active_products_by_category_and_price(session, category_id):
+    other = Category(name="Buzos")
+    session.add(other)
+    session.commit()
+    ids = add_products(session, category_id, [10.0, 20.0, 30.0])
+    add_products(session, other.id, [20.0])
+    service.delete(ids[2])
+
+    result = bulk_update(
+        filter={"category_id": category_id, "min_price": 15}, changes={"description": "Oferta"}
+    )
+
+    assert result.updated == 1
+    descriptions = session.scalars(select(Product.description).order_by(Product.id)).all()
+    assert descriptions == [None, "Oferta", None, None]
+
+
+def test_discount_never_leaves_a_negative_price(session, category_id):
+    ids = add_products(session, category_id, [5.0, 20.0])
+
+    result = bulk_update(ids=ids, price_rule={"mode": "absolute", "value": -10})
+
+    assert result.updated == 1
+    assert prices(session) == [5.0, 10.0]
+
+
+def test_renamed_products_are_reindexed(session, category_id):
+    ids = add_products(session, category_id, [10.0, 20.0])
+
+    bulk_update(ids=ids, changes={"name": "Campera"})
+
+    assert [p.id for p in service.get_products(search="campera")[0]] == ids
+    assert service.get_products(search="producto")[0] == []
+
+
+def test_thresholds_refresh_the_alerts(session, category_id):
+    ids = add_products(session, category_id, [10.0, 20.0, 30.0])
+
+    bulk_update(ids=ids, changes={"min_stock": 1})
+
+    alerts = session.scalars(select(StockAlert.product_id).order_by(StockAlert.product_id))
+    assert alerts.all() == ids[:2]
+
+
+@pytest.mark.parametrize(
+    "data,message",
+    [
+        ({"changes": {"stock": 5}}, "Stock cannot be updated in bulk"),
+        ({"changes": {"category_id": 999}}, "Category with ID 999"),
+        ({"changes": {}}, "No changes to apply"),
+    ],
+)
+def test_invalid_changes_are_rejected(session, category_id, data, message):
+    ids = add_products(session, category_id, [10.0])
+
+    with pytest.raises(BadRequestException, match=message):
+        bulk_update(ids=ids, **data)
+
+
+def test_endpoint_validates_target_and_changes(session, admin_client):
+    response = admin_client.patch("/products/bulk", json={"changes": {"name": "X"}})
+
+    assert response.status_code == 422
+
+
+def test_empty_filter_is_rejected_unless_all_is_given(session, category_id, admin_client):
+    add_products(session, category_id, [10.0, 20.0])
+
+    response = admin_client.patch(
+        "/products/bulk", json={"filter": {}, "changes": {"description": "Oferta"}}
+    )
+    assert response.status_code == 422
+
+    assert bulk_update(filter={"all": True}, changes={"description": "Oferta"}).updated == 2
+
+
+def test_update_moves_stock_and_reindexes(session, category_id):
+    [product_id] = add_products(session, category_id, [10.0])
+
+    product = service.update(product_id, ProductUpdate(name="Campera", stock=7))
+
+    assert (product.name, product.stock) == ("Campera", 7)
+    assert [p.id for p in service.get_products(search="campera")[0]] == [product_id]
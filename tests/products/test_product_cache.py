@@ -0,0 +1,74 @@
+from sqlalchemy import update
+
+from app.core.cache import versions
+from app.products import service
+from app.products.cache import CATALOG, bump_catalog_version, catalog_version
+from app.products.models import Product
+from app.products.schemas import ProductUpdate
+from tests.products.conftest import add_products
+
+
+def test_versions_are_shared_through_the_database(session_factory):
+    with session_factory() as writer, session_factory() as reader:
+        assert versions.get(reader, CATALOG) == 0
+
+        versions.bump(writer, CATALOG)
+        versions.bump(writer, CATALOG)
+        # Sin commit el otro proceso todavía ve la versión anterior
+        assert versions.get(reader, CATALOG) == 0
+        writer.commit()
+
+        assert versions.get(reader, CATALOG) == 2
+        assert versions.get(reader, "categories") == 0
+
+
+def test_rolled_back_bump_keeps_the_version(session_factory):
+    with session_factory() as session:
+        bump_catalog_version(session)
+        session.rollback()
+
+        assert catalog_version(session) == 0
+
+
+def test_page_is_served_from_cache_until_the_catalog_changes(session, category_id):
+    [product_id] = add_products(session, category_id, [10.0])
+
+    first = service.get_products_page()
+    assert service.get_products_page() is first
+
+    service.update(product_id, ProductUpdate(price=12.5))
+
+    page = service.get_products_page()
+    assert page is not first
+    assert page.data[0].price == 12.5
+
+
+def test_write_from_another_process_invalidates_cached_pages(
+    session, session_factory, category_id
+):
+    [product_id] = add_products(session, category_id, [10.0])
+    first = service.get_products_page()
+
+    # Otro worker (o el ingest de Cianbox) con su propia sesión
+    with session_factory() as other:
+        other.execute(update(Product).where(Product.id == product_id).values(price=20))
+        bump_catalog_version(other)
+        other.commit()
+
+    page = service.get_products_page()
+    assert page is not first
+    assert page.data[0].price == 20
+
+
+def test_exact_count_is_recomputed_after_a_write_elsewhere(
+    session, session_factory, category_id
+):
+    add_products(session, category_id, [10.0] * 3)
+    assert service.get_products_page(limit=1).total_pages == 3
+
+    with session_factory() as other:
+        other.execute(update(Product).values(is_active=False).where(Product.price == 10))
+        bump_catalog_version(other)
+        other.commit()
+
+    assert service.get_products_page(limit=1).total_pages == 0
@@ -0,0 +1,38 @@
+from sqlalchemy.orm import Query
+
+from app.products import service
+from app.products.schemas import ProductCreate
+from tests.products.conftest import add_products
+
+
+def test_count_modes(session, category_id):
+    add_products(session, category_id, [10.0] * 5)
+
+    assert service.get_products(limit=2, count="exact")[2] == 3
+    assert service.get_products(limit=2, count="estimate")[2] == 3
+    assert service.get_products(limit=2, count="none")[2] is None
+
+
+def test_counts_are_cached_per_filter(session, category_id, mocker):
+    add_products(session, category_id, [10.0, 20.0, 30.0])
+    count = mocker.spy(Query, "count")
+
+    for _ in range(2):
+        assert service.get_products(limit=1)[2] == 3
+        assert service.get_products(limit=1, min_price=15)[2] == 2
+        # El tamaño de página y el orden no cambian el conteo
+        assert service.get_products(limit=2, order_by="price", min_price=15)[2] == 1
+
+    assert count.call_count == 2
+
+
+def test_exact_count_follows_writes_and_estimate_may_lag(session, category_id):
+    add_products(session, category_id, [10.0] * 2)
+    assert service.get_products(limit=1, count="exact")[2] == 2
+
+    service.create(ProductCreate(name="Nuevo", price=10, category_id=category_id))
+
+    # La estimación acepta el último conteo visto para el filtro
+    assert service.get_products(limit=1, count="estimate")[2] == 2
+    assert service.get_products(limit=1, count="exact")[2] == 3
+    assert service.get_products(limit=1, count="estimate")[2] == 3
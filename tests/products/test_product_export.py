@@ -0,0 +1,83 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from app.core.database import DatabaseConnection
+from app.products import service
+from app.products.models import ProductImage
+from tests.products.conftest import add_products
+
+
+@pytest.fixture
+def export_session(session_factory, mocker):
+    # La exportación abre su propia sesión
+    mocker.patch.object(
+        DatabaseConnection,
+        "session",
+        new_callable=mocker.PropertyMock,
+        side_effect=session_factory,
+    )
+
+
+@pytest.fixture
+def product_ids(session, category_id, export_session):
+    ids = add_products(session, category_id, [float(i) for i in range(7)])
+    session.add(ProductImage(product_id=ids[0], url="https://img/0", public_id="0", position=1))
+    session.commit()
+    service.delete(ids[-1])
+    return ids[:-1]
+
+
+def test_ndjson_export_streams_active_products_in_batches(product_ids, mocker):
+    mocker.patch.object(service, "EXPORT_BATCH_SIZE", 2)
+
+    chunks = list(service.export_products("ndjson"))
+    rows = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+
+    assert len(chunks) == 3
+    assert [row["id"] for row in rows] == product_ids
+    assert list(rows[0]) == list(service.EXPORT_FIELDS)
+    assert rows[0]["category"] == "Remeras"
+    assert rows[0]["thumbnail"] == "https://img/0"
+    assert rows[1]["thumbnail"] is None
+
+
+def test_csv_export_has_a_header_and_one_row_per_product(product_ids):
+    content = b"".join(service.export_products("csv")).decode()
+    reader = csv.reader(io.StringIO(content))
+
+    assert next(reader) == list(service.EXPORT_FIELDS)
+    assert [int(row[0]) for row in reader] == product_ids
+
+
+def test_empty_catalog_exports_only_the_csv_header(session, export_session):
+    content = b"".join(service.export_products("csv")).decode()
+
+    assert content.splitlines() == [",".join(service.EXPORT_FIELDS)]
+
+
+@pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+def test_gzip_export_decompresses_to_the_plain_export(product_ids, mocker, export_format):
+    mocker.patch.object(service, "EXPORT_BATCH_SIZE", 2)
+
+    plain = b"".join(service.export_products(export_format))
+    compressed = b"".join(service.export_products(export_format, compress=True))
+
+    assert compressed[:2] == b"\x1f\x8b"
+    assert gzip.decompress(compressed) == plain
+
+
+def test_export_endpoint(product_ids, admin_client):
+    response = admin_client.get("/products/export", params={"format": "csv", "gzip": True})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"] == 'attachment; filename="products.csv.gz"'
+    assert len(gzip.decompress(response.content).decode().splitlines()) == len(product_ids) + 1
+
+
+def test_export_requires_a_seller_or_admin(product_ids, client):
+    assert client.get("/products/export").status_code == 401
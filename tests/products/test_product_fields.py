@@ -0,0 +1,96 @@
+import pytest
+from sqlalchemy import event
+
+from app.products import service
+from app.products.models import ProductImage
+from tests.products.conftest import add_products
+
+
+@pytest.fixture
+def product_ids(session, category_id):
+    ids = add_products(session, category_id, [30.0, 10.0, 20.0])
+    session.add_all(
+        ProductImage(
+            product_id=ids[0],
+            url=f"https://img/{position}",
+            public_id=str(position),
+            position=position,
+        )
+        for position in (2, 1)
+    )
+    session.commit()
+    return ids
+
+
+def test_list_returns_only_the_requested_fields(product_ids, client):
+    body = client.get("/products/", params={"fields": "name,price"}).json()
+
+    assert [set(item) for item in body["data"]] == [{"id", "name", "price"}] * 3
+    assert body["data"][0] == {"id": product_ids[0], "name": "Producto 0", "price": 30.0}
+
+
+def test_relations_are_loaded_only_when_requested(product_ids, client):
+    body = client.get(
+        "/products/", params={"fields": "category,images,thumbnail", "limit": 1}
+    ).json()
+    [item] = body["data"]
+
+    assert set(item) == {"id", "category", "images", "thumbnail"}
+    assert item["category"]["name"] == "Remeras"
+    assert [image["position"] for image in item["images"]] == [1, 2]
+    assert item["thumbnail"] == "https://img/1"
+
+
+def test_product_without_images_has_no_thumbnail(product_ids, client):
+    body = client.get(f"/products/{product_ids[1]}", params={"fields": "thumbnail,images"}).json()
+
+    assert body == {"id": product_ids[1], "thumbnail": None, "images": []}
+
+
+def test_sparse_page_selects_only_the_requested_columns(session, product_ids):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        service.get_products(fields=service.parse_fields("name"), count="none")
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    [statement] = statements
+    assert "products.name" in statement
+    assert "products.description" not in statement
+    assert "product_images" not in statement
+
+
+def test_sparse_cursor_pages_by_a_field_that_was_not_requested(product_ids):
+    fields = service.parse_fields("name")
+    ids, cursor = [], None
+    while True:
+        products, _, _, cursor = service.get_products(
+            limit=2, order_by="price", fields=fields, cursor=cursor
+        )
+        ids.extend(product.id for product in products)
+        if cursor is None:
+            break
+
+    assert ids == [product_ids[1], product_ids[2], product_ids[0]]
+
+
+def test_parse_fields_always_includes_the_id():
+    assert service.parse_fields(" name , price,") == {"id", "name", "price"}
+    assert service.parse_fields(None) is None
+    assert service.parse_fields("") is None
+
+
+@pytest.mark.parametrize("path", ["/products/", "/products/{id}"])
+def test_unknown_fields_are_rejected(product_ids, client, path):
+    response = client.get(
+        path.format(id=product_ids[0]), params={"fields": "name,password,cost"}
+    )
+
+    assert response.status_code == 400
+    assert response.json()["error"].startswith("Invalid fields: cost, password.")
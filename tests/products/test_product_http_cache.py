@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.categories.models import Category
+from app.core.http_cache import http_date
+from app.products import service
+from app.products.models import Product
+from app.products.schemas import ProductUpdate
+from tests.products.conftest import add_products
+
+
+def test_if_none_match_returns_304_until_the_product_changes(session, category_id, client):
+    [product_id] = add_products(session, category_id, [10.0])
+
+    response = client.get(f"/products/{product_id}")
+    etag = response.headers["etag"]
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-cache"
+
+    response = client.get(f"/products/{product_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+    service.update(product_id, ProductUpdate(price=12.5))
+
+    response = client.get(f"/products/{product_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["price"] == 12.5
+
+
+def test_etag_changes_when_the_category_is_renamed(session, category_id, client):
+    [product_id] = add_products(session, category_id, [10.0])
+    etag = client.get(f"/products/{product_id}").headers["etag"]
+
+    # El ingest de Cianbox renombra categorías sin tocar los productos
+    session.execute(
+        update(Category)
+        .where(Category.id == category_id)
+        .values(name="Camisetas", updated_at=datetime(2030, 1, 1))
+    )
+    session.commit()
+
+    response = client.get(f"/products/{product_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["category"]["name"] == "Camisetas"
+    assert response.headers["last-modified"] == http_date(datetime(2030, 1, 1))
+
+
+def test_etag_depends_on_the_requested_fields(session, category_id, client):
+    [product_id] = add_products(session, category_id, [10.0])
+
+    full = client.get(f"/products/{product_id}").headers["etag"]
+    sparse = client.get(f"/products/{product_id}", params={"fields": "name"}).headers["etag"]
+
+    assert full != sparse
+    response = client.get(
+        f"/products/{product_id}", params={"fields": "name"}, headers={"If-None-Match": full}
+    )
+    assert response.status_code == 200
+
+
+def test_if_modified_since(session, category_id, client):
+    [product_id] = add_products(session, category_id, [10.0])
+    updated_at = session.get(Product, product_id).updated_at
+
+    later = http_date(updated_at + timedelta(days=1))
+    earlier = http_date(updated_at - timedelta(days=1))
+
+    assert (
+        client.get(f"/products/{product_id}", headers={"If-Modified-Since": later}).status_code
+        == 304
+    )
+    assert (
+        client.get(f"/products/{product_id}", headers={"If-Modified-Since": earlier}).status_code
+        == 200
+    )
+
+
+def test_images_etag(session, category_id, client):
+    [product_id] = add_products(session, category_id, [10.0])
+
+    etag = client.get(f"/products/{product_id}/images").headers["etag"]
+    response = client.get(f"/products/{product_id}/images", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+
+
+def test_inactive_product_is_not_found(session, category_id, client):
+    [product_id] = add_products(session, category_id, [10.0])
+    service.delete(product_id)
+
+    assert client.get(f"/products/{product_id}").status_code == 404
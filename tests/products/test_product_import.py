@@ -0,0 +1,86 @@
+import io
+import json
+
+from sqlalchemy import func, select
+
+from app.products import service
+from app.products.models import Product
+
+
+def ndjson(*rows) -> io.BytesIO:
+    lines = [row if isinstance(row, str) else json.dumps(row) for row in rows]
+    return io.BytesIO("\n".join(lines).encode())
+
+
+def test_valid_rows_are_inserted_and_invalid_ones_reported(session, category_id):
+    file = ndjson(
+        {"name": "Remera", "price": 10, "category_id": category_id},
+        "{not json",
+        "",
+        [1, 2],
+        {"price": 5, "category_id": category_id},
+        {"name": "Buzo", "price": 20, "category_id": 999},
+        {"name": "Gorra", "price": 8, "category_id": category_id, "min_stock": -1},
+        {"name": "Media", "price": 2, "category_id": category_id, "description": "Algodón"},
+    )
+
+    result = service.bulk_create(file, "ndjson", chunk_size=3)
+
+    assert (result.inserted, result.failed) == (2, 5)
+    errors = {error.row: error.error for error in result.errors}
+    assert list(errors) == [2, 3, 4, 5, 6]
+    assert errors[2].startswith("Invalid JSON")
+    assert errors[3] == "Each line must be a JSON object"
+    assert errors[4] == "name: Field required"
+    assert errors[5] == "Category with ID 999 does not exist"
+    assert errors[6].startswith("min_stock:")
+
+    products = session.execute(select(Product.name, Product.stock).order_by(Product.id)).all()
+    assert products == [("Remera", 0), ("Media", 0)]
+    # Los productos importados quedan en el índice de búsqueda
+    assert [p.name for p in service.get_products(search="algodon")[0]] == ["Media"]
+
+
+def test_csv_empty_cells_are_null(session, category_id):
+    file = io.BytesIO(
+        (
+            "name,price,category_id,description\n"
+            f"Remera,10,{category_id},\n"
+            f",5,{category_id},Sin nombre\n"
+        ).encode()
+    )
+
+    result = service.bulk_create(file, "csv")
+
+    assert (result.inserted, result.failed) == (1, 1)
+    assert result.errors[0].row == 2
+    assert session.scalar(select(Product.description)) is None
+
+
+def test_failed_chunk_reports_its_rows_and_keeps_the_others(session, category_id, mocker):
+    index = mocker.patch.object(
+        service.search_backend,
+        "index_new_products",
+        side_effect=[None, RuntimeError("disk full"), None],
+    )
+    rows = [{"name": f"Producto {i}", "price": 1, "category_id": category_id} for i in range(5)]
+
+    result = service.bulk_create(ndjson(*rows), "ndjson", chunk_size=2)
+
+    assert index.call_count == 3
+    assert (result.inserted, result.failed) == (3, 2)
+    assert [error.row for error in result.errors] == [3, 4]
+    assert result.errors[0].error == "Error inserting row: disk full"
+    assert session.scalar(select(func.count()).select_from(Product)) == 3
+
+
+def test_import_endpoint_detects_the_format_from_the_file_name(
+    session, category_id, admin_client
+):
+    response = admin_client.post(
+        "/products/bulk",
+        files={"file": ("products.csv", f"name,price,category_id\nRemera,10,{category_id}\n")},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"inserted": 1, "failed": 0, "errors": []}
@@ -0,0 +1,39 @@
+import pytest
+
+from app.products import service
+from app.stock import ledger
+from app.stock.ledger import StockLedger
+from tests.products.conftest import add_products
+
+
+@pytest.fixture
+def stock_ledger(mocker, session_factory, tmp_path):
+    # Intervalo largo: solo se vuelca lo pendiente cuando una lectura lo pide
+    stock_ledger = StockLedger(tmp_path / "ledger", session_factory, flush_interval=60)
+    stock_ledger.start()
+    mocker.patch.object(ledger, "stock_ledger", stock_ledger)
+    yield stock_ledger
+    stock_ledger.stop()
+
+
+def test_reads_include_movements_pending_in_the_ledger(session, category_id, stock_ledger):
+    [product_id] = add_products(session, category_id, [10.0])
+    assert service.get_by_id(product_id).stock == 0
+    first = service.get_products_page()
+
+    stock_ledger.append(product_id, 7, "Compra")
+
+    assert service.get_by_id(product_id).stock == 7
+    assert service.get_by_id(product_id, fields="stock").stock == 7
+    page = service.get_products_page()
+    assert page is not first
+    assert page.data[0].stock == 7
+
+
+def test_setting_stock_accounts_for_pending_movements(session, category_id, stock_ledger):
+    [product_id] = add_products(session, category_id, [10.0])
+    stock_ledger.append(product_id, 7, "Compra")
+
+    assert service.update_stock(product_id, 5).stock == 5
+    assert stock_ledger.balance(product_id) is None
+    assert service.get_by_id(product_id).stock == 5
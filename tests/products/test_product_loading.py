@@ -0,0 +1,81 @@
+from sqlalchemy import event
+
+from app.products import service
+from app.products.models import ProductImage
+from tests.products.conftest import add_products
+
+IMAGES = 10
+
+
+def add_images(session, product_ids: list[int]) -> None:
+    session.add_all(
+        ProductImage(
+            product_id=product_id,
+            url=f"https://img/{product_id}/{position}",
+            public_id=f"{product_id}-{position}",
+            position=position,
+        )
+        for product_id in product_ids
+        for position in range(IMAGES)
+    )
+    session.commit()
+
+
+def record_selects(session, call) -> list[str]:
+    """Runs `call` and returns every SELECT it executed."""
+    statements = []
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    try:
+        call()
+    finally:
+        event.remove(engine, "after_cursor_execute", after_cursor_execute)
+    return statements
+
+
+def test_listing_loads_relations_with_one_query_each(session, category_id):
+    ids = add_products(session, category_id, [10.0] * 25)
+    add_images(session, ids)
+    session.expunge_all()
+
+    for limit in (5, 20):
+        result = []
+        statements = record_selects(
+            session, lambda: result.extend(service.get_products(limit=limit, count="none")[0])
+        )
+
+        # Página, categorías e imágenes: la cantidad no depende del tamaño de la página
+        assert len(statements) == 3, statements
+        assert not any("JOIN product_images" in statement for statement in statements)
+        assert len(result) == limit
+        assert all(len(product.images) == IMAGES for product in result)
+        assert all(product.category.name == "Remeras" for product in result)
+        session.expunge_all()
+
+
+def test_page_query_is_not_multiplied_by_images(session, category_id):
+    ids = add_products(session, category_id, [10.0] * 5)
+    add_images(session, ids)
+    session.expunge_all()
+
+    statements = record_selects(session, lambda: service.get_products(limit=5, count="none"))
+    page = next(statement for statement in statements if "LIMIT" in statement)
+
+    assert "product_images" not in page
+    assert "anon_1" not in page
+
+
+def test_detail_loads_images_in_position_order(session, category_id):
+    [product_id] = add_products(session, category_id, [10.0])
+    add_images(session, [product_id])
+    session.expunge_all()
+
+    product = service.get_by_id(product_id)
+
+    assert [image.position for image in product.images] == list(range(IMAGES))
+    assert product.category.id == category_id
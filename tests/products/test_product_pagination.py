@@ -0,0 +1,119 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from app.core.exceptions import BadRequestException
+from app.core.pagination import decode_cursor, encode_cursor
+from app.products import service
+from tests.products.conftest import add_products
+
+# Precios repetidos para que el desempate por id sea el que ordena la página
+PRICES = [30, 10, 20, 10, 30, 10, 20, 10, 30]
+
+
+def walk_cursor(limit: int, **params) -> list[int]:
+    ids, cursor = [], None
+    while True:
+        products, _, _, cursor = service.get_products(limit=limit, cursor=cursor, **params)
+        ids.extend(product.id for product in products)
+        if cursor is None:
+            return ids
+
+
+def walk_offset(limit: int, **params) -> list[int]:
+    ids, skip = [], 0
+    while True:
+        products, _, _, next_cursor = service.get_products(skip=skip, limit=limit, **params)
+        ids.extend(product.id for product in products)
+        if next_cursor is None:
+            return ids
+        skip += limit
+
+
+@pytest.mark.parametrize("order_by", ["id", "price", "stock", "name", "created_at"])
+@pytest.mark.parametrize("order_dir", ["asc", "desc"])
+def test_cursor_pages_match_offset_pages(session, category_id, order_by, order_dir):
+    add_products(session, category_id, PRICES)
+
+    by_cursor = walk_cursor(2, order_by=order_by, order_dir=order_dir)
+    by_offset = walk_offset(2, order_by=order_by, order_dir=order_dir)
+
+    assert by_cursor == by_offset
+    assert sorted(by_cursor) == sorted(set(by_cursor))
+    assert len(by_cursor) == len(PRICES)
+
+
+def test_cursor_breaks_ties_on_equal_sort_values_by_id(session, category_id):
+    ids = add_products(session, category_id, PRICES)
+
+    asc_ids = walk_cursor(3, order_by="price", order_dir="asc")
+    desc_ids = walk_cursor(3, order_by="price", order_dir="desc")
+
+    expected = sorted(ids, key=lambda product_id: (PRICES[ids.index(product_id)], product_id))
+    assert asc_ids == expected
+    assert desc_ids == expected[::-1]
+
+
+def test_cursor_page_skips_the_count_unless_requested(session, category_id):
+    add_products(session, category_id, PRICES)
+    _, _, _, cursor = service.get_products(limit=4)
+
+    _, page, total_pages, _ = service.get_products(limit=4, cursor=cursor)
+    assert (page, total_pages) == (None, None)
+
+    _, _, total_pages, _ = service.get_products(limit=4, cursor=cursor, count="exact")
+    assert total_pages == 3
+
+
+def test_last_page_has_no_next_cursor(session, category_id, client):
+    add_products(session, category_id, PRICES[:3])
+
+    body = client.get("/products/", params={"limit": 3}).json()
+
+    assert body["has_next"] is False
+    assert body["next_cursor"] is None
+
+
+def test_cursor_round_trips_datetimes():
+    value = datetime(2025, 1, 2, 3, 4, 5, 123456)
+    assert decode_cursor(encode_cursor(value, 7)) == (value, 7)
+
+
+def raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not-a-cursor",
+        "%%%",
+        base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+        raw_cursor("abc"),
+        raw_cursor([1]),
+        raw_cursor([1, 2, 3]),
+        raw_cursor([{"x": 1}, 5]),
+        raw_cursor([[1, 2], 5]),
+        raw_cursor([None, 5]),
+        raw_cursor([10, "5"]),
+        raw_cursor([10, 5.5]),
+        raw_cursor([{"dt": "yesterday"}, 5]),
+    ],
+)
+def test_invalid_or_tampered_cursor_is_rejected(cursor):
+    with pytest.raises(BadRequestException):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("order_by", ["id", "price", "created_at"])
+def test_invalid_cursor_returns_400(session, category_id, client, order_by):
+    add_products(session, category_id, PRICES)
+
+    response = client.get(
+        "/products/", params={"cursor": raw_cursor([{"x": 1}, 5]), "order_by": order_by}
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {"error": "Invalid cursor"}
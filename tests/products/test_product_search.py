@@ -0,0 +1,108 @@
+import pytest
+from sqlalchemy import event
+
+from app.products import service
+from app.products.schemas import ProductCreate, ProductUpdate
+from app.products.search import SQLiteFTSSearchBackend
+
+
+def search_ids(term: str, **params) -> list[int]:
+    products, _, _, _ = service.get_products(search=term, limit=100, **params)
+    return [product.id for product in products]
+
+
+def create(category_id: int, name: str, description: str | None = None) -> int:
+    return service.create(
+        ProductCreate(name=name, description=description, price=10, category_id=category_id)
+    ).id
+
+
+@pytest.mark.parametrize(
+    "term,match",
+    [
+        ("camiseta", '"camiseta"*'),
+        ("  Camiseta   ROJA ", '"Camiseta"* "ROJA"*'),
+        ('cami"seta OR -roja', '"cami"* "seta"* "OR"* "roja"*'),
+        ("talle 42", '"talle"* "42"*'),
+        ("canción", '"canción"*'),
+        ("!!!", ""),
+        ("-", ""),
+        ("", ""),
+    ],
+)
+def test_build_match_quotes_each_word_as_a_prefix(term, match):
+    assert SQLiteFTSSearchBackend._build_match(term) == match
+
+
+def test_search_matches_prefixes_of_every_word(session, category_id):
+    red = create(category_id, "Camiseta roja", "Algodón peinado")
+    blue = create(category_id, "Camiseta azul")
+    create(category_id, "Pantalón rojo")
+
+    assert sorted(search_ids("cami")) == sorted([red, blue])
+    assert search_ids("cami roj") == [red]
+    assert search_ids("algodon") == [red]
+    assert search_ids("CAMISETA AZUL") == [blue]
+
+
+def test_search_ranks_by_relevance(session, category_id):
+    weak = create(category_id, "Pantalón", "Combina con una remera")
+    strong = create(category_id, "Remera remera", "Remera básica")
+
+    assert search_ids("remera") == [strong, weak]
+    assert search_ids("remera", order_by="id") == [weak, strong]
+
+
+@pytest.mark.parametrize("term", ["!!!", "-", "¿?", "***"])
+def test_term_without_words_returns_no_products(session, category_id, term):
+    create(category_id, "Camiseta roja")
+
+    products, _, total_pages, next_cursor = service.get_products(search=term)
+
+    assert products == []
+    assert total_pages == 0
+    assert next_cursor is None
+
+
+def test_index_follows_create_update_delete_and_restore(session, category_id):
+    product_id = create(category_id, "Camiseta roja")
+    assert search_ids("camiseta") == [product_id]
+
+    service.update(product_id, ProductUpdate(name="Buzo verde", description="Frisa"))
+    assert search_ids("camiseta") == []
+    assert search_ids("buzo") == [product_id]
+    assert search_ids("frisa") == [product_id]
+
+    service.delete(product_id)
+    assert search_ids("buzo") == []
+
+    service.restore(product_id)
+    assert search_ids("buzo") == [product_id]
+
+
+def test_search_count_is_driven_by_the_index(session, category_id):
+    # Sin materializar los resultados el conteo consultaba el índice por cada producto
+    for i in range(3):
+        create(category_id, f"Camiseta {i}")
+    statements = []
+    engine = session.get_bind()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "count(" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        service.get_products(search="camiseta", count="exact")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    statement, parameters = statements[0]
+    plan = [
+        row[3]
+        for row in session.connection().exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + statement, parameters
+        )
+    ]
+    assert any("SCAN products_fts" in detail for detail in plan), plan
+    assert not any("products_fts VIRTUAL TABLE INDEX 0:=" in detail for detail in plan), plan
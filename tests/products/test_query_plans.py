@@ -0,0 +1,184 @@
+import re
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  (registra todos los modelos)
+from app.categories.models import Category
+from app.core.database import Base
+from app.core.pagination import count_cache, encode_cursor
+from app.products import service
+from app.products.models import Product, ProductImage
+from app.products.search import SQLiteFTSSearchBackend
+
+# Una tabla recorrida completa aparece como "SCAN <tabla>"; el recorrido de la
+# tabla virtual FTS y de sus resultados materializados es la búsqueda en sí y
+# no cuenta como full scan, ni el de un índice parcial de productos activos
+# (solo tiene las filas del listado, en orden).
+FULL_SCAN = re.compile(
+    r"^SCAN (?!\w+_fts\b|search_hits\b|products USING (COVERING )?INDEX ix_products_active_)(\w+)"
+)
+PARTIAL_INDEX = re.compile(r"USING (COVERING )?INDEX ix_products_active_(\w+)")
+
+CURSOR_VALUES = {
+    "id": 10,
+    "name": "Producto",
+    "price": 10.0,
+    "stock": 5,
+    "created_at": datetime(2025, 1, 1),
+    "relevance": -1.0,
+}
+
+FILTERS = {
+    "none": {},
+    "price_range": {"min_price": 1, "max_price": 100},
+    "min_price": {"min_price": 1},
+    "search": {"search": "camiseta"},
+    "search_price_range": {"search": "camiseta", "min_price": 1, "max_price": 100},
+}
+
+
+@pytest.fixture
+def session(mocker):
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    SQLiteFTSSearchBackend().create_index(engine)
+
+    db = Session(engine)
+    # Algunas filas para que también se ejecuten las cargas de relaciones
+    category = Category(name="Remeras")
+    db.add(category)
+    db.flush()
+    for i in range(3):
+        product = Product(name=f"Camiseta {i}", price=10 + i, stock=i, category_id=category.id)
+        product.images = [
+            ProductImage(url=f"https://img/{i}/{position}", public_id=f"{i}-{position}", position=position)
+            for position in range(2)
+        ]
+        db.add(product)
+    db.flush()
+    backend = SQLiteFTSSearchBackend()
+    backend.rebuild(db)
+    db.commit()
+
+    mocker.patch.object(service, "db", db)
+    mocker.patch.object(service, "search_backend", backend)
+    count_cache.clear()
+    yield db
+    db.close()
+    engine.dispose()
+
+
+def capture_plans(db: Session, call) -> list[tuple[str, list[str]]]:
+    """
+    Runs `call` and returns the EXPLAIN QUERY PLAN of every query it executed.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    connection = db.connection()
+    plans = []
+    for statement, parameters in statements:
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        plans.append((statement, [row[3] for row in rows]))
+    return plans
+
+
+def assert_no_full_scan(plans: list[tuple[str, list[str]]]) -> None:
+    assert plans, "No queries were captured"
+    for statement, details in plans:
+        scans = [detail for detail in details if FULL_SCAN.match(detail)]
+        assert not scans, f"Full scan {scans} in query:\n{statement}\nPlan: {details}"
+
+
+def page_plan(plans: list[tuple[str, list[str]]]) -> list[str]:
+    # La consulta de la página es la única con LIMIT (conteo y relaciones no lo usan)
+    return next(details for statement, details in plans if "LIMIT" in statement)
+
+
+def order_fields(filter_name: str) -> list[str]:
+    fields = sorted(service.ALLOWED_ORDER_FIELDS)
+    if "search" in filter_name:
+        fields.append(service.RELEVANCE_ORDER_FIELD)
+    return fields
+
+
+CASES = [
+    (filter_name, order_by, order_dir)
+    for filter_name in FILTERS
+    for order_by in order_fields(filter_name)
+    for order_dir in ("asc", "desc")
+]
+
+
+@pytest.mark.parametrize("filter_name,order_by,order_dir", CASES)
+def test_offset_page_uses_indexes(session, filter_name, order_by, order_dir):
+    plans = capture_plans(
+        session,
+        lambda: service.get_products(
+            order_by=order_by, order_dir=order_dir, count="exact", **FILTERS[filter_name]
+        ),
+    )
+    assert_no_full_scan(plans)
+
+
+@pytest.mark.parametrize("filter_name,order_by,order_dir", CASES)
+def test_cursor_page_uses_indexes(session, filter_name, order_by, order_dir):
+    cursor = encode_cursor(CURSOR_VALUES[order_by], 10)
+    plans = capture_plans(
+        session,
+        lambda: service.get_products(
+            order_by=order_by, order_dir=order_dir, cursor=cursor, **FILTERS[filter_name]
+        ),
+    )
+    assert_no_full_scan(plans)
+
+
+@pytest.mark.parametrize("order_by", sorted(service.ALLOWED_ORDER_FIELDS))
+def test_sparse_page_uses_indexes(session, order_by):
+    fields = service.parse_fields("name,price,thumbnail,category,images")
+    plans = capture_plans(
+        session, lambda: service.get_products(order_by=order_by, fields=fields)
+    )
+    assert_no_full_scan(plans)
+
+
+@pytest.mark.parametrize("order_by", sorted(service.ALLOWED_ORDER_FIELDS - {"id"}))
+def test_unfiltered_order_is_served_by_index(session, order_by):
+    plans = capture_plans(session, lambda: service.get_products(order_by=order_by))
+    details = page_plan(plans)
+    assert not any("TEMP B-TREE" in detail for detail in details), details
+
+
+@pytest.mark.parametrize("order_by", sorted(service.ALLOWED_ORDER_FIELDS))
+def test_unfiltered_page_reads_the_partial_index_of_its_order(session, order_by):
+    plans = capture_plans(session, lambda: service.get_products(order_by=order_by))
+    indexes = [
+        match.group(2) for detail in page_plan(plans) if (match := PARTIAL_INDEX.search(detail))
+    ]
+    assert indexes == [order_by]
+
+
+@pytest.mark.parametrize("order_by", sorted(service.ALLOWED_ORDER_FIELDS))
+def test_price_range_is_searched_in_index(session, order_by):
+    plans = capture_plans(
+        session,
+        lambda: service.get_products(order_by=order_by, min_price=1, max_price=100),
+    )
+    details = page_plan(plans)
+    assert any("price>" in detail and "price<" in detail for detail in details), details
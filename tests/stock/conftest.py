@@ -0,0 +1,16 @@
+import pytest
+
+from app.categories.models import Category
+from app.products.models import Product
+
+
+@pytest.fixture
+def product_id(session_factory):
+    with session_factory() as session:
+        category = Category(name="Calzado")
+        session.add(category)
+        session.flush()
+        product = Product(name="Zapatilla", price=100, stock=0, category_id=category.id)
+        session.add(product)
+        session.commit()
+        return product.id
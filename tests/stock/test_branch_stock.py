@@ -0,0 +1,121 @@
+import pytest
+from sqlalchemy import desc, func, select, text
+
+from app.categories.models import Category
+from app.products.models import Product
+from app.stock import service as stock_service
+from app.stock.branches import BranchStock, rebuild_branch_totals, sync_branch_stock
+from app.stock.models import ProductBranchStock, ProductBranchStockTotal
+
+
+@pytest.fixture
+def session(mocker, session_factory):
+    with session_factory() as session:
+        category = Category(name="Calzado")
+        session.add(category)
+        session.flush()
+        session.add_all(
+            Product(id=i, name=f"Producto {i}", price=10, stock=0, category_id=category.id)
+            for i in range(1, 6)
+        )
+        session.commit()
+        mocker.patch.object(stock_service, "db", session)
+        yield session
+
+
+def sync(session, rows, replace=None):
+    written = sync_branch_stock(
+        session, [BranchStock(*row) for row in rows], replace=replace
+    )
+    session.commit()
+    return written
+
+
+def totals(session):
+    session.expire_all()
+    return session.execute(
+        select(
+            ProductBranchStockTotal.product_id,
+            ProductBranchStockTotal.stock,
+            ProductBranchStockTotal.reserved,
+            ProductBranchStockTotal.available,
+            ProductBranchStockTotal.branches,
+        ).order_by(ProductBranchStockTotal.product_id)
+    ).all()
+
+
+def summed(session):
+    return session.execute(
+        select(
+            ProductBranchStock.product_id,
+            func.sum(ProductBranchStock.stock),
+            func.sum(ProductBranchStock.reserved),
+            func.sum(ProductBranchStock.available),
+            func.count(),
+        )
+        .group_by(ProductBranchStock.product_id)
+        .order_by(ProductBranchStock.product_id)
+    ).all()
+
+
+def test_totals_follow_inserts_updates_and_removals(session):
+    assert sync(session, [(1, 1, 30, 0, 30), (1, 2, 20, 5, 15), (2, 1, 4, 1, 3)]) == 3
+    assert totals(session) == [(1, 50, 5, 45, 2), (2, 4, 1, 3, 1)]
+
+    # Producto 1: cambia la sucursal 2 y desaparece la 1; el producto 2 no cambia
+    assert sync(session, [(1, 2, 8, 0, 8), (2, 1, 4, 1, 3)], replace=[1, 2]) == 2
+    assert totals(session) == [(1, 8, 0, 8, 1), (2, 4, 1, 3, 1)]
+    assert totals(session) == summed(session)
+
+    # Sin sucursales en el origen: el producto queda en cero
+    assert sync(session, [], replace=[2]) == 1
+    assert totals(session) == [(1, 8, 0, 8, 1), (2, 0, 0, 0, 0)]
+
+
+def test_unchanged_rows_are_not_written(session):
+    rows = [(product_id, 1, 10, 0, 10) for product_id in range(1, 6)]
+    assert sync(session, rows) == 5
+    assert sync(session, rows, replace=range(1, 6)) == 0
+    assert totals(session)[0] == (1, 10, 0, 10, 1)
+
+
+def test_rebuild_matches_incremental_totals(session):
+    sync(session, [(1, 1, 30, 0, 30), (1, 2, 20, 5, 15), (3, 2, 7, 7, 0)])
+    incremental = totals(session)
+
+    assert rebuild_branch_totals(session) == 2
+    session.commit()
+    assert totals(session) == incremental
+
+
+def test_branch_availability_is_paged_by_index(session):
+    sync(
+        session,
+        [(1, 1, 5, 0, 5), (2, 1, 9, 0, 9), (3, 1, 5, 0, 5), (4, 1, 0, 0, 0), (5, 2, 9, 0, 9)],
+    )
+
+    first = stock_service.get_branch_availability(1, limit=2)
+    second = stock_service.get_branch_availability(1, limit=2, cursor=first.next_cursor)
+    assert [(item.product_id, item.available) for item in first.data] == [(2, 9), (3, 5)]
+    assert [(item.product_id, item.available) for item in second.data] == [(1, 5)]
+    assert not second.has_next
+
+    statement = (
+        select(ProductBranchStock.product_id)
+        .where(ProductBranchStock.branch_id == 1, ProductBranchStock.available >= 1)
+        .order_by(desc(ProductBranchStock.available), desc(ProductBranchStock.product_id))
+    )
+    compiled = statement.compile(session.get_bind(), compile_kwargs={"literal_binds": True})
+    plan = [row[-1] for row in session.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))]
+    assert any("ix_product_branch_stock_branch_id_available" in step for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+def test_product_branch_stock_reads_the_totals(session):
+    sync(session, [(1, 2, 20, 5, 15), (1, 1, 30, 0, 30)])
+
+    response = stock_service.get_product_branch_stock(1)
+
+    assert (response.stock, response.reserved, response.available) == (50, 5, 45)
+    assert [branch.branch_id for branch in response.branches] == [1, 2]
+    assert stock_service.get_product_branch_stock(2).branches == []
@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import select, text
+
+from app.products.models import Product
+from app.stock import service as stock_service
+from app.stock.alerts import rebuild_alerts
+from app.stock.engine import StockMovement, apply_stock_movement, apply_stock_movements
+from app.stock.models import StockAlert
+
+
+@pytest.fixture
+def session(session_factory, product_id):
+    with session_factory() as session:
+        product = session.get(Product, product_id)
+        product.stock = 20
+        product.min_stock = 10
+        product.critical_stock = 3
+        session.commit()
+        yield session
+
+
+def alert(session, product_id):
+    session.expire_all()
+    return session.get(StockAlert, product_id)
+
+
+def move(session, product_id, quantity):
+    apply_stock_movement(session, product_id, quantity, "Movimiento")
+    session.commit()
+
+
+def test_alert_follows_threshold_crossings(session, product_id):
+    move(session, product_id, -5)
+    assert alert(session, product_id) is None
+
+    move(session, product_id, -5)
+    low = alert(session, product_id)
+    assert low.level == "low"
+    since = low.since
+
+    # Sigue en el mismo nivel: no se reinicia la fecha de entrada
+    move(session, product_id, -1)
+    assert alert(session, product_id).since == since
+
+    move(session, product_id, -6)
+    assert alert(session, product_id).level == "critical"
+
+    apply_stock_movements(session, [StockMovement(product_id, 20, "Compra")])
+    session.commit()
+    assert alert(session, product_id) is None
+
+
+def test_rebuild_matches_incremental_alerts(session, product_id):
+    move(session, product_id, -15)
+    incremental = alert(session, product_id).level
+
+    session.execute(text("DELETE FROM stock_alerts"))
+    assert rebuild_alerts(session) == 1
+    session.commit()
+    assert alert(session, product_id).level == incremental
+
+
+def test_alert_page_is_an_index_lookup(mocker, session, product_id):
+    move(session, product_id, -18)
+    mocker.patch.object(stock_service, "db", session)
+
+    page = stock_service.get_stock_alerts(limit=10, category_id=1, level="critical")
+    assert [(item.product_id, item.stock) for item in page.data] == [(product_id, 2)]
+
+    statement = (
+        select(StockAlert.product_id)
+        .join(Product, Product.id == StockAlert.product_id)
+        .where(StockAlert.category_id == 1)
+        .order_by(StockAlert.product_id)
+    )
+    compiled = statement.compile(session.get_bind(), compile_kwargs={"literal_binds": True})
+    plan = [row[-1] for row in session.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))]
+    assert not any(step.startswith("SCAN products") for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
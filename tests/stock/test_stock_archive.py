@@ -0,0 +1,120 @@
+import gzip
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app.products.models import Product
+from app.stock.archive import OPENING_BALANCE_REASON, compact_history
+from app.stock.models import StockHistory, StockHistoryArchive
+from app.stock.snapshots import compact_snapshots, stock_at_statement
+
+START = datetime(2024, 1, 1, 12)
+HORIZON = datetime(2024, 1, 31)
+
+
+@pytest.fixture
+def session(session_factory, product_id):
+    # Un movimiento por día durante 40 días: 30 antes del horizonte
+    with session_factory() as session:
+        session.add_all(
+            StockHistory(
+                product_id=product_id,
+                quantity=day + 1,
+                reason="Compra",
+                created_at=START + timedelta(days=day),
+            )
+            for day in range(40)
+        )
+        session.commit()
+        yield session
+
+
+def history(session, product_id):
+    return session.execute(
+        select(StockHistory.quantity, StockHistory.reason, StockHistory.created_at)
+        .where(StockHistory.product_id == product_id)
+        .order_by(StockHistory.created_at, StockHistory.id)
+    ).all()
+
+
+def test_compaction_keeps_the_balance_and_archives_old_rows(session, product_id):
+    total = sum(quantity for quantity, _, _ in history(session, product_id))
+
+    result = compact_history(session, HORIZON, batch_size=7)
+
+    assert (result.batches, result.archived, result.products) == (5, 30, 1)
+    rows = history(session, product_id)
+    assert rows[0] == (sum(range(1, 31)), OPENING_BALANCE_REASON, HORIZON)
+    assert len(rows) == 11
+    assert sum(quantity for quantity, _, _ in rows) == total
+    assert session.scalar(select(func.count()).select_from(StockHistoryArchive)) == 30
+
+    # Volver a correrlo no hace nada; un horizonte posterior suma al saldo inicial
+    assert compact_history(session, HORIZON).batches == 0
+    compact_history(session, HORIZON + timedelta(days=5))
+    rows = history(session, product_id)
+    assert rows[0][0] == sum(range(1, 36))
+    assert sum(quantity for quantity, _, _ in rows) == total
+    assert session.scalar(select(func.count()).select_from(StockHistoryArchive)) == 35
+
+
+def test_movements_with_the_opening_balance_reason_are_archived(session, product_id):
+    # Solo is_opening_balance marca el saldo inicial, no el texto del motivo
+    session.add(
+        StockHistory(
+            product_id=product_id,
+            quantity=100,
+            reason=OPENING_BALANCE_REASON,
+            created_at=HORIZON + timedelta(days=2),
+        )
+    )
+    session.commit()
+
+    compact_history(session, HORIZON)
+    compact_history(session, HORIZON + timedelta(days=5))
+
+    openings = session.scalars(
+        select(StockHistory.quantity).where(StockHistory.is_opening_balance.is_(True))
+    ).all()
+    assert openings == [sum(range(1, 36)) + 100]
+    assert session.scalar(select(func.count()).select_from(StockHistoryArchive)) == 36
+
+
+def test_compaction_to_ndjson_file(session, product_id, tmp_path):
+    path = tmp_path / "history.ndjson.gz"
+    # Dos corridas con lotes distintos sobre el mismo archivo (miembros gzip concatenados)
+    with open(path, "ab") as output:
+        compact_history(session, START + timedelta(days=10), batch_size=4, output=output)
+    with open(path, "ab") as output:
+        compact_history(session, HORIZON, batch_size=4, output=output)
+
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        lines = [json.loads(line) for line in archive]
+
+    assert [line["quantity"] for line in lines] == list(range(1, 31))
+    assert session.scalar(select(func.count()).select_from(StockHistoryArchive)) == 0
+    assert history(session, product_id)[0][:2] == (sum(range(1, 31)), OPENING_BALANCE_REASON)
+
+
+def stock_at(session, product_id, day: date) -> int:
+    statement = stock_at_statement(day).where(Product.id == product_id)
+    return session.execute(statement).one().stock
+
+
+def test_stock_at_is_unchanged_by_compaction(session, product_id):
+    product = session.get(Product, product_id)
+    product.stock = sum(range(1, 41))
+    product.created_at = START - timedelta(days=1)
+    session.flush()
+    # Snapshot anterior al horizonte: sus movimientos posteriores se compactan
+    compact_snapshots(session, date(2024, 1, 10))
+    session.commit()
+    days = [date(2024, 1, 10), date(2024, 1, 30), date(2024, 1, 31), date(2024, 2, 5)]
+    before = {day: stock_at(session, product_id, day) for day in days}
+
+    compact_history(session, HORIZON, batch_size=7)
+
+    assert {day: stock_at(session, product_id, day) for day in days} == before
+    assert before[date(2024, 2, 5)] == sum(range(1, 37))
@@ -0,0 +1,194 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.exceptions import BadRequestException, NotFoundException
+from app.products.models import Product
+from app.stock.engine import StockMovement, apply_stock_movement, apply_stock_movements
+from app.stock.models import StockHistory, StockReservation
+from app.stock.reservations import available_stock, reserve
+
+THREADS = 16
+MOVEMENTS_PER_THREAD = 25
+
+
+def set_stock(session_factory, product_id: int, stock: int) -> None:
+    with session_factory() as session:
+        session.get(Product, product_id).stock = stock
+        session.commit()
+
+
+def run_concurrently(session_factory, product_id: int, quantity: int) -> tuple[int, int]:
+    """
+    Applies `quantity` from many threads at once against the same product.
+    :return: Tuple with the number of applied and rejected movements
+    """
+    applied = rejected = 0
+    lock = threading.Lock()
+    barrier = threading.Barrier(THREADS)
+
+    def worker():
+        nonlocal applied, rejected
+        barrier.wait()
+        for _ in range(MOVEMENTS_PER_THREAD):
+            with session_factory() as session:
+                try:
+                    apply_stock_movement(session, product_id, quantity, "Venta")
+                    session.commit()
+                    ok = True
+                except BadRequestException:
+                    session.rollback()
+                    ok = False
+            with lock:
+                if ok:
+                    applied += 1
+                else:
+                    rejected += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return applied, rejected
+
+
+def stock_and_history(session_factory, product_id: int) -> tuple[int, int, int]:
+    with session_factory() as session:
+        stock = session.scalar(select(Product.stock).where(Product.id == product_id))
+        rows, total = session.execute(
+            select(func.count(), func.coalesce(func.sum(StockHistory.quantity), 0)).where(
+                StockHistory.product_id == product_id
+            )
+        ).one()
+        return stock, rows, total
+
+
+def test_concurrent_decrements_never_oversell(session_factory, product_id):
+    initial = 150
+    set_stock(session_factory, product_id, initial)
+
+    applied, rejected = run_concurrently(session_factory, product_id, -1)
+
+    stock, rows, total = stock_and_history(session_factory, product_id)
+    assert applied == initial
+    assert rejected == THREADS * MOVEMENTS_PER_THREAD - initial
+    assert stock == 0
+    assert rows == applied
+    assert total == -initial
+
+
+def test_concurrent_increments_are_not_lost(session_factory, product_id):
+    applied, rejected = run_concurrently(session_factory, product_id, 2)
+
+    stock, rows, total = stock_and_history(session_factory, product_id)
+    assert rejected == 0
+    assert stock == 2 * THREADS * MOVEMENTS_PER_THREAD
+    assert rows == applied
+    assert total == stock
+
+
+def test_rejected_movement_leaves_no_history(session_factory, product_id):
+    set_stock(session_factory, product_id, 1)
+
+    with session_factory() as session:
+        with pytest.raises(BadRequestException):
+            apply_stock_movement(session, product_id, -2, "Venta")
+        session.rollback()
+
+    assert stock_and_history(session_factory, product_id) == (1, 0, 0)
+
+
+def test_unknown_product_raises_not_found(session_factory):
+    with session_factory() as session:
+        with pytest.raises(NotFoundException):
+            apply_stock_movement(session, 999, 1, "Compra")
+
+
+def test_atomic_batch_applies_all_or_nothing(session_factory, product_id):
+    set_stock(session_factory, product_id, 3)
+    movements = [
+        StockMovement(product_id, 5, "Recepción"),
+        StockMovement(product_id, -10, "Inventario"),
+    ]
+
+    with session_factory() as session:
+        with pytest.raises(BadRequestException, match="Line 0"):
+            apply_stock_movements(session, movements, atomic=True)
+        session.rollback()
+    assert stock_and_history(session_factory, product_id) == (3, 0, 0)
+
+    with session_factory() as session:
+        assert apply_stock_movements(session, movements[:1] * 3, atomic=True) == []
+        session.commit()
+    assert stock_and_history(session_factory, product_id) == (18, 3, 15)
+
+
+def test_partial_batch_reports_rejected_lines(session_factory, product_id):
+    set_stock(session_factory, product_id, 3)
+    movements = [
+        StockMovement(product_id, -2, "Venta"),
+        StockMovement(product_id, -2, "Venta"),
+        StockMovement(999, 1, "Compra"),
+        StockMovement(product_id, 4, "Compra"),
+    ]
+
+    with session_factory() as session:
+        rejected = apply_stock_movements(session, movements, atomic=False)
+        session.commit()
+
+    assert [(line.line, line.product_id) for line in rejected] == [(1, product_id), (2, 999)]
+    assert stock_and_history(session_factory, product_id) == (5, 2, 2)
+
+
+def test_decrements_do_not_take_reserved_stock(session_factory, product_id):
+    with session_factory() as session:
+        product = session.get(Product, product_id)
+        product.stock, product.reserved = 5, 3
+        session.commit()
+
+    with session_factory() as session:
+        with pytest.raises(BadRequestException):
+            apply_stock_movement(session, product_id, -3, "Inventario")
+        session.rollback()
+        with pytest.raises(BadRequestException, match="available 2"):
+            apply_stock_movements(
+                session, [StockMovement(product_id, -3, "Inventario")], atomic=True
+            )
+        session.rollback()
+
+    with session_factory() as session:
+        apply_stock_movement(session, product_id, -2, "Inventario")
+        session.commit()
+    assert stock_and_history(session_factory, product_id) == (3, 1, -2)
+
+
+def test_increments_apply_even_below_the_reserved_stock(session_factory, product_id):
+    with session_factory() as session:
+        session.get(Product, product_id).reserved = 4
+        session.commit()
+
+    with session_factory() as session:
+        apply_stock_movement(session, product_id, 1, "Compra")
+        session.commit()
+    assert stock_and_history(session_factory, product_id) == (1, 1, 1)
+
+
+def test_expired_holds_do_not_block_decrements(session_factory, product_id):
+    set_stock(session_factory, product_id, 5)
+    with session_factory() as session:
+        reservation = reserve(session, product_id, 5, user_id=1)
+        reservation.expires_at = datetime.now() - timedelta(minutes=1)
+        session.commit()
+        # Sin barrido, la reserva vencida sigue contada en products.reserved
+        assert available_stock(session, product_id) == (5, 0)
+
+        apply_stock_movement(session, product_id, -1, "Venta")
+        apply_stock_movements(session, [StockMovement(product_id, -1, "Venta")])
+        session.commit()
+
+        assert session.get(Product, product_id).reserved == 0
+        assert session.scalar(select(func.count()).select_from(StockReservation)) == 0
+    assert stock_and_history(session_factory, product_id) == (3, 2, -2)
@@ -0,0 +1,97 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.core.database import DatabaseConnection
+from app.core.exceptions import BadRequestException, NotFoundException
+from app.products import service as product_service
+from app.stock import service as stock_service
+from app.stock.models import StockHistory
+
+START = datetime(2025, 1, 1)
+
+
+@pytest.fixture
+def session(mocker, session_factory, product_id):
+    with session_factory() as session:
+        # Dos movimientos por hora: el id desempata los que tienen la misma fecha
+        session.execute(
+            insert(StockHistory),
+            [
+                {
+                    "product_id": product_id,
+                    "quantity": i + 1,
+                    "reason": f"Movimiento {i}",
+                    "created_at": START + timedelta(hours=i // 2),
+                }
+                for i in range(10)
+            ],
+        )
+        session.commit()
+        mocker.patch.object(stock_service, "db", session)
+        # `_get_one_product` consulta con la sesión del servicio de productos
+        mocker.patch.object(product_service, "db", session)
+        yield session
+
+
+def walk(product_id, limit, **params) -> list[int]:
+    quantities, cursor = [], None
+    while True:
+        page = stock_service.get_stock_history(product_id, limit=limit, cursor=cursor, **params)
+        assert len(page.data) <= limit
+        assert page.has_next == (page.next_cursor is not None)
+        quantities.extend(row.quantity for row in page.data)
+        cursor = page.next_cursor
+        if cursor is None:
+            return quantities
+
+
+def test_history_is_newest_first_by_default(session, product_id):
+    assert walk(product_id, 3) == list(range(10, 0, -1))
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 10, 50])
+def test_cursor_pages_cover_every_movement_once(session, product_id, limit):
+    assert walk(product_id, limit, order_dir="asc") == list(range(1, 11))
+    assert walk(product_id, limit, order_dir="desc") == list(range(10, 0, -1))
+
+
+def test_date_range_includes_from_and_excludes_to(session, product_id):
+    quantities = walk(
+        product_id,
+        2,
+        date_from=START + timedelta(hours=1),
+        date_to=START + timedelta(hours=3),
+        order_dir="asc",
+    )
+
+    assert quantities == [3, 4, 5, 6]
+
+
+def test_unknown_product_and_invalid_cursor(session, product_id):
+    with pytest.raises(NotFoundException):
+        stock_service.get_stock_history(product_id + 1)
+    with pytest.raises(BadRequestException):
+        stock_service.get_stock_history(product_id, cursor="not-a-cursor")
+
+
+def test_export_streams_the_range_oldest_first(mocker, session_factory, session, product_id):
+    mocker.patch.object(stock_service, "HISTORY_EXPORT_BATCH_SIZE", 4)
+    mocker.patch.object(
+        DatabaseConnection,
+        "session",
+        new_callable=mocker.PropertyMock,
+        side_effect=session_factory,
+    )
+
+    chunks = list(
+        stock_service.export_stock_history(product_id, date_from=START + timedelta(hours=1))
+    )
+    rows = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+
+    assert len(chunks) == 2
+    assert [row["quantity"] for row in rows] == list(range(3, 11))
+    assert rows[0]["product_id"] == product_id
+    assert rows[0]["created_at"] == "2025-01-01T01:00:00"
@@ -0,0 +1,205 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.exceptions import BadRequestException, NotFoundException
+from app.products.models import Product
+from app.stock.engine import apply_stock_movement
+from app.stock.ledger import StockLedger
+from app.stock.models import StockHistory, StockLedgerCheckpoint, StockLedgerRejection
+from app.stock.reservations import reserve
+
+
+@pytest.fixture
+def ledger_dir(tmp_path):
+    return tmp_path / "ledger"
+
+
+def stored_stock(session_factory, product_id: int) -> tuple[int, int]:
+    """:return: Tuple with the stock of the product and its number of history rows"""
+    with session_factory() as session:
+        stock = session.scalar(select(Product.stock).where(Product.id == product_id))
+        movements = session.scalar(
+            select(func.count()).where(StockHistory.product_id == product_id)
+        )
+        return stock, movements
+
+
+def test_append_is_visible_before_flush(session_factory, product_id, ledger_dir):
+    # Intervalo largo: el flush solo ocurre al llamarlo explícitamente
+    ledger = StockLedger(ledger_dir, session_factory, flush_interval=60)
+    ledger.start()
+    try:
+        ledger.append(product_id, 10, "Compra")
+        ledger.append(product_id, -3, "Venta")
+
+        assert ledger.balance(product_id) == 7
+        assert stored_stock(session_factory, product_id) == (0, 0)
+
+        assert ledger.flush() == 2
+        assert stored_stock(session_factory, product_id) == (7, 2)
+        assert ledger.balance(product_id) is None
+    finally:
+        ledger.stop()
+
+
+def test_rejects_movements_that_leave_negative_stock(session_factory, product_id, ledger_dir):
+    ledger = StockLedger(ledger_dir, session_factory, flush_interval=60)
+    ledger.start()
+    try:
+        ledger.append(product_id, 5, "Compra")
+        with pytest.raises(BadRequestException):
+            ledger.append(product_id, -6, "Venta")
+        with pytest.raises(NotFoundException):
+            ledger.append(product_id + 1000, 1, "Compra")
+        assert ledger.balance(product_id) == 5
+    finally:
+        ledger.stop()
+
+    assert stored_stock(session_factory, product_id) == (5, 1)
+
+
+def test_concurrent_appends_never_oversell(session_factory, product_id, ledger_dir):
+    ledger = StockLedger(ledger_dir, session_factory, flush_interval=0.01)
+    ledger.start()
+    ledger.append(product_id, 100, "Compra")
+    applied = []
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        for _ in range(25):
+            try:
+                ledger.append(product_id, -1, "Venta")
+                applied.append(1)
+            except BadRequestException:
+                pass
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ledger.stop()
+
+    assert len(applied) == 100
+    assert stored_stock(session_factory, product_id) == (0, 101)
+
+
+def test_recovers_unflushed_movements_after_restart(session_factory, product_id, ledger_dir):
+    ledger = StockLedger(ledger_dir, session_factory, flush_interval=60)
+    ledger.start()
+    ledger.append(product_id, 10, "Compra")
+    ledger.flush()
+    ledger.append(product_id, -4, "Venta")
+    # Caída del proceso: los hilos mueren sin aplicar el último movimiento
+    ledger._stopping.set()
+    ledger._queue.put(None)
+    for thread in ledger._threads:
+        thread.join()
+    ledger._segment.close()
+
+    assert stored_stock(session_factory, product_id) == (10, 1)
+
+    restarted = StockLedger(ledger_dir, session_factory, flush_interval=60)
+    restarted.start()
+    try:
+        assert restarted.balance(product_id) == 6
+        assert restarted.flush() == 1
+    finally:
+        restarted.stop()
+
+    assert stored_stock(session_factory, product_id) == (6, 2)
+    with session_factory() as session:
+        assert session.get(StockLedgerCheckpoint, 1).last_seq == 2
+
+
+def move_elsewhere(session_factory, product_id: int, quantity: int) -> None:
+    # Movimiento por el motor síncrono, sin pasar por el ledger
+    with session_factory() as session:
+        apply_stock_movement(session, product_id, quantity, "Venta mostrador")
+        session.commit()
+
+
+def test_append_sees_stock_moved_by_other_paths(session_factory, product_id, ledger_dir):
+    ledger = StockLedger(ledger_dir, session_factory, flush_interval=60)
+    ledger.start()
+    try:
+        ledger.append(product_id, 10, "Compra")
+        ledger.flush()
+        move_elsewhere(session_factory, product_id, -10)
+
+        with pytest.raises(BadRequestException):
+            ledger.append(product_id, -5, "Venta")
+        assert ledger.balance(product_id) is None
+    finally:
+        ledger.stop()
+
+    assert stored_stock(session_factory, product_id) == (0, 2)
+
+
+def test_append_does_not_take_reserved_stock(session_factory, product_id, ledger_dir):
+    with session_factory() as session:
+        session.get(Product, product_id).stock = 5
+        session.commit()
+        reserve(session, product_id, 3, user_id=1)
+        session.commit()
+
+    ledger = StockLedger(ledger_dir, session_factory, flush_interval=60)
+    ledger.start()
+    try:
+        with pytest.raises(BadRequestException):
+            ledger.append(product_id, -3, "Venta")
+        ledger.append(product_id, -2, "Venta")
+    finally:
+        ledger.stop()
+
+    assert stored_stock(session_factory, product_id) == (3, 1)
+
+
+def test_flush_records_movements_whose_stock_was_taken_meanwhile(
+    session_factory, product_id, ledger_dir
+):
+    ledger = StockLedger(ledger_dir, session_factory, flush_interval=60)
+    ledger.start()
+    try:
+        ledger.append(product_id, 10, "Compra")
+        ledger.flush()
+        ledger.append(product_id, -4, "Venta")
+        ledger.append(product_id, -5, "Venta")
+        # Otro camino vende antes del flush y solo quedan 5 unidades
+        move_elsewhere(session_factory, product_id, -5)
+
+        assert ledger.flush() == 1
+        assert ledger.balance(product_id) is None
+    finally:
+        ledger.stop()
+
+    assert stored_stock(session_factory, product_id) == (1, 3)
+    with session_factory() as session:
+        assert session.get(StockLedgerCheckpoint, 1).last_seq == 3
+        # El movimiento ya confirmado queda registrado como rechazado, no se pierde
+        assert session.execute(
+            select(StockLedgerRejection.seq, StockLedgerRejection.quantity)
+        ).all() == [(3, -5)]
+
+
+def test_expired_holds_do_not_block_ledger_decrements(session_factory, product_id, ledger_dir):
+    with session_factory() as session:
+        session.get(Product, product_id).stock = 5
+        session.commit()
+        reservation = reserve(session, product_id, 5, user_id=1)
+        reservation.expires_at = datetime.now() - timedelta(minutes=1)
+        session.commit()
+
+    ledger = StockLedger(ledger_dir, session_factory, flush_interval=60)
+    ledger.start()
+    try:
+        ledger.append(product_id, -2, "Venta")
+        assert ledger.flush() == 1
+    finally:
+        ledger.stop()
+
+    assert stored_stock(session_factory, product_id) == (3, 1)
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.core.exceptions import BadRequestException
+from app.products.models import Product
+from app.stock.models import StockHistory, StockReservation
+from app.stock.reservations import (
+    available_stock,
+    consume_order_lines,
+    release,
+    reserve,
+    sweep_expired,
+)
+
+BUYER, OTHER = 1, 2
+
+
+@pytest.fixture
+def session(session_factory, product_id):
+    with session_factory() as session:
+        session.get(Product, product_id).stock = 5
+        session.commit()
+        yield session
+
+
+def levels(session, product_id):
+    session.expire_all()
+    product = session.get(Product, product_id)
+    return product.stock, product.reserved
+
+
+def test_reservations_cannot_exceed_stock(session, product_id):
+    reserve(session, product_id, 3, BUYER)
+    session.commit()
+
+    with pytest.raises(BadRequestException):
+        reserve(session, product_id, 3, OTHER)
+    session.rollback()
+
+    assert levels(session, product_id) == (5, 3)
+    assert available_stock(session, product_id) == (5, 3)
+
+
+def test_release_returns_the_stock(session, product_id):
+    reservation = reserve(session, product_id, 3, BUYER)
+    session.commit()
+
+    assert not release(session, reservation.id, OTHER)
+    assert release(session, reservation.id, BUYER)
+    session.commit()
+    assert levels(session, product_id) == (5, 0)
+
+
+def test_order_consumes_own_reservation_and_respects_others(session, product_id):
+    reserve(session, product_id, 2, BUYER)
+    reserve(session, product_id, 3, OTHER)
+    session.commit()
+
+    # Solo hay 2 unidades retenidas para el comprador y ninguna libre
+    with pytest.raises(BadRequestException):
+        consume_order_lines(session, BUYER, [(product_id, 3)], "Pedido #1")
+    session.rollback()
+
+    consume_order_lines(session, BUYER, [(product_id, 2)], "Pedido #1")
+    session.commit()
+
+    assert levels(session, product_id) == (3, 3)
+    history = session.scalars(select(StockHistory.quantity)).all()
+    assert history == [-2]
+
+
+def test_order_reports_the_line_without_stock(session, product_id):
+    product = session.get(Product, product_id)
+    other = Product(name="Ojotas", price=50, stock=2, category_id=product.category_id)
+    session.add(other)
+    session.commit()
+    reserve(session, other.id, 2, OTHER)
+    session.commit()
+
+    # El primer producto alcanza; el segundo solo tiene unidades reservadas por otro
+    with pytest.raises(BadRequestException, match=f"product {other.id}$"):
+        consume_order_lines(session, BUYER, [(product_id, 1), (other.id, 1)], "Pedido #1")
+    session.rollback()
+
+    assert levels(session, product_id) == (5, 0)
+    assert levels(session, other.id) == (2, 2)
+
+
+def test_sweep_releases_only_expired_reservations(session, product_id):
+    for _ in range(4):
+        reserve(session, product_id, 1, BUYER)
+    session.commit()
+    session.execute(
+        update(StockReservation)
+        .where(StockReservation.id <= 3)
+        .values(expires_at=datetime.now() - timedelta(minutes=1))
+    )
+    session.commit()
+
+    assert available_stock(session, product_id) == (5, 1)
+    assert sweep_expired(session, limit=2) == 2
+    assert sweep_expired(session, limit=2) == 1
+    assert sweep_expired(session, limit=2) == 0
+    session.commit()
+
+    assert levels(session, product_id) == (5, 1)
+    assert session.scalar(select(func.count()).select_from(StockReservation)) == 1
@@ -0,0 +1,74 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.products.models import Product
+from app.stock.engine import apply_stock_movement
+from app.stock.models import StockHistory, StockSnapshot
+from app.stock.snapshots import compact_snapshots, stock_at_statement
+
+DAY = date(2025, 3, 10)
+
+# Movimientos de los días 1, 2 y 4 sobre un stock inicial de 10 (día 0)
+MOVEMENTS = [(1, 5), (2, -3), (4, 1)]
+EXPECTED = {0: 10, 1: 15, 2: 12, 3: 12, 4: 13, 5: 13}
+
+
+@pytest.fixture
+def product_with_history(session_factory, product_id):
+    with session_factory() as session:
+        product = session.get(Product, product_id)
+        product.created_at = datetime.combine(DAY, datetime.min.time())
+        product.stock = 10 + sum(quantity for _, quantity in MOVEMENTS)
+        for offset, quantity in MOVEMENTS:
+            session.add(
+                StockHistory(
+                    product_id=product_id,
+                    quantity=quantity,
+                    reason="Movimiento",
+                    created_at=datetime.combine(DAY + timedelta(days=offset), datetime.min.time())
+                    + timedelta(hours=12),
+                )
+            )
+        session.commit()
+    return product_id
+
+
+def stock_on(session_factory, product_id: int, offset: int) -> int:
+    with session_factory() as session:
+        statement = stock_at_statement(DAY + timedelta(days=offset))
+        return session.execute(statement.where(Product.id == product_id)).one().stock
+
+
+def test_stock_at_without_snapshots_walks_back_from_current_stock(
+    session_factory, product_with_history
+):
+    for offset, stock in EXPECTED.items():
+        assert stock_on(session_factory, product_with_history, offset) == stock
+
+
+def test_compacted_snapshots_give_the_same_answers(session_factory, product_with_history):
+    with session_factory() as session:
+        for offset in range(6):
+            compact_snapshots(session, DAY + timedelta(days=offset))
+        session.commit()
+        snapshots = session.execute(
+            select(StockSnapshot.day, StockSnapshot.closing_stock).order_by(StockSnapshot.day)
+        ).all()
+
+    assert snapshots == [
+        (DAY + timedelta(days=offset), EXPECTED[offset]) for offset, _ in MOVEMENTS
+    ]
+    for offset, stock in EXPECTED.items():
+        assert stock_on(session_factory, product_with_history, offset) == stock
+
+
+def test_movements_write_todays_snapshot(session_factory, product_id):
+    with session_factory() as session:
+        apply_stock_movement(session, product_id, 7, "Compra")
+        apply_stock_movement(session, product_id, -2, "Venta")
+        session.commit()
+        snapshot = session.get(StockSnapshot, (product_id, date.today()))
+
+    assert snapshot.closing_stock == 5